@@ -8,23 +8,183 @@ Disclaimer: Provided "as is" without warranty. Use at your own risk.
 """
 
 import os
+import threading
+import time
+import uuid
 from dotenv import load_dotenv
-from openai import AzureOpenAI
-from speech_service import SpeechService
+from llm_router import LatencyRouter
+from hedging import HedgingPolicy, collect_text
+from query_router import QueryRouter
+from speech_service import SpeechService, voice_locale
+from single_flight import SingleFlight, make_key
+from file_transcriber import FileTranscriber
+from tts_text import SpeechTextNormalizer
+from stream_coalescer import StreamCoalescer
+from semantic_cache import SemanticCache
+from flight_recorder import FlightRecorder
+from usage_meter import UsageMeter
+from fair_scheduler import FairScheduler, BudgetExceeded, QueueTimeout, ScheduledStream, estimate_tokens
+
+SYSTEM_PROMPT = "You are a helpful assistant. You can answer questions and have conversations in Indonesian or English."
+
+def _served_by(stream):
+    """Name of the deployment behind a routed or hedged stream"""
+    attempt = getattr(stream, "attempt", None)
+    target = attempt.target if attempt is not None else getattr(stream, "target", None)
+    return target.name if target is not None else None
+
+def _read_text(path):
+    """Contents of a text file, or None if no path is given"""
+    if not path:
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().strip()
+
+class TurnCancelled(RuntimeError):
+    """The turn was cancelled while its completion was waiting for an upstream slot"""
+
+class ChatTurn:
+    """Cancellable handle for one chatbot turn (generation and optional speech)"""
+    
+    def __init__(self, bot, user_message, source="turn", speak=False, record=None, session=None,
+                 history=None):
+        self.bot = bot
+        self.session = session or bot.session_id
+        # Conversation the turn reads and answers into (default: the bot's own)
+        self.history = history if history is not None else bot.conversation_history
+        self.user_message = user_message
+        self.will_speak = speak
+        self.message = {"role": "user", "content": user_message}
+        self.response = None
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._subscription = None
+        self._playback = None
+        self._speaking = False
+        self._generated = False
+        
+        # Timing breakdown kept by the flight recorder
+        self.record = record or bot.recorder.start(source)
+        self.record.set(user_chars=len(user_message))
+    
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+    
+    @property
+    def in_progress(self):
+        """True while the turn is still generating or speaking"""
+        with self._lock:
+            return not self.cancelled and (not self._generated or self._speaking)
+    
+    def cancel(self):
+        """Abort the OpenAI stream and stop speech belonging to this turn"""
+        self._cancelled.set()
+        with self._lock:
+            subscription = self._subscription
+            playback = self._playback if self._speaking else None
+        
+        if subscription is not None:
+            subscription.close()
+        if playback is not None:
+            self.bot.speech_service.playback.cancel(playback)
+    
+    def stream(self):
+        """Yield response chunks until the turn completes or is cancelled"""
+        return self.bot._get_streaming_response(turn=self)
+    
+    def result(self):
+        """Return the full response, or None if the turn was cancelled"""
+        chunks = list(self.stream())
+        if self.cancelled:
+            return None
+        return "".join(chunks)
+    
+    def speak(self, text=None):
+        """Speak the response and wait until it has been played"""
+        item = self.speak_async(text)
+        if item is None:
+            return False
+        return bool(item.wait()) and not self.cancelled
+    
+    def speak_async(self, text=None):
+        """Queue the response on the playback worker and return its PlaybackItem
+
+        Returns None when there is nothing to speak. The turn stays in
+        progress, and its record open, until playback ends or is skipped.
+        """
+        text = text if text is not None else self.response
+        if self.cancelled or not text or not self.bot.speech_enabled:
+            self.finish()
+            return None
+        
+        text = self.bot.normalize_for_speech(text)
+        self.record.mark("speak_queued")
+        self.record.set(spoken_chars=len(text))
+        with self._lock:
+            self._speaking = True
+        
+        def started():
+            self.record.mark("speak_start")
+        
+        def done(result):
+            with self._lock:
+                self._speaking = False
+            self.record.mark("speak_end")
+            self.finish()
+        
+        item = self.bot.speech_service.speak_text_async(text, on_start=started, on_done=done)
+        with self._lock:
+            self._playback = item
+        if self.cancelled:
+            self.bot.speech_service.playback.cancel(item)
+        return item
+    
+    def finish(self, outcome=None):
+        """Close the turn's flight record (later calls are ignored)"""
+        self.record.finish(outcome or ("cancelled" if self.cancelled else "ok"))
+        self.bot._turn_finished(self)
+    
+    def _attach(self, subscription):
+        with self._lock:
+            self._subscription = subscription
+        if self.cancelled:
+            subscription.close()
 
 class SimpleChatbot:
+    # Shared by all instances so identical concurrent turns hit Azure OpenAI once
+    inflight = SingleFlight()
+
     def __init__(self):
         # Load environment variables
         load_dotenv()
         
-        # Initialize Azure OpenAI client
-        self.client = AzureOpenAI(
-            api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
-            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-            api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-        )
+        # Route completions across the configured Azure OpenAI deployments
+        self.router = LatencyRouter.from_env()
         
-        self.deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
+        # Cheap local classifier sending simple turns to the fast tier
+        self.query_router = QueryRouter.from_env()
+        
+        # Optional hedging of slow first tokens to a secondary deployment
+        self.hedging = HedgingPolicy.from_env()
+        
+        # Per-session budgets and fair queuing of completion calls across sessions
+        self.scheduler = FairScheduler.from_env()
+        
+        # Streamed deltas are batched into frames before they are sent to clients
+        self.coalescer = StreamCoalescer.from_env()
+        
+        # Primary target, kept for callers that use the client directly
+        self.client = self.router.targets[0].client
+        self.deployment = self.router.targets[0].deployment
+        
+        # Optional semantic cache answering paraphrased first-turn questions
+        self.embedding_deployment = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME")
+        self.semantic_cache = None
+        if self.embedding_deployment:
+            self.semantic_cache = SemanticCache.from_env(self._embed, model=self.embedding_deployment)
+        if self.semantic_cache is not None:
+            self.semantic_cache.start_background_flush()
         
         # Initialize Speech Service
         try:
@@ -35,43 +195,222 @@ class SimpleChatbot:
             self.speech_service = None
             self.speech_enabled = False
         
+        # Markdown, code and URLs are stripped before text is read aloud
+        self.tts_normalizer = SpeechTextNormalizer.from_env()
+        
+        # Stage timings of recent turns; slow ones are written to a JSONL file
+        self.recorder = FlightRecorder.from_env()
+        
+        # Turn currently generating or speaking per session (cancelled by new input or clear)
+        self.active_turns = {}
+        self._turn_lock = threading.Lock()
+        
+        # Prompt tokens, cached tokens and completion tokens per session and overall
+        self.usage = UsageMeter()
+        self.stream_usage = os.getenv("AZURE_OPENAI_STREAM_USAGE", "true").lower() in ("1", "true", "yes")
+        self.session_id = uuid.uuid4().hex[:12]
+        
+        # Byte-stable request prefix (system prompt, then pinned context) so
+        # Azure OpenAI prompt caching can reuse it across turns
+        self.pinned_context = None
+        self._prefix = ()
+        self.set_pinned_context(_read_text(os.getenv("PINNED_CONTEXT_FILE")))
+        
         # Initialize conversation history
-        self.conversation_history = [
-            {
-                "role": "system",
-                "content": "You are a helpful assistant. You can answer questions and have conversations in Indonesian or English."
-            }
-        ]
+        self.conversation_history = [self._prefix[0]]
     
-    def get_response(self, user_message, stream=False):
-        """Get response from Azure OpenAI"""
+    def get_response(self, user_message, stream=False, session=None):
+        """Get response from Azure OpenAI; session (default: this conversation) is charged for it"""
         # Add user message to conversation history
         self.conversation_history.append({
             "role": "user",
             "content": user_message
         })
+        record = self.recorder.start("get_response", user_chars=len(user_message))
         
         try:
+            session = session or self.session_id
+            priority = self.scheduler.classify(record.source)
+            record.set(session=session, priority=priority)
+            self.scheduler.admit(session, priority)
             if stream:
-                return self._get_streaming_response()
+                return self._get_streaming_response(record=record)
             else:
-                return self._get_regular_response()
+                return self._get_regular_response(record)
         except Exception as e:
+            record.set(error=str(e))
+            record.finish("error")
             return f"Error: {str(e)}"
     
-    def _get_regular_response(self):
-        """Get regular (non-streaming) response"""
-        response = self.client.chat.completions.create(
-            messages=self.conversation_history,
-            max_completion_tokens=1000,
-            temperature=0.7,
-            top_p=1.0,
-            frequency_penalty=0.0,
-            presence_penalty=0.0,
-            model=self.deployment
+    def start_turn(self, user_message, interrupt=True, source="turn", speak=False, record=None,
+                   session=None, history=None):
+        """Start a cancellable turn; by default a new turn cancels the previous one
+
+        source labels the turn in the flight recorder and picks its priority
+        class; speak=True keeps its record open until the response has been
+        spoken. session (default: this conversation) is charged for the turn;
+        BudgetExceeded is raised when its budget is used up. history (from
+        new_history()) keeps a separate conversation, e.g. per connection.
+        """
+        turn = ChatTurn(self, user_message, source=source, speak=speak, record=record, session=session,
+                        history=history)
+        session = turn.session
+        priority = self.scheduler.classify(turn.record.source)
+        turn.record.set(session=session, priority=priority)
+        try:
+            self.scheduler.admit(session, priority)
+        except BudgetExceeded as e:
+            turn.record.set(error=str(e))
+            turn.finish("rejected")
+            raise
+        
+        with self._turn_lock:
+            previous = self.active_turns.get(session)
+            self.active_turns[session] = turn
+        
+        if interrupt and previous is not None:
+            previous.cancel()
+        
+        turn.history.append(turn.message)
+        return turn
+    
+    def new_history(self):
+        """Empty conversation for start_turn(history=...), starting with the system entry"""
+        return [self._prefix[0]]
+    
+    def cancel_active_turn(self, session=None):
+        """Cancel the running turn of session (default: this conversation), if any"""
+        with self._turn_lock:
+            turn = self.active_turns.pop(session or self.session_id, None)
+        
+        if turn is None:
+            return False
+        in_progress = turn.in_progress
+        turn.cancel()
+        return in_progress
+    
+    def _turn_finished(self, turn):
+        with self._turn_lock:
+            if self.active_turns.get(turn.session) is turn:
+                del self.active_turns[turn.session]
+    
+    def _completion_params(self, max_completion_tokens=1000):
+        """Sampling parameters shared by regular and streaming completions"""
+        return {
+            "max_completion_tokens": max_completion_tokens,
+            "temperature": 0.7,
+            "top_p": 1.0,
+            "frequency_penalty": 0.0,
+            "presence_penalty": 0.0,
+        }
+    
+    def _request_key(self, messages, params, tier):
+        """Key identifying an upstream completion request for coalescing"""
+        return make_key("chat", tier, messages, params)
+    
+    def _stream_params(self, params):
+        """Streaming parameters; usage is requested in the final chunk when enabled"""
+        if not self.stream_usage:
+            return params
+        return dict(params, stream_options={"include_usage": True})
+    
+    def _route_turn(self, messages):
+        """Classify the latest user message; returns (label, tier, params)"""
+        label, tier, max_tokens = self.query_router.route(messages[-1]["content"], self.router.tiers())
+        return label, tier, self._completion_params(max_tokens)
+    
+    def _embed(self, texts):
+        """Embedding vectors for texts from the embeddings deployment"""
+        response = self.client.embeddings.create(model=self.embedding_deployment, input=texts)
+        return [item.embedding for item in response.data]
+    
+    def _semantic_lookup(self, history):
+        """Return (cached answer or None, question vector) for first-turn questions
+
+        Later turns depend on the conversation so far and are never cached.
+        """
+        if self.semantic_cache is None or len(history) != 2:
+            return None, None
+        return self.semantic_cache.lookup(history[-1]["content"], self._prefix_key)
+    
+    def set_pinned_context(self, text):
+        """Pin reference text right after the system prompt for every request"""
+        self.pinned_context = text or None
+        prefix = [{"role": "system", "content": SYSTEM_PROMPT}]
+        if self.pinned_context:
+            prefix.append({"role": "system", "content": self.pinned_context})
+        self._prefix = tuple(prefix)
+        # Cached answers are only reused under the same system prompt and pinned context
+        self._prefix_key = make_key("prefix", prefix)[:16]
+    
+    def _build_messages(self, history):
+        """Request messages: the fixed prefix, then the conversation without its system entry
+
+        The prefix objects are built once, so every request starts with the
+        same bytes and only the tail after the last turn changes.
+        """
+        return list(self._prefix) + history[1:]
+    
+    def _record_usage(self, usage, record, ticket=None):
+        """Add a response's token usage to the turn's session, the global totals and the turn record"""
+        if usage is None:
+            return
+        # The turn's session was set by start_turn/get_response
+        prompt, cached, completion = self.usage.record(record.fields.get("session", self.session_id), usage)
+        record.set(prompt_tokens=prompt, cached_tokens=cached, completion_tokens=completion)
+        if ticket is not None:
+            ticket.settle(prompt + completion)
+    
+    def _acquire_slot(self, messages, params, record):
+        """Wait for a fair-queued upstream slot; the wait is kept on the turn record"""
+        ticket = self.scheduler.acquire(
+            record.fields.get("session", self.session_id),
+            record.fields.get("priority", self.scheduler.classify(record.source)),
+            estimate_tokens(messages) + params["max_completion_tokens"],
         )
+        record.mark("scheduled")
+        record.set(queue_ms=round(ticket.wait_ms))
+        return ticket
+    
+    def _get_regular_response(self, record):
+        """Get regular (non-streaming) response"""
+        history = list(self.conversation_history)
+        messages = self._build_messages(history)
+        cached, vector = self._semantic_lookup(history)
+        if cached is not None:
+            self.conversation_history.append({"role": "assistant", "content": cached})
+            record.set(cache="semantic", response_chars=len(cached))
+            record.finish()
+            return cached
         
-        assistant_message = response.choices[0].message.content
+        label, tier, params = self._route_turn(messages)
+        record.mark("routed")
+        record.set(query_class=label, tier=tier)
+        started = time.time()
+        
+        def create():
+            ticket = self._acquire_slot(messages, params, record)
+            try:
+                if self.hedging is not None:
+                    # Hedged requests stream under the hood so the losing request can be cancelled
+                    stream = self.hedging.open_stream(self.router, messages, tier=tier,
+                                                      **self._stream_params(params))
+                    record.set(target=_served_by(stream))
+                    return collect_text(stream, on_usage=lambda usage: self._record_usage(usage, record, ticket))
+                response = self.router.complete(messages, tier=tier, **params)
+                self._record_usage(response.usage, record, ticket)
+                return response.choices[0].message.content
+            finally:
+                ticket.release()
+        
+        # Identical in-flight requests share one upstream call
+        assistant_message = self.inflight.do(self._request_key(messages, params, tier), create)
+        self.query_router.record(label, tier, time.time() - started)
+        record.mark("generated")
+        record.set(response_chars=len(assistant_message or ""))
+        record.finish()
+        if vector is not None:
+            self.semantic_cache.store(messages[-1]["content"], assistant_message, vector, self._prefix_key)
         
         # Add assistant response to conversation history
         self.conversation_history.append({
@@ -81,66 +420,233 @@ class SimpleChatbot:
         
         return assistant_message
     
-    def _get_streaming_response(self):
+    def _get_streaming_response(self, turn=None, record=None):
         """Get streaming response (generator)"""
-        response = self.client.chat.completions.create(
-            stream=True,
-            messages=self.conversation_history,
-            max_completion_tokens=1000,
-            temperature=0.7,
-            top_p=1.0,
-            frequency_penalty=0.0,
-            presence_penalty=0.0,
-            model=self.deployment,
-        )
+        record = turn.record if turn is not None else record
+        conversation = turn.history if turn is not None else self.conversation_history
+        history = list(conversation)
+        messages = self._build_messages(history)
+        cached, vector = self._semantic_lookup(history)
+        if cached is not None:
+            record.set(cache="semantic", response_chars=len(cached))
+            if turn is None or not turn.cancelled:
+                yield cached
+            if turn is not None:
+                turn._generated = True
+                if turn.cancelled:
+                    self._discard_message(turn.message, conversation)
+                    turn.finish()
+                    return
+                turn.response = cached
+                if not turn.will_speak:
+                    turn.finish()
+            else:
+                record.finish()
+            conversation.append({"role": "assistant", "content": cached})
+            return
+        
+        label, tier, params = self._route_turn(messages)
+        record.mark("routed")
+        record.set(query_class=label, tier=tier)
+        started = time.time()
+        
+        created = []
+        subscriptions = []
+        
+        def create():
+            ticket = self._acquire_slot(messages, params, record)
+            # Cancelled while queued: give the slot back instead of opening a request
+            # nobody will read (other coalesced subscribers keep the flight alive)
+            if turn is not None and turn.cancelled and (not subscriptions or subscriptions[0].abandoned):
+                ticket.release()
+                raise TurnCancelled("Turn dibatalkan sebelum request dikirim")
+            created.append(ticket)
+            try:
+                if self.hedging is not None:
+                    stream = self.hedging.open_stream(self.router, messages, tier=tier,
+                                                      **self._stream_params(params))
+                else:
+                    stream = self.router.complete(messages, stream=True, tier=tier,
+                                                  **self._stream_params(params))
+            except BaseException:
+                ticket.release()
+                raise
+            record.set(target=_served_by(stream))
+            # The slot is held until the stream has been read to the end or closed
+            return ScheduledStream(stream, ticket)
+        
+        # Subscribers joining mid-stream replay the chunks received so far
+        subscription = self.inflight.stream(self._request_key(messages, params, tier), create)
+        subscriptions.append(subscription)
+        if turn is not None:
+            turn._attach(subscription)
         
-        full_response = ""
-        for update in response:
-            if update.choices and update.choices[0].delta.content:
-                chunk = update.choices[0].delta.content
-                full_response += chunk
-                yield chunk
+        parts = []
+        try:
+            for update in subscription:
+                if turn is not None and turn.cancelled:
+                    break
+                # The final chunk carries usage; coalesced subscribers did not pay for it
+                if getattr(update, "usage", None) is not None and created:
+                    self._record_usage(update.usage, record, created[0])
+                if update.choices and update.choices[0].delta.content:
+                    chunk = update.choices[0].delta.content
+                    if not parts:
+                        record.mark("first_token")
+                    parts.append(chunk)
+                    yield chunk
+        except Exception as e:
+            # Closing the subscription from another thread aborts the read
+            if turn is None or not turn.cancelled:
+                record.set(error=str(e))
+                if turn is None:
+                    record.finish("error")
+                    raise
+                # Same cleanup as a cancelled turn: the question stays unanswered
+                turn._generated = True
+                self._discard_message(turn.message, conversation)
+                turn.finish("error")
+                raise
+        finally:
+            subscription.close()
+        
+        full_response = "".join(parts)
+        record.mark("generated")
+        record.set(deltas=len(parts), response_chars=len(full_response))
+        if not created:
+            record.set(coalesced=True)
+        
+        if turn is not None:
+            turn._generated = True
+            if turn.cancelled:
+                # Drop the abandoned question so history stays user/assistant paired
+                self._discard_message(turn.message, conversation)
+                turn.finish()
+                return
+            turn.response = full_response
+            if not turn.will_speak:
+                turn.finish()
+        else:
+            record.finish()
+        
+        self.query_router.record(label, tier, time.time() - started)
+        if vector is not None:
+            self.semantic_cache.store(messages[-1]["content"], full_response, vector, self._prefix_key)
         
         # Add complete response to conversation history
-        self.conversation_history.append({
+        conversation.append({
             "role": "assistant",
             "content": full_response
         })
     
+    def _discard_message(self, message, conversation):
+        for i, entry in enumerate(conversation):
+            if entry is message:
+                del conversation[i]
+                return
+    
+    def get_routing_stats(self):
+        """Per-deployment latency and health statistics"""
+        return self.router.stats()
+    
+    def get_query_routing_stats(self):
+        """Turn counts and latency per query class"""
+        return self.query_router.stats()
+    
+    def get_streaming_stats(self):
+        """Frames per streamed response and bytes per frame"""
+        return self.coalescer.stats()
+    
+    def get_recent_turns(self, limit=20, slow_only=False):
+        """Flight-recorder snapshots of recent turns, newest first"""
+        return self.recorder.recent(limit, slow_only)
+    
+    def get_semantic_cache_stats(self):
+        """Semantic cache hit rate, lookup latency and recent hits for audit"""
+        if self.semantic_cache is None:
+            return None
+        return self.semantic_cache.stats()
+    
+    def get_usage_stats(self):
+        """Token usage and cached-token ratio, overall and for recent sessions"""
+        stats = self.usage.stats()
+        stats["current_session"] = self.session_id
+        return stats
+    
+    def get_scheduler_stats(self):
+        """Per-class wait times, budget usage per session and budget exhaustion"""
+        return self.scheduler.stats()
+    
+    def get_hedging_stats(self):
+        """Hedging counters, or None when hedging is disabled"""
+        if self.hedging is None:
+            return None
+        return self.hedging.stats()
+    
     def clear_history(self):
         """Clear conversation history except system message"""
+        self.cancel_active_turn()
         self.conversation_history = [self.conversation_history[0]]  # Keep only system message
+        self.session_id = uuid.uuid4().hex[:12]  # A new conversation starts a new usage session
     
     def get_conversation_history(self):
         """Get current conversation history"""
         return self.conversation_history
     
-    def voice_chat(self, speak_response=True):
-        """Voice chat mode - listen from microphone and optionally speak response"""
+    def voice_chat(self, speak_response=True, wait=True, interrupt=True, session=None):
+        """Voice chat mode - listen from microphone and optionally speak response
+
+        With wait=False the response is queued on the playback worker and the
+        call returns while it is still being spoken. interrupt=False lets the
+        previous turn's answer finish playing. session is charged for the turn;
+        BudgetExceeded and QueueTimeout are raised to the caller.
+        """
         if not self.speech_enabled:
             return "Speech service tidak tersedia. Pastikan Azure Speech service sudah dikonfigurasi."
         
         try:
             # Listen for speech input
             print("🎤 Mendengarkan input suara...")
+            listen_started = time.time()
             user_speech = self.speech_service.recognize_speech_once()
+            # The turn starts at the final transcript; time spent listening is kept
+            # apart so it does not count toward the slow-turn threshold
+            record = self.recorder.start("voice", listen_ms=round((time.time() - listen_started) * 1000))
             
             if not user_speech:
+                record.finish("no_speech")
                 return None
             
             # Get response from chatbot
-            bot_response = self.get_response(user_speech, stream=False)
+            turn = self.start_turn(user_speech, interrupt=interrupt, source="voice", speak=speak_response,
+                                   record=record, session=session)
+            bot_response = turn.result()
+            
+            if turn.cancelled:
+                return {
+                    "user_input": user_speech,
+                    "bot_response": None,
+                    "cancelled": True
+                }
             
             # Speak the response if requested
             if speak_response and bot_response:
                 print("🔊 Mengucapkan respons...")
-                self.speech_service.speak_text(bot_response)
+                if wait:
+                    turn.speak()
+                else:
+                    turn.speak_async()
+            else:
+                turn.finish()
             
             return {
                 "user_input": user_speech,
-                "bot_response": bot_response
+                "bot_response": bot_response,
+                "cancelled": turn.cancelled
             }
             
+        except (BudgetExceeded, QueueTimeout):
+            raise
         except Exception as e:
             error_msg = f"Error dalam voice chat: {str(e)}"
             print(f"❌ {error_msg}")
@@ -153,12 +659,71 @@ class SimpleChatbot:
         
         return self.speech_service.recognize_speech_once()
     
-    def speak_response(self, text):
-        """Speak the given text"""
+    def start_continuous_listening(self):
+        """Start continuous recognition; results arrive as recognition events"""
         if not self.speech_enabled:
             return False
         
-        return self.speech_service.speak_text(text)
+        return self.speech_service.start_continuous_recognition()
+    
+    def stop_continuous_listening(self):
+        if self.speech_enabled:
+            self.speech_service.stop_continuous_recognition()
+    
+    def recognition_events(self, max_queue=None, overflow=None):
+        """Subscribe to interim, final, session and cancellation events"""
+        if not self.speech_enabled:
+            return None
+        
+        return self.speech_service.subscribe_recognition_events(max_queue, overflow)
+    
+    def get_recognition_event_stats(self):
+        """Published events and queue depth, drops and delay per subscriber"""
+        if not self.speech_enabled:
+            return None
+        
+        return self.speech_service.get_recognition_event_stats()
+    
+    def listen_from_audio(self, pcm, sample_rate=16000):
+        """Recognize speech from client-supplied PCM (silence is trimmed locally)"""
+        if not self.speech_enabled:
+            return None
+        
+        return self.speech_service.recognize_pcm(pcm, sample_rate)
+    
+    def transcribe_file(self, path, max_workers=None):
+        """Transcribe a long WAV recording; returns ordered TranscriptEntry objects"""
+        if not self.speech_enabled:
+            return []
+        
+        return FileTranscriber(self.speech_service, max_workers=max_workers).transcribe(path)
+    
+    def speak_response(self, text, wait=True):
+        """Speak the given text; with wait=False it is only queued for playback"""
+        if not self.speech_enabled:
+            return False
+        
+        item = self.speech_service.speak_text_async(self.normalize_for_speech(text))
+        return item.wait() if wait else True
+    
+    def interrupt_playback(self):
+        """Stop speech playback and drop everything still queued"""
+        if not self.speech_enabled:
+            return False
+        
+        return self.speech_service.interrupt_playback()
+    
+    def wait_for_playback(self):
+        """Block until everything queued for playback has been spoken"""
+        if self.speech_enabled:
+            self.speech_service.playback.wait()
+    
+    def get_playback_stats(self):
+        """Playback worker state and queue depth"""
+        if not self.speech_enabled:
+            return None
+        
+        return self.speech_service.get_playback_stats()
     
     def set_speech_language(self, language_code):
         """Set speech recognition language"""
@@ -167,19 +732,70 @@ class SimpleChatbot:
         
         return self.speech_service.set_language(language_code)
     
-    def set_speech_voice(self, voice_name):
+    def set_speech_voice(self, voice_name, output_format=None):
         """Set speech synthesis voice"""
         if not self.speech_enabled:
             return False
         
-        return self.speech_service.set_voice(voice_name)
+        return self.speech_service.set_voice(voice_name, output_format)
     
-    def get_available_voices(self):
-        """Get available speech voices"""
+    def synthesize_audio(self, text, output_format=None):
+        """Synthesize text to encoded audio for clients"""
+        if not self.speech_enabled:
+            return None
+        
+        return self.speech_service.synthesize_audio(text, output_format)
+    
+    def stream_audio(self, text, output_format=None, voice_name=None):
+        """Synthesize text in parallel chunks; the entry's "chunks" yields audio in order
+
+        voice_name (default: the current voice) is used for this call only.
+        """
+        if not self.speech_enabled:
+            return None
+        
+        return self.speech_service.stream_audio(text, output_format, voice_name)
+    
+    def normalize_for_speech(self, text, voice_name=None):
+        """Spoken form of text in the language of voice_name (default: the current voice)"""
+        language = None
+        if voice_name:
+            language = voice_locale(voice_name)
+        elif self.speech_enabled:
+            language = voice_locale(self.speech_service.speech_config.speech_synthesis_voice_name or "")
+        return self.tts_normalizer.normalize(text, language)
+    
+    def get_tts_normalization_stats(self):
+        """Characters removed from text before synthesis"""
+        return self.tts_normalizer.stats()
+    
+    def get_speech_language_status(self):
+        """Recognition language mode and the last detected language"""
+        if not self.speech_enabled:
+            return None
+        
+        return self.speech_service.get_language_status()
+    
+    def get_speech_region_stats(self):
+        """Health statistics per speech region"""
+        if not self.speech_enabled:
+            return []
+        
+        return self.speech_service.get_region_stats()
+    
+    def get_available_voices(self, locale=None, gender=None):
+        """Get available speech voices grouped by locale"""
         if not self.speech_enabled:
             return {}
         
-        return self.speech_service.get_available_voices()
+        return self.speech_service.get_available_voices(locale, gender)
+    
+    def get_voice_catalog_stats(self):
+        """Size, source and age of the cached voice catalog"""
+        if not self.speech_enabled:
+            return None
+        
+        return self.speech_service.get_voice_catalog_stats()
     
     def test_speech_services(self):
         """Test speech services"""
@@ -0,0 +1,317 @@
+"""
+Fair Completion Scheduler
+Budget token/request per sesi dan weighted fair queuing antar sesi dengan kelas prioritas (voice, web, batch)
+
+Author: Edhot Purwoko - Microsoft Indonesia
+License: MIT - Free to use
+Disclaimer: Provided "as is" without warranty. Use at your own risk.
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+
+# Priority classes; interactive voice turns get the largest share
+VOICE = "voice"
+WEB = "web"
+BATCH = "batch"
+DEFAULT_WEIGHTS = {VOICE: 6.0, WEB: 3.0, BATCH: 1.0}
+
+# Flight recorder source of a turn -> priority class (anything else is batch)
+SOURCE_CLASSES = {
+    "voice": VOICE, "realtime": VOICE, "cli-listen": VOICE,
+    "web": WEB, "web-stream": WEB, "web-tts": WEB, "cli": WEB, "cli-tts": WEB, "turn": WEB,
+}
+
+def parse_weights(value):
+    """Parse 'voice=6,web=3,batch=1' over the defaults"""
+    weights = dict(DEFAULT_WEIGHTS)
+    for entry in (value or "").split(","):
+        name, _, weight = entry.partition("=")
+        if name.strip() in weights and weight.strip():
+            weights[name.strip()] = max(float(weight), 0.01)
+    return weights
+
+def estimate_tokens(messages):
+    """Rough prompt size (about four characters per token)"""
+    return sum(len(str(message.get("content") or "")) for message in messages) // 4 + 1
+
+class BudgetExceeded(RuntimeError):
+    """A session used up its request or token budget for the current window"""
+
+    def __init__(self, session, kind, retry_after):
+        self.session = session
+        self.kind = kind
+        self.retry_after = max(1, round(retry_after))
+        super().__init__(f"Batas {kind} untuk sesi ini sudah habis, coba lagi dalam {self.retry_after} detik")
+
+class QueueTimeout(TimeoutError):
+    """A request waited longer than the scheduler timeout for an upstream slot"""
+
+    def __init__(self, waited):
+        self.retry_after = max(1, round(waited / 2))
+        super().__init__(f"Server sedang sibuk, coba lagi dalam {self.retry_after} detik")
+
+class _Budget:
+    """Requests and tokens a session used within the rolling window"""
+
+    def __init__(self):
+        self.requests = deque()  # timestamps
+        self.tokens = deque()    # (timestamp, tokens)
+        self.token_total = 0
+        self.exhausted = 0
+
+    def prune(self, cutoff):
+        while self.requests and self.requests[0] < cutoff:
+            self.requests.popleft()
+        while self.tokens and self.tokens[0][0] < cutoff:
+            self.token_total -= self.tokens.popleft()[1]
+
+class Ticket:
+    """A granted upstream slot; release() it when the completion has finished"""
+
+    def __init__(self, scheduler, session, priority, cost):
+        self.scheduler = scheduler
+        self.session = session
+        self.priority = priority
+        self.cost = cost
+        self.charged = cost
+        self.wait_ms = 0.0
+        self._settled = False
+        self._released = False
+
+    def settle(self, tokens):
+        """Replace the estimated token charge with the reported usage (once)"""
+        if self._settled:
+            return
+        self._settled = True
+        self.scheduler.charge(self.session, tokens - self.charged)
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.scheduler._release()
+
+class ScheduledStream:
+    """Wraps an upstream stream so its slot is released when it ends or is closed"""
+
+    def __init__(self, stream, ticket):
+        self.stream = stream
+        self.ticket = ticket
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+    def __iter__(self):
+        try:
+            for chunk in self.stream:
+                yield chunk
+        finally:
+            self.ticket.release()
+
+    def close(self):
+        try:
+            close = getattr(self.stream, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self.ticket.release()
+
+class _ClassStats:
+    def __init__(self, window):
+        self.admitted = 0
+        self.rejected = 0
+        self.waiting = 0
+        self.timeouts = 0
+        self.wait_ms = deque(maxlen=window)
+
+class FairScheduler:
+    """Admission control and weighted fair queuing for Azure OpenAI calls
+
+    admit() enforces per-session request and token budgets over a rolling
+    window. acquire() waits for one of concurrency upstream slots; waiting
+    requests are served by virtual finish time, so each session gets a share
+    proportional to its class weight and a busy session cannot starve others.
+    A request still waiting after timeout seconds gives up with QueueTimeout.
+    """
+
+    def __init__(self, concurrency=4, weights=None, token_budget=0, request_budget=0,
+                 window_seconds=60.0, max_sessions=1000, sample_window=200, timeout=30.0):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.weights = weights or dict(DEFAULT_WEIGHTS)
+        self.token_budget = token_budget
+        self.request_budget = request_budget
+        self.window_seconds = window_seconds
+        self.max_sessions = max_sessions
+        self.active = 0
+        self.virtual_time = 0.0
+        self._finish_tags = {}
+        self._queue = []
+        self._sequence = itertools.count()
+        self._budgets = {}
+        self._classes = {name: _ClassStats(sample_window) for name in self.weights}
+        self._exhausted = deque(maxlen=50)
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            concurrency=int(os.getenv("LLM_SCHEDULER_CONCURRENCY", "4")),
+            weights=parse_weights(os.getenv("LLM_SCHEDULER_WEIGHTS")),
+            token_budget=int(os.getenv("LLM_SESSION_TOKEN_BUDGET", "0")),
+            request_budget=int(os.getenv("LLM_SESSION_REQUEST_BUDGET", "0")),
+            window_seconds=float(os.getenv("LLM_SESSION_BUDGET_WINDOW_SECONDS", "60")),
+            timeout=float(os.getenv("LLM_SCHEDULER_TIMEOUT_SECONDS", "30")),
+        )
+
+    def classify(self, source):
+        return SOURCE_CLASSES.get(source, BATCH)
+
+    def admit(self, session, priority):
+        """Count one request against the session's budget, or raise BudgetExceeded"""
+        now = time.time()
+        cutoff = now - self.window_seconds
+        with self._cond:
+            budget = self._budget(session, cutoff)
+            if self.request_budget and len(budget.requests) >= self.request_budget:
+                self._reject(session, priority, budget, "request")
+                raise BudgetExceeded(session, "request", budget.requests[0] - cutoff)
+            if self.token_budget and budget.token_total >= self.token_budget:
+                self._reject(session, priority, budget, "token")
+                raise BudgetExceeded(session, "token", budget.tokens[0][0] - cutoff)
+            budget.requests.append(now)
+            self._classes[priority].admitted += 1
+
+    def charge(self, session, tokens):
+        """Add tokens (may be a negative correction) to the session's window"""
+        if not tokens:
+            return
+        now = time.time()
+        with self._cond:
+            budget = self._budget(session, now - self.window_seconds)
+            budget.tokens.append((now, tokens))
+            budget.token_total += tokens
+
+    def acquire(self, session, priority, cost, timeout=None):
+        """Block until this request is next in fair order and a slot is free
+
+        Raises QueueTimeout after timeout seconds (default: the scheduler's; 0 waits forever).
+        """
+        timeout = self.timeout if timeout is None else timeout
+        waiter = object()
+        started = time.time()
+        deadline = started + timeout if timeout else None
+        with self._cond:
+            previous_tag = self._finish_tags.get(session)
+            start = max(self.virtual_time, previous_tag or 0.0)
+            finish = start + cost / self.weights[priority]
+            self._finish_tags[session] = finish
+            entry = (finish, next(self._sequence), waiter)
+            heapq.heappush(self._queue, entry)
+            stats = self._classes[priority]
+            stats.waiting += 1
+            while self.active >= self.concurrency or self._queue[0][2] is not waiter:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    self._abandon(entry, session, previous_tag)
+                    stats.waiting -= 1
+                    stats.timeouts += 1
+                    raise QueueTimeout(time.time() - started)
+                self._cond.wait(remaining)
+            heapq.heappop(self._queue)
+            self.active += 1
+            # The next request in line may fit into another free slot
+            self._cond.notify_all()
+            self.virtual_time = max(self.virtual_time, finish)
+            stats.waiting -= 1
+            # Sessions whose tag the virtual clock has passed start fresh anyway
+            if len(self._finish_tags) > self.max_sessions:
+                self._finish_tags = {s: t for s, t in self._finish_tags.items() if t > self.virtual_time}
+
+            ticket = Ticket(self, session, priority, cost)
+            ticket.wait_ms = (time.time() - started) * 1000
+            stats.wait_ms.append(ticket.wait_ms)
+        self.charge(session, cost)
+        return ticket
+
+    def stats(self, limit=20):
+        """Per-class wait times and rejections, busiest sessions and recent budget exhaustion"""
+        cutoff = time.time() - self.window_seconds
+        with self._cond:
+            classes = {}
+            for name, stats in self._classes.items():
+                samples = sorted(stats.wait_ms)
+                classes[name] = {
+                    "weight": self.weights[name],
+                    "admitted": stats.admitted,
+                    "rejected": stats.rejected,
+                    "waiting": stats.waiting,
+                    "timeouts": stats.timeouts,
+                    "wait_p50_ms": _percentile(samples, 50),
+                    "wait_p95_ms": _percentile(samples, 95),
+                }
+            for budget in self._budgets.values():
+                budget.prune(cutoff)
+            busiest = sorted(self._budgets.items(), key=lambda item: -item[1].token_total)[:limit]
+            return {
+                "concurrency": self.concurrency,
+                "timeout_seconds": self.timeout or None,
+                "active": self.active,
+                "queued": len(self._queue),
+                "window_seconds": self.window_seconds,
+                "token_budget": self.token_budget or None,
+                "request_budget": self.request_budget or None,
+                "classes": classes,
+                "sessions": {
+                    session: {
+                        "requests": len(budget.requests),
+                        "tokens": budget.token_total,
+                        "exhausted": budget.exhausted,
+                    }
+                    for session, budget in busiest
+                },
+                "recent_exhaustion": list(self._exhausted),
+            }
+
+    def _budget(self, session, cutoff):
+        budget = self._budgets.get(session)
+        if budget is None:
+            if len(self._budgets) >= self.max_sessions:
+                for stale in [s for s, b in self._budgets.items() if not b.requests and not b.tokens]:
+                    del self._budgets[stale]
+            budget = self._budgets[session] = _Budget()
+        budget.prune(cutoff)
+        return budget
+
+    def _reject(self, session, priority, budget, kind):
+        budget.exhausted += 1
+        self._classes[priority].rejected += 1
+        self._exhausted.append({"time": round(time.time()), "session": session,
+                                "class": priority, "budget": kind})
+
+    def _abandon(self, entry, session, previous_tag):
+        """Take a timed-out waiter out of the queue (called with the lock held)"""
+        self._queue.remove(entry)
+        heapq.heapify(self._queue)
+        # Undo the session's share unless a later request already built on it
+        if self._finish_tags.get(session) == entry[0]:
+            if previous_tag is None:
+                del self._finish_tags[session]
+            else:
+                self._finish_tags[session] = previous_tag
+        # The head of the queue may have changed
+        self._cond.notify_all()
+
+    def _release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+def _percentile(samples, percentile):
+    if not samples:
+        return None
+    return round(samples[min(len(samples) - 1, len(samples) * percentile // 100)], 1)
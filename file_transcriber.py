@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Long-Audio File Transcription
+Transkripsi file rekaman panjang (panggilan, meeting) dengan pengenalan segmen secara paralel
+
+Author: Edhot Purwoko - Microsoft Indonesia
+License: MIT - Free to use
+Disclaimer: Provided "as is" without warranty. Use at your own risk.
+"""
+
+import argparse
+import os
+import time
+import wave
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from vad import VoiceActivityDetector, check_wav_format
+
+def format_timestamp(ms):
+    """Format milliseconds as HH:MM:SS.mmm"""
+    seconds, millis = divmod(int(ms), 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{millis:03d}"
+
+class TranscriptEntry:
+    """One recognized utterance with absolute timestamps
+
+    A segment that could not be recognized is kept as an entry with empty
+    text and the error, so the gap stays visible in the transcript.
+    """
+
+    def __init__(self, start_ms, end_ms, text, error=None):
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.text = text
+        self.error = error
+
+    def __str__(self):
+        text = self.text if self.error is None else f"⚠️ [segmen gagal ditranskripsi: {self.error}]"
+        return f"[{format_timestamp(self.start_ms)} - {format_timestamp(self.end_ms)}] {text}"
+
+    def to_dict(self):
+        return {"start_ms": self.start_ms, "end_ms": self.end_ms, "text": self.text, "error": self.error}
+
+class FileTranscriber:
+    """Split a WAV file at silence and recognize the segments on a bounded worker pool
+
+    A failed segment is retried up to retries times, failing the speech
+    service over to another region in between; if it still fails it becomes
+    a gap entry and the rest of the file is transcribed as usual.
+    """
+
+    def __init__(self, speech_service, max_workers=None, read_ms=1000, max_segment_ms=None, retries=None):
+        self.speech_service = speech_service
+        self.max_workers = max_workers or int(os.getenv("TRANSCRIBE_WORKERS", "4"))
+        self.read_ms = read_ms
+        self.max_segment_ms = max_segment_ms or int(os.getenv("TRANSCRIBE_MAX_SEGMENT_MS", "20000"))
+        self.retries = retries if retries is not None else int(os.getenv("TRANSCRIBE_RETRIES", "2"))
+
+        # Statistics for the last transcription
+        self.segments = 0
+        self.failed_segments = 0
+        self.audio_ms = 0
+        self.elapsed = 0.0
+
+    def _read_chunks(self, wav):
+        frames_per_read = max(1, wav.getframerate() * self.read_ms // 1000)
+        while True:
+            chunk = wav.readframes(frames_per_read)
+            if not chunk:
+                return
+            yield chunk
+
+    def iter_transcript(self, path):
+        """Yield TranscriptEntry objects in file order
+
+        The file is streamed, and at most twice max_workers segments are held in
+        memory at once, so memory stays flat regardless of file length.
+        """
+        started = time.time()
+        self.segments = 0
+        self.failed_segments = 0
+        with wave.open(path, "rb") as wav:
+            check_wav_format(wav)
+            sample_rate = wav.getframerate()
+            self.audio_ms = wav.getnframes() * 1000 // sample_rate
+            vad = VoiceActivityDetector.from_env(sample_rate, max_segment_ms=self.max_segment_ms)
+
+            pending = deque()
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                for segment in vad.segments(self._read_chunks(wav)):
+                    self.segments += 1
+                    future = pool.submit(self._recognize, segment.pcm, sample_rate)
+                    pending.append((segment.start_ms, segment.end_ms, future))
+
+                    # Backpressure: drain the oldest segment before reading further ahead
+                    while len(pending) >= self.max_workers * 2:
+                        yield from self._collect(*pending.popleft())
+
+                while pending:
+                    yield from self._collect(*pending.popleft())
+
+        self.elapsed = time.time() - started
+
+    def transcribe(self, path):
+        """Return the ordered list of TranscriptEntry objects for a WAV file"""
+        return list(self.iter_transcript(path))
+
+    def _recognize(self, pcm, sample_rate):
+        """Recognize one segment, retrying on another region after a failure"""
+        attempt = 0
+        while True:
+            region = self.speech_service.region
+            try:
+                return self.speech_service.recognize_segment(pcm, sample_rate)
+            except Exception as e:
+                attempt += 1
+                if attempt > self.retries:
+                    raise
+                print(f"⚠️ Segmen gagal dikenali ({e}), mencoba lagi ({attempt}/{self.retries})")
+                self.speech_service.fail_over(str(e), region)
+
+    def _collect(self, segment_start_ms, segment_end_ms, future):
+        try:
+            utterances = future.result()
+        except Exception as e:
+            self.failed_segments += 1
+            print(f"❌ Segmen {format_timestamp(segment_start_ms)} dilewati: {str(e)}")
+            yield TranscriptEntry(segment_start_ms, segment_end_ms, "", error=str(e))
+            return
+        for offset_ms, duration_ms, text in utterances:
+            start_ms = segment_start_ms + offset_ms
+            yield TranscriptEntry(start_ms, start_ms + duration_ms, text)
+
+def main():
+    """Transcribe a WAV file from the command line"""
+    from speech_service import SpeechService
+
+    parser = argparse.ArgumentParser(description="Transkripsi file WAV 16-bit mono")
+    parser.add_argument("path", help="File WAV yang akan ditranskripsi")
+    parser.add_argument("--workers", type=int, default=None, help="Jumlah worker paralel")
+    parser.add_argument("--output", help="Simpan transkrip ke file teks")
+    args = parser.parse_args()
+
+    transcriber = FileTranscriber(SpeechService(), max_workers=args.workers)
+    output = open(args.output, "w", encoding="utf-8") if args.output else None
+    try:
+        for entry in transcriber.iter_transcript(args.path):
+            print(entry)
+            if output:
+                output.write(f"{entry}\n")
+    finally:
+        if output:
+            output.close()
+
+    speed = transcriber.audio_ms / 1000 / transcriber.elapsed if transcriber.elapsed else 0
+    print(f"✅ {transcriber.segments} segmen, {transcriber.audio_ms / 1000:.1f}s audio "
+          f"dalam {transcriber.elapsed:.1f}s ({speed:.1f}x realtime, {transcriber.max_workers} worker)")
+    if transcriber.failed_segments:
+        print(f"⚠️ {transcriber.failed_segments} segmen gagal ditranskripsi dan ditandai di transkrip")
+
+if __name__ == "__main__":
+    main()
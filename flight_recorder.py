@@ -0,0 +1,141 @@
+"""
+Turn Flight Recorder
+Ring buffer berisi timing per tahap dari turn terakhir; turn yang lambat otomatis disimpan ke file JSONL
+
+Author: Edhot Purwoko - Microsoft Indonesia
+License: MIT - Free to use
+Disclaimer: Provided "as is" without warranty. Use at your own risk.
+"""
+
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+class TurnRecord:
+    """Stage timestamps and attributes of one turn
+
+    mark() stores the offset of a stage from the start of the turn; set()
+    stores attributes such as token counts, payload sizes and targets.
+    """
+
+    def __init__(self, recorder, turn_id, source, **fields):
+        self.recorder = recorder
+        self.id = turn_id
+        self.source = source
+        self.started = time.time()
+        self.stages = {}
+        self.fields = fields
+        self.outcome = None
+        self.total_ms = None
+
+    def mark(self, stage):
+        self.stages[stage] = round((time.time() - self.started) * 1000)
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def finish(self, outcome="ok"):
+        """Close the record (first call wins) and dump it if it was slow"""
+        if self.outcome is not None:
+            return
+        self.outcome = outcome
+        self.total_ms = round((time.time() - self.started) * 1000)
+        self.recorder._finished(self)
+
+    def response_ms(self):
+        """Time until the answer reached the user: playback start for spoken turns
+
+        Playback itself is excluded, so long answers read aloud are not slow turns.
+        """
+        for stage in ("speak_start", "speak_queued"):
+            if stage in self.stages:
+                return self.stages[stage]
+        return self.total_ms
+
+    def snapshot(self):
+        return dict(
+            self.fields,
+            id=self.id,
+            source=self.source,
+            started=time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            stages=dict(self.stages),
+            total_ms=self.total_ms if self.total_ms is not None
+                     else round((time.time() - self.started) * 1000),
+            response_ms=self.response_ms() if self.total_ms is not None else None,
+            outcome=self.outcome or "in_progress",
+        )
+
+class FlightRecorder:
+    """Always-on ring buffer of recent turns; slow turns are appended to a JSONL file"""
+
+    def __init__(self, size=200, slow_ms=5000, dump_path="slow_turns.jsonl"):
+        self.slow_ms = slow_ms
+        self.dump_path = dump_path
+        self._turns = deque(maxlen=size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.slow = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            size=int(os.getenv("FLIGHT_RECORDER_SIZE", "200")),
+            slow_ms=float(os.getenv("FLIGHT_RECORDER_SLOW_MS", "5000")),
+            dump_path=os.getenv("FLIGHT_RECORDER_DUMP", "slow_turns.jsonl") or None,
+        )
+
+    def start(self, source, **fields):
+        """Begin recording a turn; it is visible (as in progress) right away"""
+        record = TurnRecord(self, next(self._ids), source, **fields)
+        with self._lock:
+            self._turns.append(record)
+            self.recorded += 1
+        return record
+
+    def recent(self, limit=20, slow_only=False):
+        """Snapshots of the latest turns, newest first"""
+        with self._lock:
+            records = list(self._turns)
+        snapshots = []
+        for record in reversed(records):
+            if slow_only and (record.total_ms is None or record.response_ms() < self.slow_ms):
+                continue
+            snapshots.append(record.snapshot())
+            if len(snapshots) >= limit:
+                break
+        return snapshots
+
+    def stats(self):
+        with self._lock:
+            return {
+                "buffered": len(self._turns),
+                "capacity": self._turns.maxlen,
+                "recorded": self.recorded,
+                "slow": self.slow,
+                "slow_ms": self.slow_ms,
+                "dump_path": self.dump_path,
+            }
+
+    def _finished(self, record):
+        if record.response_ms() < self.slow_ms:
+            return
+        with self._lock:
+            self.slow += 1
+            if not self.dump_path:
+                return
+            try:
+                with open(self.dump_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record.snapshot(), ensure_ascii=False) + "\n")
+            except OSError as e:
+                print(f"⚠️ Turn lambat tidak bisa disimpan: {e}")
+
+def format_turn(entry):
+    """One-line summary of a turn snapshot for the CLI"""
+    stages = " ".join(f"{stage}={ms}ms" for stage, ms in entry["stages"].items())
+    target = entry.get("target") or entry.get("tier") or "-"
+    return (f"#{entry['id']} {entry['started'][11:]} {entry['source']:<10} "
+            f"{entry['total_ms']:>6}ms {entry['outcome']:<11} {target:<12} {stages}")
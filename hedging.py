@@ -0,0 +1,221 @@
+"""
+Hedged Chat Completion Requests
+Mengirim request cadangan ke deployment kedua bila token pertama terlambat, untuk memangkas tail latency
+
+Author: Edhot Purwoko - Microsoft Indonesia
+License: MIT - Free to use
+Disclaimer: Provided "as is" without warranty. Use at your own risk.
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+def collect_text(stream, on_usage=None):
+    """Join the content deltas of a chat completion stream
+
+    on_usage(usage) is called for the usage chunk requested with stream_options.
+    """
+    parts = []
+    for update in stream:
+        if on_usage is not None and getattr(update, "usage", None) is not None:
+            on_usage(update.usage)
+        if update.choices and update.choices[0].delta.content:
+            parts.append(update.choices[0].delta.content)
+    return "".join(parts)
+
+class _Attempt:
+    """One racing request; reads until its first content token, then waits for the verdict"""
+
+    def __init__(self, target, kind):
+        self.target = target
+        self.kind = kind  # "primary", "hedge" or "failover"
+        self.started = time.time()
+        self.buffer = []
+        self.iterator = None
+        self._stream = None
+        self._cancelled = False
+        self._lock = threading.Lock()
+
+    def run(self, router, messages, params, events):
+        try:
+            stream = router.complete_on(self.target, messages, stream=True, **params)
+            with self._lock:
+                self._stream = stream
+                cancelled = self._cancelled
+            if cancelled:
+                stream.close()
+                return
+
+            iterator = iter(stream)
+            for chunk in iterator:
+                self.buffer.append(chunk)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    break
+            self.iterator = iterator
+            events.put(("ready", self, None))
+        except Exception as e:
+            events.put(("error", self, e))
+
+    def cancel(self):
+        with self._lock:
+            self._cancelled = True
+            stream = self._stream
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+class HedgedStream:
+    """The winning stream, replaying the chunks read during the race"""
+
+    def __init__(self, attempt):
+        self.attempt = attempt
+
+    def __iter__(self):
+        for chunk in self.attempt.buffer:
+            yield chunk
+        if self.attempt.iterator is not None:
+            for chunk in self.attempt.iterator:
+                yield chunk
+
+    def close(self):
+        self.attempt.cancel()
+
+class HedgingPolicy:
+    """Percentile-delayed hedging with a budget cap on duplicate requests"""
+
+    def __init__(self, percentile=95, min_delay=0.25, max_delay=3.0, budget=0.1,
+                 window=200, min_samples=20):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.requests = 0
+        self.hedges_fired = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+        self.no_secondary = 0
+        self.failovers = 0
+
+    @classmethod
+    def from_env(cls):
+        """Return a policy if AZURE_OPENAI_HEDGE is enabled, else None"""
+        if os.getenv("AZURE_OPENAI_HEDGE", "false").lower() not in ("1", "true", "yes"):
+            return None
+        return cls(
+            percentile=float(os.getenv("AZURE_OPENAI_HEDGE_PERCENTILE", "95")),
+            min_delay=float(os.getenv("AZURE_OPENAI_HEDGE_MIN_DELAY_MS", "250")) / 1000,
+            max_delay=float(os.getenv("AZURE_OPENAI_HEDGE_MAX_DELAY_MS", "3000")) / 1000,
+            budget=float(os.getenv("AZURE_OPENAI_HEDGE_BUDGET", "0.1")),
+        )
+
+    def delay(self):
+        """Hedge delay: the configured percentile of recent first-token times"""
+        with self._lock:
+            return self._delay_locked()
+
+    def open_stream(self, router, messages, tier=None, **params):
+        """Start the primary request and hedge it if the first token is late"""
+        with self._lock:
+            self.requests += 1
+
+        events = queue.Queue()
+        primary = router.choose(tier)
+        if primary is None:
+            raise RuntimeError("Tidak ada deployment Azure OpenAI yang tersedia")
+
+        attempts = [self._start(_Attempt(primary, "primary"), router, messages, params, events)]
+        errors = []
+        deadline = time.time() + self.delay()
+        hedge_decided = False
+
+        while True:
+            timeout = None if hedge_decided else max(0.0, deadline - time.time())
+            try:
+                kind, attempt, error = events.get(timeout=timeout)
+            except queue.Empty:
+                hedge_decided = True
+                if self._take_budget():
+                    secondary = router.choose(tier, exclude=[a.target for a in attempts])
+                    if secondary is None:
+                        with self._lock:
+                            self.no_secondary += 1
+                    else:
+                        with self._lock:
+                            self.hedges_fired += 1
+                        attempts.append(self._start(_Attempt(secondary, "hedge"), router, messages, params, events))
+                continue
+
+            if kind == "ready":
+                for other in attempts:
+                    if other is not attempt:
+                        other.cancel()
+                self._observe(attempt)
+                return HedgedStream(attempt)
+
+            errors.append(error)
+            if len(errors) < len(attempts):
+                continue
+
+            # Everything failed; fail over once to another target if none was tried yet
+            secondary = None if hedge_decided else router.choose(tier, exclude=[a.target for a in attempts])
+            hedge_decided = True
+            if secondary is None:
+                raise errors[0]
+            with self._lock:
+                self.failovers += 1
+            attempts.append(self._start(_Attempt(secondary, "failover"), router, messages, params, events))
+
+    def stats(self):
+        """Hedging counters and the current hedge delay"""
+        delay = self.delay()
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedges_fired": self.hedges_fired,
+                "hedge_wins": self.hedge_wins,
+                "hedge_rate": round(self.hedges_fired / self.requests, 3) if self.requests else 0.0,
+                "win_rate": round(self.hedge_wins / self.hedges_fired, 3) if self.hedges_fired else 0.0,
+                "budget_denied": self.budget_denied,
+                "no_secondary": self.no_secondary,
+                "failovers": self.failovers,
+                "delay_ms": round(delay * 1000),
+            }
+
+    def _start(self, attempt, router, messages, params, events):
+        thread = threading.Thread(target=attempt.run, args=(router, messages, params, events))
+        thread.daemon = True
+        thread.start()
+        return attempt
+
+    def _take_budget(self):
+        with self._lock:
+            if self.hedges_fired + 1 > self.budget * self.requests:
+                self.budget_denied += 1
+                return False
+            return True
+
+    def _observe(self, winner):
+        elapsed = time.time() - winner.started
+        with self._lock:
+            if winner.kind == "hedge":
+                self.hedge_wins += 1
+                # The primary was at least this slow; keep the tail visible to the percentile
+                elapsed += self._delay_locked()
+            self._samples.append(elapsed)
+
+    def _delay_locked(self):
+        if not self._samples or len(self._samples) < self.min_samples:
+            return self.max_delay
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return min(self.max_delay, max(self.min_delay, ordered[index]))
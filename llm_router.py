@@ -0,0 +1,310 @@
+"""
+Latency-Aware Azure OpenAI Routing
+Memilih deployment/region Azure OpenAI tercepat dan tersehat untuk setiap request
+
+Author: Edhot Purwoko - Microsoft Indonesia
+License: MIT - Free to use
+Disclaimer: Provided "as is" without warranty. Use at your own risk.
+"""
+
+import json
+import os
+import threading
+import time
+from openai import AzureOpenAI, RateLimitError
+
+class DeploymentTarget:
+    """One endpoint/deployment pair with live latency and health statistics"""
+
+    def __init__(self, name, endpoint, deployment, api_key, api_version, weight=1.0, tier="main"):
+        self.name = name
+        self.endpoint = endpoint
+        self.deployment = deployment
+        self.weight = max(float(weight), 0.01)
+        self.tier = tier
+        self.client = AzureOpenAI(
+            api_version=api_version,
+            azure_endpoint=endpoint,
+            api_key=api_key,
+        )
+
+        # Exponentially weighted statistics; ttft from streams, latency from
+        # complete non-streaming responses
+        self.ttft = None
+        self.latency = None
+        self.error_rate = 0.0
+        self.throttle_rate = 0.0
+
+        self.requests = 0
+        self.errors = 0
+        self.throttles = 0
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.eject_seconds = 0.0
+        self.probing = False
+
+    def score(self):
+        """Expected cost of sending a request here; lower is better
+
+        Ranked by time to first token; a target only used for non-streaming
+        calls falls back to its full response latency.
+        """
+        ttft = self.ttft if self.ttft is not None else self.latency
+        if ttft is None:
+            # Unmeasured targets are tried first so every target gets a baseline,
+            # unless they have only ever failed
+            if not self.errors:
+                return 0.0
+            ttft = 1.0
+        penalty = 1.0 + 4.0 * self.error_rate + 4.0 * self.throttle_rate + 0.25 * self.in_flight
+        return ttft * penalty / self.weight
+
+    def snapshot(self, now=None):
+        now = now or time.time()
+        return {
+            "name": self.name,
+            "deployment": self.deployment,
+            "tier": self.tier,
+            "weight": self.weight,
+            "ttft_ms": round(self.ttft * 1000) if self.ttft is not None else None,
+            "latency_ms": round(self.latency * 1000) if self.latency is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "throttle_rate": round(self.throttle_rate, 3),
+            "requests": self.requests,
+            "errors": self.errors,
+            "throttles": self.throttles,
+            "in_flight": self.in_flight,
+            "ejected": self.ejected_until > now,
+        }
+
+class TrackedStream:
+    """Wraps an OpenAI stream to record time-to-first-token and failures"""
+
+    def __init__(self, router, target, stream, started, probe=False):
+        self.router = router
+        self.target = target
+        self.stream = stream
+        self.started = started
+        self.probe = probe
+        self.closed = False
+        self._recorded = False
+        self._released = False
+
+    def __iter__(self):
+        try:
+            for chunk in self.stream:
+                if not self._recorded and chunk.choices and chunk.choices[0].delta.content:
+                    self._record_success()
+                yield chunk
+        except Exception as e:
+            if not self.closed and not self._recorded:
+                self._recorded = True
+                self.router.record_failure(self.target, e)
+            raise
+        finally:
+            if not self._recorded and not self.closed:
+                self._record_success()
+            self._release()
+
+    def close(self):
+        self.closed = True
+        try:
+            self.stream.close()
+        finally:
+            self._release()
+
+    def _release(self):
+        if not self._released:
+            self._released = True
+            self.router.release(self.target, self.probe)
+
+    def _record_success(self):
+        self._recorded = True
+        self.router.record_success(self.target, ttft=time.time() - self.started)
+
+class LatencyRouter:
+    """Send each request to the healthiest, fastest target; eject and re-probe failing ones"""
+
+    def __init__(self, targets, alpha=0.2, eject_after=3, eject_seconds=30.0, max_eject_seconds=300.0):
+        if not targets:
+            raise ValueError("Minimal satu deployment Azure OpenAI harus dikonfigurasi")
+        self.targets = targets
+        self.alpha = alpha
+        self.eject_after = eject_after
+        self.base_eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Build targets from AZURE_OPENAI_TARGETS (JSON list) or the single-endpoint variables"""
+        api_key = os.getenv("AZURE_OPENAI_API_KEY")
+        api_version = os.getenv("AZURE_OPENAI_API_VERSION")
+        targets = []
+
+        raw = os.getenv("AZURE_OPENAI_TARGETS")
+        if raw:
+            for i, item in enumerate(json.loads(raw)):
+                targets.append(DeploymentTarget(
+                    name=item.get("name", f"target-{i}"),
+                    endpoint=item["endpoint"],
+                    deployment=item["deployment"],
+                    api_key=item.get("api_key", api_key),
+                    api_version=item.get("api_version", api_version),
+                    weight=item.get("weight", 1.0),
+                    tier=item.get("tier", "main"),
+                ))
+        else:
+            targets.append(DeploymentTarget(
+                name="primary",
+                endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+                deployment=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
+                api_key=api_key,
+                api_version=api_version,
+            ))
+
+        # Shorthand for a small, fast deployment on the primary endpoint
+        fast_deployment = os.getenv("AZURE_OPENAI_FAST_DEPLOYMENT_NAME")
+        if fast_deployment:
+            targets.append(DeploymentTarget(
+                name="fast",
+                endpoint=os.getenv("AZURE_OPENAI_ENDPOINT", targets[0].endpoint if targets else None),
+                deployment=fast_deployment,
+                api_key=api_key,
+                api_version=api_version,
+                tier="fast",
+            ))
+
+        return cls(
+            targets,
+            eject_after=int(os.getenv("AZURE_OPENAI_EJECT_AFTER", "3")),
+            eject_seconds=float(os.getenv("AZURE_OPENAI_EJECT_SECONDS", "30")),
+        )
+
+    def candidates(self, tier=None, exclude=()):
+        """Targets ordered best first; ejected targets whose cooldown expired are re-probed"""
+        now = time.time()
+        with self._lock:
+            pool = [t for t in self.targets if t not in exclude and (tier is None or t.tier == tier)]
+            healthy = [t for t in pool if t.ejected_until <= now]
+            probes = [t for t in healthy if t.eject_seconds and not t.probing]
+            if probes:
+                # Half-open: one request at a time goes to a recovering target
+                probe = probes[0]
+                probe.probing = True
+                ordered = [probe] + sorted((t for t in healthy if t is not probe and not t.eject_seconds),
+                                           key=lambda t: t.score())
+            else:
+                ordered = sorted((t for t in healthy if not t.eject_seconds), key=lambda t: t.score())
+
+            # When everything is ejected, fall back to the target that recovers soonest
+            if not ordered and pool:
+                ordered = sorted(pool, key=lambda t: t.ejected_until)
+            return ordered
+
+    def tiers(self):
+        """Names of the configured tiers"""
+        return {t.tier for t in self.targets}
+
+    def choose(self, tier=None, exclude=()):
+        """Return the best target, or None if none match"""
+        ordered = self.candidates(tier, exclude)
+        return ordered[0] if ordered else None
+
+    def complete(self, messages, stream=False, tier=None, attempts=2, **params):
+        """Create a chat completion on the best target, failing over on errors"""
+        tried = []
+        last_error = None
+        for _ in range(attempts):
+            target = self.choose(tier, exclude=tried)
+            if target is None:
+                break
+            tried.append(target)
+            try:
+                return self.complete_on(target, messages, stream=stream, **params)
+            except Exception as e:
+                last_error = e
+        raise last_error or RuntimeError("Tidak ada deployment Azure OpenAI yang tersedia")
+
+    def complete_on(self, target, messages, stream=False, **params):
+        """Create a chat completion on a specific target and record its outcome"""
+        with self._lock:
+            target.requests += 1
+            target.in_flight += 1
+            # Only the half-open probe is sent to a target that is still backing off
+            probe = target.probing
+        started = time.time()
+        try:
+            response = target.client.chat.completions.create(
+                stream=stream, messages=messages, model=target.deployment, **params
+            )
+        except Exception as e:
+            self.record_failure(target, e)
+            self.release(target, probe)
+            raise
+
+        if stream:
+            return TrackedStream(self, target, response, started, probe)
+
+        self.record_success(target, latency=time.time() - started)
+        self.release(target, probe)
+        return response
+
+    def record_success(self, target, ttft=None, latency=None):
+        with self._lock:
+            if ttft is not None:
+                target.ttft = self._ewma(target.ttft, ttft)
+            if latency is not None:
+                target.latency = self._ewma(target.latency, latency)
+            target.error_rate *= 1 - self.alpha
+            target.throttle_rate *= 1 - self.alpha
+            target.consecutive_failures = 0
+            target.eject_seconds = 0.0
+            target.probing = False
+
+    def record_failure(self, target, error):
+        throttled = isinstance(error, RateLimitError)
+        with self._lock:
+            target.errors += 1
+            target.error_rate = (1 - self.alpha) * target.error_rate + self.alpha
+            if throttled:
+                target.throttles += 1
+                target.throttle_rate = (1 - self.alpha) * target.throttle_rate + self.alpha
+            target.consecutive_failures += 1
+
+            retry_after = _retry_after_seconds(error) if throttled else None
+            if target.probing or retry_after or target.consecutive_failures >= self.eject_after:
+                # Back off exponentially while a target keeps failing its probes
+                if target.eject_seconds:
+                    target.eject_seconds = min(target.eject_seconds * 2, self.max_eject_seconds)
+                else:
+                    target.eject_seconds = self.base_eject_seconds
+                cooldown = max(target.eject_seconds, retry_after or 0)
+                target.ejected_until = time.time() + cooldown
+                print(f"⚠️ Deployment {target.name} dinonaktifkan sementara ({cooldown:.0f}s): {error}")
+            target.probing = False
+
+    def release(self, target, probe=False):
+        with self._lock:
+            target.in_flight = max(0, target.in_flight - 1)
+            # A probe closed before its first token has no verdict; let the next request probe
+            if probe:
+                target.probing = False
+
+    def _ewma(self, current, sample):
+        return sample if current is None else (1 - self.alpha) * current + self.alpha * sample
+
+    def stats(self):
+        """Per-target routing statistics"""
+        now = time.time()
+        with self._lock:
+            return [t.snapshot(now) for t in self.targets]
+
+def _retry_after_seconds(error):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
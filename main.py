@@ -9,6 +9,8 @@ Disclaimer: Provided "as is" without warranty. Use at your own risk.
 """
 
 from chatbot import SimpleChatbot
+from flight_recorder import format_turn
+from profiling import Profiler
 
 def main():
     print("=" * 50)
@@ -18,6 +20,9 @@ def main():
     print("Ketik 'quit', 'exit', atau 'keluar' untuk mengakhiri percakapan")
     print("Ketik 'clear' untuk menghapus riwayat percakapan")
     print("Ketik 'stream' untuk toggle streaming mode")
+    print("Ketik 'turns' untuk melihat timing turn terakhir ('turns slow' untuk yang lambat)")
+    print("Ketik 'profile on [memory]' / 'profile off' untuk memprofil pesan berikutnya")
+    print("Tekan Ctrl-C saat bot menjawab untuk membatalkan respons")
     print("-" * 50)
     
     # Initialize chatbot
@@ -29,6 +34,8 @@ def main():
         return
     
     streaming_mode = False
+    profiler = Profiler.from_env()
+    profile_session = None
     
     while True:
         try:
@@ -46,6 +53,29 @@ def main():
                 print("🗑️ Riwayat percakapan telah dihapus!")
                 continue
             
+            # Profile the following messages ('profile on [memory]' ... 'profile off')
+            if user_input.lower().startswith('profile'):
+                args = user_input.lower().split()[1:]
+                if args[:1] == ['on']:
+                    if profile_session is None:
+                        profile_session = profiler.start("cli", memory='memory' in args)
+                    print("📈 Profiling aktif" if profile_session else "⚠️ Profiling lain sedang berjalan")
+                elif args[:1] == ['off'] and profile_session is not None:
+                    profile_session.stop()
+                    profile_session = None
+                else:
+                    print("⚠️ Contoh: profile on, profile on memory, profile off")
+                continue
+            
+            # Show the flight recorder ('turns slow' for slow turns only)
+            if user_input.lower() in ('turns', 'turns slow'):
+                turns = bot.get_recent_turns(10, slow_only=user_input.lower().endswith('slow'))
+                if not turns:
+                    print("📭 Belum ada turn yang tercatat")
+                for entry in turns:
+                    print(format_turn(entry))
+                continue
+            
             # Check for stream toggle
             if user_input.lower() == 'stream':
                 streaming_mode = not streaming_mode
@@ -60,15 +90,21 @@ def main():
             
             print("\n🤖 Bot: ", end="")
             
-            if streaming_mode:
-                # Streaming response
-                for chunk in bot.get_response(user_input, stream=True):
-                    print(chunk, end="", flush=True)
-                print()  # New line after streaming
-            else:
-                # Regular response
-                response = bot.get_response(user_input, stream=False)
-                print(response)
+            turn = bot.start_turn(user_input, source="cli")
+            try:
+                if streaming_mode:
+                    # Streaming response
+                    for chunk in turn.stream():
+                        print(chunk, end="", flush=True)
+                    print()  # New line after streaming
+                else:
+                    # Regular response
+                    response = turn.result()
+                    print(response)
+            except KeyboardInterrupt:
+                # Ctrl-C during generation cancels the turn, not the program
+                turn.cancel()
+                print("\n⏹️ Respons dibatalkan")
                 
         except KeyboardInterrupt:
             print("\n\n👋 Program dihentikan. Sampai jumpa!")
@@ -76,6 +112,10 @@ def main():
         except Exception as e:
             print(f"\n❌ Terjadi error: {e}")
             print("Silakan coba lagi.")
+    
+    # Write out a capture that is still running
+    if profile_session is not None:
+        profile_session.stop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
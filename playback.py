@@ -0,0 +1,161 @@
+"""
+Speech Playback Worker
+Satu thread pemutaran suara dengan antrean terbatas, agar input berikutnya bisa diproses selama bot berbicara
+
+Author: Edhot Purwoko - Microsoft Indonesia
+License: MIT - Free to use
+Disclaimer: Provided "as is" without warranty. Use at your own risk.
+"""
+
+import queue
+import threading
+
+# CLI playback modes: new input stops the answer being spoken, or waits behind it
+INTERRUPT = "interrupt"
+QUEUE = "queue"
+MODES = (INTERRUPT, QUEUE)
+
+def parse_mode(value, default=QUEUE):
+    value = (value or "").strip().lower()
+    return value if value in MODES else default
+
+class PlaybackItem:
+    """One queued utterance; wait() blocks until it was played or skipped"""
+
+    def __init__(self, text, on_start=None, on_done=None):
+        self.text = text
+        self.on_start = on_start
+        self.on_done = on_done
+        self.result = None
+        self.cancelled = False
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def cancel(self):
+        """Skip the utterance if it has not started playing yet"""
+        self.cancelled = True
+
+    def wait(self, timeout=None):
+        """Return the playback result (False if skipped), or None on timeout"""
+        if not self._done.wait(timeout):
+            return None
+        return self.result
+
+class PlaybackWorker:
+    """Plays queued utterances one after another on a single long-lived thread
+
+    speak(text) plays one utterance and returns True on success; stop() halts
+    the utterance currently playing. enqueue() blocks while max_queue
+    utterances are already waiting.
+    """
+
+    def __init__(self, speak, stop, max_queue=4):
+        self.speak = speak
+        self.stop = stop
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._current = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self.played = 0
+        self.failed = 0
+        self.dropped = 0
+        self.interrupts = 0
+
+    def enqueue(self, text, on_start=None, on_done=None):
+        """Queue text for playback and return its PlaybackItem"""
+        item = PlaybackItem(text, on_start, on_done)
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+        self._queue.put(item)
+        return item
+
+    @property
+    def busy(self):
+        """True while something is playing or waiting to play"""
+        return self._current is not None or not self._queue.empty()
+
+    def interrupt(self):
+        """Drop every queued utterance and stop the one playing; returns True if anything was dropped"""
+        dropped = False
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            item.cancel()
+            self._finish(item, False)
+            self._queue.task_done()
+            self.dropped += 1
+            dropped = True
+
+        current = self._current
+        if current is not None:
+            current.cancel()
+            self.stop()
+            dropped = True
+        if dropped:
+            self.interrupts += 1
+        return dropped
+
+    def cancel(self, item):
+        """Skip item if it is still queued, or stop it if it is playing"""
+        item.cancel()
+        if self._current is item:
+            self.stop()
+
+    def wait(self):
+        """Block until everything queued so far has been played or dropped"""
+        self._queue.join()
+
+    def stats(self):
+        return {
+            "worker_running": self._thread is not None and self._thread.is_alive(),
+            "playing": self._current is not None,
+            "queued": self._queue.qsize(),
+            "max_queue": self._queue.maxsize,
+            "played": self.played,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "interrupts": self.interrupts,
+        }
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item.cancelled:
+                    self.dropped += 1
+                    self._finish(item, False)
+                    continue
+                self._current = item
+                if item.on_start is not None:
+                    item.on_start()
+                result = self.speak(item.text)
+                # An utterance stopped by interrupt() is counted there, not as a failure
+                if result:
+                    self.played += 1
+                elif not item.cancelled:
+                    self.failed += 1
+                self._finish(item, bool(result) and not item.cancelled)
+            except Exception as e:
+                print(f"❌ Error saat memutar suara: {str(e)}")
+                self.failed += 1
+                self._finish(item, False)
+            finally:
+                self._current = None
+                self._queue.task_done()
+
+    def _finish(self, item, result):
+        item.result = result
+        if item.on_done is not None:
+            try:
+                item.on_done(result)
+            except Exception:
+                pass
+        item._done.set()
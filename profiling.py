@@ -0,0 +1,248 @@
+"""
+On-Demand Profiling
+Profil CPU (cProfile dan sampling semua thread) dan alokasi memori (tracemalloc) untuk request atau jendela waktu tertentu
+
+Author: Edhot Purwoko - Microsoft Indonesia
+License: MIT - Free to use
+Disclaimer: Provided "as is" without warranty. Use at your own risk.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+class StackSampler:
+    """Samples the stacks of every thread at a fixed interval (wall clock)
+
+    cProfile only sees the thread that enabled it, while a turn spends most
+    of its time on pump, playback and pool threads; the sampler covers them.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = 0
+        self.stacks = Counter()  # (thread name, (outermost frame, ..., innermost)) -> samples
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler")
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                # Numbered pool/worker threads are grouped under one name
+                name = re.sub(r"[-_]\d+", "", names.get(ident, str(ident)))
+                self.stacks[(name, tuple(reversed(stack)))] += 1
+            self.samples += 1
+
+    def write(self, path, title, top=40):
+        """Summary of the busiest functions and threads"""
+        own = Counter()
+        total = Counter()
+        threads = Counter()
+        for (name, stack), count in self.stacks.items():
+            threads[name] += count
+            if stack:
+                own[stack[-1]] += count
+            for function in set(stack):
+                total[function] += count
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"{title}: {self.samples} samples every {self.interval * 1000:g} ms, "
+                    f"{len(threads)} threads\n\nSamples per thread:\n")
+            for name, count in threads.most_common():
+                f.write(f"{count:8d}  {name}\n")
+            f.write("\nTop functions (own samples):\n")
+            for function, count in own.most_common(top):
+                f.write(f"{count:8d}  {function}\n")
+            f.write("\nTop functions (including callees):\n")
+            for function, count in total.most_common(top):
+                f.write(f"{count:8d}  {function}\n")
+
+    def write_folded(self, path):
+        """Stacks in the folded format read by flamegraph.pl and speedscope"""
+        with open(path, "w", encoding="utf-8") as f:
+            for (name, stack), count in sorted(self.stacks.items()):
+                f.write(";".join((name,) + stack) + f" {count}\n")
+
+class ProfileSession:
+    """One running capture; stop() writes the results and returns the file paths"""
+
+    def __init__(self, profiler, name, memory):
+        self.profiler = profiler
+        self.name = re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_") or "profile"
+        self.memory = memory
+        self.started = time.time()
+        self.cpu = cProfile.Profile()
+        self.sampler = StackSampler(profiler.sample_interval)
+        self.baseline = None
+        self._stopped = False
+        self._started_tracing = False
+
+        if memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+                self._started_tracing = True
+            self.baseline = tracemalloc.take_snapshot()
+        self.sampler.start()
+        self.cpu.enable()
+
+    def stop(self):
+        if self._stopped:
+            return []
+        self._stopped = True
+        self.cpu.disable()
+        self.sampler.stop()
+        try:
+            return self.profiler._write(self)
+        finally:
+            if self._started_tracing:
+                tracemalloc.stop()
+            self.profiler._release()
+
+class Profiler:
+    """Opt-in profiling; when nothing is armed the only cost is one comparison per request
+
+    Captures are triggered per request (a header carrying the profiling
+    token), for every request within an armed time window, or explicitly with
+    start()/stop(). Only one capture runs at a time; requests arriving
+    meanwhile are not profiled. Results go to directory; only the newest keep
+    captures are retained.
+    """
+
+    def __init__(self, directory="profiles", keep=20, token=None, top=40, sample_ms=5):
+        self.directory = directory
+        self.keep = keep
+        self.token = token
+        self.top = top
+        self.sample_interval = max(sample_ms, 1) / 1000
+        self.window_until = 0.0
+        self.window_memory = False
+        self.captures = 0
+        self.skipped = 0
+        self._busy = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            directory=os.getenv("PROFILE_DIR", "profiles"),
+            keep=int(os.getenv("PROFILE_KEEP", "20")),
+            token=os.getenv("PROFILE_TOKEN") or None,
+            sample_ms=float(os.getenv("PROFILE_SAMPLE_MS", "5")),
+        )
+
+    def arm(self, seconds, memory=False):
+        """Profile every request for the next seconds (0 disarms)"""
+        self.window_memory = memory
+        self.window_until = time.time() + seconds if seconds > 0 else 0.0
+
+    def wanted(self, headers):
+        """(profile?, memory?) for a request with the given headers"""
+        if self.window_until and time.time() < self.window_until:
+            return True, self.window_memory
+        if self.token is None:
+            return False, False
+        mode = headers.get("X-Profile")
+        if not mode or headers.get("X-Profile-Token") != self.token:
+            return False, False
+        return True, mode.lower() == "memory"
+
+    def authorized(self, headers):
+        return self.token is not None and headers.get("X-Profile-Token") == self.token
+
+    def start(self, name, memory=False):
+        """Begin a capture, or return None if another one is running"""
+        if not self._busy.acquire(blocking=False):
+            self.skipped += 1
+            return None
+        try:
+            return ProfileSession(self, name, memory)
+        except Exception:
+            self._busy.release()
+            raise
+
+    def files(self):
+        """Capture files, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        names = [n for n in os.listdir(self.directory) if n.endswith((".prof", ".txt"))]
+        return sorted(names, reverse=True)
+
+    def status(self):
+        remaining = self.window_until - time.time()
+        return {
+            "armed_seconds": round(remaining) if remaining > 0 else 0,
+            "armed_memory": self.window_memory if remaining > 0 else False,
+            "header_enabled": self.token is not None,
+            "running": self._busy.locked(),
+            "captures": self.captures,
+            "skipped": self.skipped,
+            "directory": self.directory,
+            "files": self.files(),
+        }
+
+    def _release(self):
+        self._busy.release()
+
+    def _write(self, session):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(session.started))
+        base = os.path.join(self.directory, f"{stamp}-{int(session.started * 1000) % 1000:03d}-{session.name}")
+        paths = [f"{base}.prof", f"{base}.cpu.txt", f"{base}.threads.txt", f"{base}.folded.txt"]
+
+        session.cpu.dump_stats(paths[0])
+        summary = io.StringIO()
+        summary.write(f"{session.name}: {time.time() - session.started:.3f}s\n\n")
+        pstats.Stats(session.cpu, stream=summary).sort_stats("cumulative").print_stats(self.top)
+        with open(paths[1], "w", encoding="utf-8") as f:
+            f.write(summary.getvalue())
+        session.sampler.write(paths[2], session.name, self.top)
+        session.sampler.write_folded(paths[3])
+
+        if session.memory:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            paths.append(f"{base}.mem.txt")
+            with open(paths[-1], "w", encoding="utf-8") as f:
+                f.write(f"{session.name}: traced {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB\n\n")
+                f.write("Top allocations since the capture started:\n")
+                for stat in snapshot.compare_to(session.baseline, "lineno")[:self.top]:
+                    f.write(f"{stat}\n")
+
+        self.captures += 1
+        self._prune()
+        print(f"📈 Profil disimpan: {base}.*")
+        return paths
+
+    def _prune(self):
+        captures = {}
+        for name in os.listdir(self.directory):
+            if name.endswith((".prof", ".txt")):
+                captures.setdefault(name.split(".", 1)[0], []).append(name)
+        for stem in sorted(captures, reverse=True)[self.keep:]:
+            for name in captures[stem]:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
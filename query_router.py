@@ -0,0 +1,107 @@
+"""
+Query-Complexity Model Routing
+Mengarahkan pertanyaan sederhana ke deployment kecil yang cepat, dan pertanyaan kompleks ke model utama
+
+Author: Edhot Purwoko - Microsoft Indonesia
+License: MIT - Free to use
+Disclaimer: Provided "as is" without warranty. Use at your own risk.
+"""
+
+import logging
+import os
+import re
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+SIMPLE = "simple"
+COMPLEX = "complex"
+
+# Only words that carry no question on their own; "apa", "tidak" or "you" also
+# start real questions ("apa itu ...", "can you ...")
+GREETINGS = {
+    "halo", "hallo", "hai", "hi", "hello", "hey", "pagi", "siang", "sore", "malam",
+    "selamat", "terima", "kasih", "makasih", "thanks", "thank", "ok", "oke",
+    "ya", "yes", "no", "bye", "dah", "sampai", "jumpa", "good", "morning",
+    "evening", "night", "kabar",
+}
+
+# Words that signal reasoning, long-form or multi-step answers
+COMPLEX_MARKERS = re.compile(
+    r"\b(jelaskan|explain|mengapa|kenapa|why|bandingkan|compare|perbedaan|difference|"
+    r"langkah|steps?|cara|how to|bagaimana|analisis|analy[sz]e|buatkan|tuliskan|write|"
+    r"ringkas|summari[sz]e|terjemahkan|translate|hitung|calculate|kode|code|script|"
+    r"rencana|plan|detail|contoh|examples?)\b",
+    re.IGNORECASE,
+)
+
+class QueryRouter:
+    """Cheap local classifier choosing the deployment tier and token limit per turn"""
+
+    def __init__(self, fast_tier="fast", main_tier="main", simple_max_words=12,
+                 simple_max_tokens=300, complex_max_tokens=1000, window=200):
+        self.fast_tier = fast_tier
+        self.main_tier = main_tier
+        self.simple_max_words = simple_max_words
+        self.simple_max_tokens = simple_max_tokens
+        self.complex_max_tokens = complex_max_tokens
+        self._lock = threading.Lock()
+        self._latencies = {SIMPLE: deque(maxlen=window), COMPLEX: deque(maxlen=window)}
+        self._counts = {SIMPLE: 0, COMPLEX: 0}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            simple_max_words=int(os.getenv("QUERY_ROUTER_SIMPLE_MAX_WORDS", "12")),
+            simple_max_tokens=int(os.getenv("QUERY_ROUTER_SIMPLE_MAX_TOKENS", "300")),
+            complex_max_tokens=int(os.getenv("QUERY_ROUTER_COMPLEX_MAX_TOKENS", "1000")),
+        )
+
+    def classify(self, message):
+        """Return SIMPLE or COMPLEX for a user message"""
+        text = (message or "").strip()
+        words = re.findall(r"\w+", text.lower())
+
+        if "```" in text or text.count("\n") >= 2:
+            return COMPLEX
+        if words and all(word in GREETINGS for word in words):
+            return SIMPLE
+        if COMPLEX_MARKERS.search(text):
+            return COMPLEX
+        # Several questions in one turn usually need a structured answer
+        if len(words) <= self.simple_max_words and text.count("?") <= 1:
+            return SIMPLE
+        return COMPLEX
+
+    def route(self, message, available_tiers=()):
+        """Return (label, tier, max_completion_tokens) for a user message
+
+        The small token cap only applies on the fast tier; without one, simple
+        messages go to the main model with its usual limit.
+        """
+        label = self.classify(message)
+        if label == SIMPLE and self.fast_tier in available_tiers:
+            return label, self.fast_tier, self.simple_max_tokens
+        return label, self.main_tier, self.complex_max_tokens
+
+    def record(self, label, tier, latency):
+        """Record and log the latency of a routed turn"""
+        with self._lock:
+            self._counts[label] += 1
+            self._latencies[label].append(latency)
+        logger.info("query route class=%s tier=%s latency_ms=%d", label, tier, latency * 1000)
+
+    def stats(self):
+        """Per-class turn counts and latency percentiles"""
+        with self._lock:
+            result = {}
+            for label, samples in self._latencies.items():
+                ordered = sorted(samples)
+                result[label] = {
+                    "turns": self._counts[label],
+                    "p50_ms": round(ordered[len(ordered) // 2] * 1000) if ordered else None,
+                    "p95_ms": round(ordered[min(len(ordered) - 1, len(ordered) * 95 // 100)] * 1000)
+                              if ordered else None,
+                }
+            return result
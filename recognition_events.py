@@ -0,0 +1,291 @@
+"""
+Recognition Event Stream
+Event pengenalan suara berkelanjutan (interim, final, sesi, pembatalan) lewat antrean terbatas per subscriber
+
+Author: Edhot Purwoko - Microsoft Indonesia
+License: MIT - Free to use
+Disclaimer: Provided "as is" without warranty. Use at your own risk.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+import azure.cognitiveservices.speech as speechsdk
+
+# Event kinds
+INTERIM = "interim"
+FINAL = "final"
+NO_MATCH = "no_match"
+SESSION_STARTED = "session_started"
+SESSION_STOPPED = "session_stopped"
+CANCELED = "canceled"
+
+# What a full queue does with the next event; the SDK thread is never blocked
+DROP_OLDEST = "drop_oldest"    # discard the oldest queued event
+DROP_NEWEST = "drop_newest"    # discard the incoming event
+DROP_INTERIM = "drop_interim"  # discard interim results first, keep finals and session events
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, DROP_INTERIM)
+
+class RecognitionEvent:
+    """One recognizer event with its latency stamps
+
+    received is taken on the SDK thread, delivered when a consumer takes the
+    event off its queue. offset_ms and duration_ms locate the utterance in
+    the audio stream.
+    """
+
+    def __init__(self, kind, text="", language=None, offset_ms=None, duration_ms=None, error=None):
+        self.kind = kind
+        self.text = text
+        self.language = language
+        self.offset_ms = offset_ms
+        self.duration_ms = duration_ms
+        self.error = error
+        self.received = time.time()
+        self.delivered = None
+
+    @property
+    def queue_ms(self):
+        """Time spent waiting in the subscriber queue"""
+        if self.delivered is None:
+            return None
+        return round((self.delivered - self.received) * 1000, 1)
+
+    def to_dict(self):
+        return {
+            "kind": self.kind,
+            "text": self.text,
+            "language": self.language,
+            "offset_ms": self.offset_ms,
+            "duration_ms": self.duration_ms,
+            "error": self.error,
+            "received": self.received,
+            "queue_ms": self.queue_ms,
+        }
+
+class EventSubscription:
+    """Bounded queue of recognition events for one consumer
+
+    Iterate it synchronously (for event in sub) or asynchronously
+    (async for event in sub); iteration ends once the subscription is closed.
+    Use it as a context manager, or call close(), to unsubscribe.
+    """
+
+    def __init__(self, hub, max_queue=100, overflow=DROP_INTERIM):
+        self.hub = hub
+        self.max_queue = max_queue
+        self.overflow = overflow if overflow in OVERFLOW_POLICIES else DROP_INTERIM
+        self.closed = False
+        self.delivered = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self._events = deque()
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._queue_ms = deque(maxlen=200)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Unsubscribe; events already queued can still be read"""
+        self.hub.unsubscribe(self)
+        with self._cond:
+            self.closed = True
+            self._wake()
+
+    def get(self, timeout=None):
+        """Next event, or None after timeout or once closed and drained"""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while not self._events and not self.closed:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            return self._take() if self._events else None
+
+    def __iter__(self):
+        while True:
+            event = self.get()
+            if event is None:
+                return
+            yield event
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._events:
+                    return self._take()
+                if self.closed:
+                    raise StopAsyncIteration
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+            await waiter
+
+    def stats(self):
+        with self._cond:
+            samples = sorted(self._queue_ms)
+            return {
+                "queued": len(self._events),
+                "max_queue": self.max_queue,
+                "overflow": self.overflow,
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+                "max_depth": self.max_depth,
+                "queue_p95_ms": samples[min(len(samples) - 1, len(samples) * 95 // 100)] if samples else None,
+            }
+
+    def _offer(self, event):
+        """Called on the SDK thread; never blocks"""
+        with self._cond:
+            if self.closed:
+                return
+            if len(self._events) >= self.max_queue and not self._make_room(event):
+                self.dropped += 1
+                return
+            self._events.append(event)
+            self.max_depth = max(self.max_depth, len(self._events))
+            self._wake()
+
+    def _make_room(self, event):
+        if self.overflow == DROP_NEWEST:
+            return False
+        if self.overflow == DROP_INTERIM:
+            for queued in self._events:
+                if queued.kind == INTERIM:
+                    self._events.remove(queued)
+                    self.dropped += 1
+                    return True
+            if event.kind == INTERIM:
+                return False
+        self._events.popleft()
+        self.dropped += 1
+        return True
+
+    def _take(self):
+        event = self._events.popleft()
+        event.delivered = time.time()
+        self.delivered += 1
+        self._queue_ms.append(event.queue_ms)
+        return event
+
+    def _wake(self):
+        self._cond.notify_all()
+        for loop, waiter in self._waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, waiter)
+            except RuntimeError:
+                pass  # event loop already closed
+        self._waiters = []
+
+def _resolve(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+class RecognitionEventHub:
+    """Connects to one recognizer at a time and fans its events out to subscribers
+
+    Handlers are connected once per recognizer; attaching a new recognizer
+    (after a region failover or language change) disconnects the old one.
+    The owner attaches only for a continuous-recognition session and detaches
+    afterwards, so other recognitions on the same recognizer are not published.
+    listener(event, result) runs on the SDK thread for the owner's own
+    bookkeeping and must return quickly.
+    """
+
+    SIGNALS = ("recognizing", "recognized", "session_started", "session_stopped", "canceled")
+
+    def __init__(self, max_queue=100, overflow=DROP_INTERIM, listener=None):
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.listener = listener
+        self.recognizer = None
+        self.published = 0
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, max_queue=None, overflow=None):
+        subscription = EventSubscription(self, max_queue or self.max_queue, overflow or self.overflow)
+        with self._lock:
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def attach(self, recognizer):
+        """Connect to recognizer (no-op if already attached)"""
+        with self._lock:
+            if recognizer is self.recognizer:
+                return
+            previous, self.recognizer = self.recognizer, recognizer
+        self._disconnect(previous)
+
+        recognizer.recognizing.connect(lambda evt: self._result_event(INTERIM, evt))
+        recognizer.recognized.connect(lambda evt: self._result_event(FINAL, evt))
+        recognizer.session_started.connect(lambda evt: self.publish(RecognitionEvent(SESSION_STARTED)))
+        recognizer.session_stopped.connect(lambda evt: self.publish(RecognitionEvent(SESSION_STOPPED)))
+        recognizer.canceled.connect(self._canceled_event)
+
+    def detach(self):
+        """Disconnect from the current recognizer, if any; subscribers stay subscribed"""
+        with self._lock:
+            previous, self.recognizer = self.recognizer, None
+        self._disconnect(previous)
+
+    def _disconnect(self, recognizer):
+        if recognizer is None:
+            return
+        for signal in self.SIGNALS:
+            try:
+                getattr(recognizer, signal).disconnect_all()
+            except Exception:
+                pass
+
+    def publish(self, event, result=None):
+        if self.listener is not None:
+            try:
+                self.listener(event, result)
+            except Exception as e:
+                print(f"⚠️ Error memproses event pengenalan: {e}")
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self.published += 1
+        for subscription in subscribers:
+            subscription._offer(event)
+
+    def stats(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        return {
+            "published": self.published,
+            "subscribers": [subscription.stats() for subscription in subscribers],
+        }
+
+    def _result_event(self, kind, evt):
+        result = evt.result
+        if kind == FINAL and result.reason == speechsdk.ResultReason.NoMatch:
+            kind = NO_MATCH
+        elif kind == FINAL and result.reason != speechsdk.ResultReason.RecognizedSpeech:
+            return
+        language = speechsdk.AutoDetectSourceLanguageResult(result).language or None
+        # Offsets and durations are reported in 100ns ticks
+        self.publish(RecognitionEvent(
+            kind, text=result.text or "", language=language,
+            offset_ms=result.offset // 10000, duration_ms=result.duration // 10000,
+        ), result)
+
+    def _canceled_event(self, evt):
+        error = evt.error_details if evt.reason == speechsdk.CancellationReason.Error else None
+        self.publish(RecognitionEvent(CANCELED, error=error or str(evt.reason)))
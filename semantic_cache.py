@@ -0,0 +1,292 @@
+"""
+Semantic Response Cache
+Cache jawaban berdasarkan kemiripan makna pertanyaan (embedding + vector index lokal berbasis NumPy)
+
+Author: Edhot Purwoko - Microsoft Indonesia
+License: MIT - Free to use
+Disclaimer: Provided "as is" without warranty. Use at your own risk.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+import numpy as np
+
+class VectorIndex:
+    """Fixed-capacity matrix of unit vectors with cosine-similarity search
+
+    Rows are overwritten in place; when full, the least recently used row is
+    evicted. Inserts are batched so the matrix is written once per batch.
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.vectors = None  # (capacity, dim) float32, allocated on the first insert
+        self.entries = []    # payload dict per used row
+        self.last_used = np.zeros(capacity)
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def dimension(self):
+        return None if self.vectors is None else self.vectors.shape[1]
+
+    def search(self, vector, context=None):
+        """Return (row, similarity) of the closest entry stored under context, or (None, 0.0)"""
+        if not self.entries:
+            return None, 0.0
+        scores = self.vectors[:len(self.entries)] @ vector
+        if context is not None:
+            other = np.array([entry.get("context") != context for entry in self.entries])
+            scores = np.where(other, -np.inf, scores)
+        row = int(np.argmax(scores))
+        if not np.isfinite(scores[row]):
+            return None, 0.0
+        return row, float(scores[row])
+
+    def touch(self, row):
+        self.last_used[row] = time.time()
+
+    def add_batch(self, vectors, payloads):
+        """Insert rows, evicting least recently used ones when full"""
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        if self.vectors is None:
+            self.vectors = np.zeros((self.capacity, vectors.shape[1]), dtype=np.float32)
+
+        # Free rows are filled first; only rows occupied before this batch are evicted
+        occupied = len(self.entries)
+        free = min(self.capacity - occupied, len(payloads))
+        rows = list(range(occupied, occupied + free))
+        evict_count = min(len(payloads) - free, occupied)
+        if evict_count:
+            evict = np.argsort(self.last_used[:occupied], kind="stable")[:evict_count]
+            rows.extend(int(row) for row in evict)
+        self.entries.extend([None] * free)
+
+        now = time.time()
+        self.vectors[rows] = vectors[:len(rows)]
+        for row, payload in zip(rows, payloads):
+            self.entries[row] = payload
+            self.last_used[row] = now
+        return len(rows) - free
+
+    def save(self, path, model=None):
+        """Write vectors, payloads and the embedding model name to one .npz file (atomically)"""
+        temp_path = f"{path}.tmp.npz"
+        count = len(self.entries)
+        np.savez(
+            temp_path,
+            vectors=self.vectors[:count] if count else np.zeros((0, 0), dtype=np.float32),
+            last_used=self.last_used[:count],
+            entries=np.array(json.dumps(self.entries, ensure_ascii=False)),
+            model=np.array(model or ""),
+        )
+        os.replace(temp_path, path)
+
+    def load(self, path):
+        """Read a file written by save(); returns the embedding model name it was built with"""
+        with np.load(path) as data:
+            entries = json.loads(str(data["entries"]))[:self.capacity]
+            if len(data["vectors"]) < len(entries):
+                raise ValueError("jumlah vektor tidak sesuai dengan jumlah entri")
+            if entries:
+                self.vectors = np.zeros((self.capacity, data["vectors"].shape[1]), dtype=np.float32)
+                self.vectors[:len(entries)] = data["vectors"][:len(entries)]
+                self.last_used[:len(entries)] = data["last_used"][:len(entries)]
+            self.entries = entries
+            if "model" not in data.files:
+                return None
+            return str(data["model"]) or None
+
+class SemanticCache:
+    """Answers first-turn questions whose embedding is close to a stored one
+
+    embed(texts) returns one vector per text. Hits above threshold return the
+    stored answer; recent hits are kept with both questions and the score so
+    false hits can be audited and the threshold tuned.
+
+    Entries only match lookups with the same context (a hash of everything
+    else that shapes the answer, such as the system prompt). A saved index
+    built with another embedding model or dimension is discarded. Queued
+    pairs are written every flush_seconds and at interpreter exit.
+    """
+
+    def __init__(self, embed, threshold=0.9, capacity=1000, path=None, batch_size=8,
+                 audit_size=100, window=200, model=None, flush_seconds=30.0):
+        self.embed = embed
+        self.threshold = threshold
+        self.path = path
+        self.batch_size = batch_size
+        self.model = model
+        self.flush_seconds = flush_seconds
+        self.index = VectorIndex(capacity)
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_thread = None
+
+        # Metrics
+        self.lookups = 0
+        self.hits = 0
+        self.evictions = 0
+        self.errors = 0
+        self._embed_ms = deque(maxlen=window)
+        self._search_ms = deque(maxlen=window)
+        self.audit = deque(maxlen=audit_size)
+
+        if path and os.path.exists(path):
+            self._load()
+        atexit.register(self.flush)
+
+    @classmethod
+    def from_env(cls, embed, model=None):
+        """Return a cache if SEMANTIC_CACHE is enabled, else None"""
+        if os.getenv("SEMANTIC_CACHE", "false").lower() not in ("1", "true", "yes"):
+            return None
+        return cls(
+            embed,
+            threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9")),
+            capacity=int(os.getenv("SEMANTIC_CACHE_SIZE", "1000")),
+            path=os.getenv("SEMANTIC_CACHE_PATH", ".semantic_cache.npz") or None,
+            batch_size=int(os.getenv("SEMANTIC_CACHE_BATCH", "8")),
+            model=model,
+            flush_seconds=float(os.getenv("SEMANTIC_CACHE_FLUSH_SECONDS", "30")),
+        )
+
+    def start_background_flush(self):
+        """Write queued pairs every flush_seconds, so a quiet server does not hold them forever"""
+        if self._flush_thread is not None or not self.flush_seconds:
+            return
+
+        def loop():
+            while True:
+                time.sleep(self.flush_seconds)
+                self.flush()
+
+        self._flush_thread = threading.Thread(target=loop)
+        self._flush_thread.daemon = True
+        self._flush_thread.start()
+
+    def lookup(self, question, context=None):
+        """Return (answer or None, vector); the vector is passed back to store()"""
+        started = time.time()
+        try:
+            vector = _normalize(np.asarray(self.embed([question])[0], dtype=np.float32))
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            print(f"⚠️ Embedding gagal, semantic cache dilewati: {e}")
+            return None, None
+        embedded = time.time()
+
+        with self._lock:
+            if self.index.dimension not in (None, len(vector)):
+                print(f"⚠️ Dimensi embedding berubah ({self.index.dimension} -> {len(vector)}), "
+                      f"semantic cache dibuang")
+                self._discard_locked()
+            self.lookups += 1
+            row, score = self.index.search(vector, context)
+            match = self.index.entries[row] if row is not None else None
+            # Questions waiting for the next batch insert are searched too
+            for pending_vector, payload in self._pending:
+                if payload.get("context") != context:
+                    continue
+                pending_score = float(pending_vector @ vector)
+                if pending_score > score:
+                    row, score, match = None, pending_score, payload
+
+            self._embed_ms.append((embedded - started) * 1000)
+            self._search_ms.append((time.time() - embedded) * 1000)
+
+            if match is None or score < self.threshold:
+                return None, vector
+            if row is not None:
+                self.index.touch(row)
+            self.hits += 1
+            self.audit.append({
+                "time": round(time.time()),
+                "question": question,
+                "matched_question": match["question"],
+                "similarity": round(score, 4),
+            })
+            return match["answer"], vector
+
+    def store(self, question, answer, vector, context=None):
+        """Queue a question/answer pair; inserted in batches of batch_size"""
+        if vector is None or not answer:
+            return
+        with self._lock:
+            self._pending.append((vector, {"question": question, "answer": answer, "context": context}))
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self):
+        """Insert queued pairs now and persist the index"""
+        with self._lock:
+            self._flush_locked()
+
+    def stats(self):
+        """Hit rate, lookup latency and recent hits for false-hit review"""
+        with self._lock:
+            return {
+                "entries": len(self.index),
+                "pending": len(self._pending),
+                "capacity": self.index.capacity,
+                "threshold": self.threshold,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+                "evictions": self.evictions,
+                "errors": self.errors,
+                "embed_p50_ms": _percentile(self._embed_ms, 50),
+                "search_p50_ms": _percentile(self._search_ms, 50),
+                "search_p95_ms": _percentile(self._search_ms, 95),
+                "recent_hits": list(self.audit),
+            }
+
+    def _load(self):
+        try:
+            model = self.index.load(self.path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Semantic cache tidak bisa dibaca, dibuang: {e}")
+            self._discard_locked()
+            return
+        if self.model and model and model != self.model:
+            print(f"⚠️ Semantic cache dibuat dengan model embedding {model}, dibuang")
+            self._discard_locked()
+
+    def _discard_locked(self):
+        """Drop every entry and the saved file"""
+        self.index = VectorIndex(self.index.capacity)
+        self._pending = []
+        if self.path:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        vectors = [vector for vector, _ in self._pending]
+        payloads = [payload for _, payload in self._pending]
+        self._pending = []
+        self.evictions += self.index.add_batch(vectors, payloads)
+        if self.path:
+            try:
+                self.index.save(self.path, self.model)
+            except OSError as e:
+                print(f"⚠️ Semantic cache tidak bisa disimpan: {e}")
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def _percentile(samples, percentile):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, len(ordered) * percentile // 100)], 2)
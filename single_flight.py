@@ -0,0 +1,217 @@
+"""
+Single-Flight Request Coalescing
+Menggabungkan request identik yang sedang berjalan menjadi satu panggilan upstream
+
+Author: Edhot Purwoko - Microsoft Indonesia
+License: MIT - Free to use
+Disclaimer: Provided "as is" without warranty. Use at your own risk.
+"""
+
+import hashlib
+import json
+import threading
+
+
+def make_key(*parts):
+    """Build a stable key from JSON-serializable parts"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _close_quietly(upstream):
+    close = getattr(upstream, "close", None)
+    if close is None:
+        return
+    try:
+        close()
+    except Exception:
+        pass
+
+
+class _Call:
+    """One in-flight blocking call shared by every waiter"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _StreamCall:
+    """One in-flight upstream stream; chunks are kept so late subscribers can replay them"""
+
+    def __init__(self, key):
+        self.key = key
+        self.cond = threading.Condition()
+        self.chunks = []
+        self.finished = False
+        self.aborted = False
+        self.error = None
+        self.subscribers = 0
+
+    def try_subscribe(self):
+        with self.cond:
+            if self.finished or self.aborted:
+                return False
+            self.subscribers += 1
+            return True
+
+
+class StreamSubscription:
+    """Iterator over a shared stream, starting from its first chunk"""
+
+    def __init__(self, group, call):
+        self._group = group
+        self._call = call
+        self._index = 0
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        call = self._call
+        with call.cond:
+            while not self._closed and not call.finished and self._index >= len(call.chunks):
+                # Timed wait keeps Ctrl-C responsive on Windows consoles
+                call.cond.wait(0.5)
+            if self._closed:
+                raise StopIteration
+            if self._index < len(call.chunks):
+                chunk = call.chunks[self._index]
+                self._index += 1
+                return chunk
+            error = call.error
+
+        self.close()
+        if error is not None:
+            raise error
+        raise StopIteration
+
+    @property
+    def abandoned(self):
+        """True once every subscriber has left before the stream finished"""
+        return self._call.aborted
+
+    def close(self):
+        """Leave the stream; the pump closes the upstream once nobody is left listening"""
+        call = self._call
+        with call.cond:
+            if self._closed:
+                return
+            self._closed = True
+            call.subscribers -= 1
+            abort = call.subscribers == 0 and not call.finished
+            if abort:
+                call.aborted = True
+            call.cond.notify_all()
+
+        if abort:
+            self._group._forget(call.key, call)
+
+
+class SingleFlight:
+    """Coalesce identical concurrent calls so only one reaches the upstream service"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._streams = {}
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key, fn):
+        """Run fn once for all concurrent callers with the same key and return its result"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def stream(self, key, factory):
+        """Subscribe to the shared stream for key, starting factory() if none is running
+
+        factory must return an iterable; every subscriber sees every item from the start,
+        including subscribers that join while the stream is already in progress.
+        """
+        with self._lock:
+            call = self._streams.get(key)
+            if call is not None and call.try_subscribe():
+                self.shared += 1
+                return StreamSubscription(self, call)
+
+            call = _StreamCall(key)
+            call.subscribers = 1
+            self._streams[key] = call
+            self.leaders += 1
+
+        thread = threading.Thread(target=self._pump, args=(call, factory))
+        thread.daemon = True
+        thread.start()
+        return StreamSubscription(self, call)
+
+    def stats(self):
+        """Return coalescing counters"""
+        with self._lock:
+            return {
+                "leaders": self.leaders,
+                "shared": self.shared,
+                "in_flight": len(self._calls) + len(self._streams),
+            }
+
+    def _pump(self, call, factory):
+        error = None
+        upstream = chunks = None
+        try:
+            upstream = factory()
+            chunks = iter(upstream)
+            # The aborted flag is checked between chunks; the generator is
+            # closed below on this thread, never from a subscriber's thread
+            while not call.aborted:
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    break
+                with call.cond:
+                    if call.aborted:
+                        break
+                    call.chunks.append(chunk)
+                    call.cond.notify_all()
+        except BaseException as e:
+            error = e
+        finally:
+            _close_quietly(chunks)
+            if call.aborted or error is not None:
+                _close_quietly(upstream)
+            with call.cond:
+                if not call.aborted:
+                    call.error = error
+                call.finished = True
+                call.cond.notify_all()
+            self._forget(call.key, call)
+
+    def _forget(self, key, call):
+        with self._lock:
+            if self._streams.get(key) is call:
+                del self._streams[key]
@@ -0,0 +1,172 @@
+"""
+Azure Speech Region Health Tracking
+Statistik latency dan error per region Azure Speech untuk failover otomatis
+
+Author: Edhot Purwoko - Microsoft Indonesia
+License: MIT - Free to use
+Disclaimer: Provided "as is" without warranty. Use at your own risk.
+"""
+
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+class SpeechRegion:
+    """One Azure Speech region with its key and live health statistics"""
+
+    def __init__(self, region, key):
+        self.region = region
+        self.key = key
+
+        self.latency = None   # EWMA of health-probe round trips (seconds); used for scoring
+        self.duration = None  # EWMA of whole request times (seconds); reported only
+        self.error_rate = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+
+    def score(self):
+        """Lower is better; unprobed regions count as 1 second"""
+        latency = self.latency if self.latency is not None else 1.0
+        return latency * (1.0 + 4.0 * self.error_rate)
+
+    def snapshot(self, now=None):
+        now = now or time.time()
+        return {
+            "region": self.region,
+            "latency_ms": round(self.latency * 1000) if self.latency is not None else None,
+            "duration_ms": round(self.duration * 1000) if self.duration is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "requests": self.requests,
+            "errors": self.errors,
+            "ejected": self.ejected_until > now,
+        }
+
+class SpeechRegionPool:
+    """Tracks region health and picks the primary region"""
+
+    def __init__(self, regions, alpha=0.3, eject_after=2, eject_seconds=60.0,
+                 health_interval=60.0, probe_timeout=5.0):
+        if not regions:
+            raise ValueError("Azure Speech key dan region harus diset di file .env")
+        self.regions = regions
+        self.alpha = alpha
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.health_interval = health_interval
+        self.probe_timeout = probe_timeout
+        self._lock = threading.Lock()
+        self._health_thread = None
+
+    @classmethod
+    def from_env(cls):
+        """Regions from AZURE_SPEECH_REGIONS (comma separated) or AZURE_SPEECH_REGION
+
+        Each region uses AZURE_SPEECH_KEY_<REGION> if set, else AZURE_SPEECH_KEY.
+        """
+        default_key = os.getenv("AZURE_SPEECH_KEY")
+        names = os.getenv("AZURE_SPEECH_REGIONS") or os.getenv("AZURE_SPEECH_REGION") or ""
+        regions = []
+        for name in (n.strip() for n in names.split(",")):
+            key = os.getenv(f"AZURE_SPEECH_KEY_{name.upper()}", default_key)
+            if name and key:
+                regions.append(SpeechRegion(name, key))
+
+        return cls(
+            regions,
+            eject_after=int(os.getenv("AZURE_SPEECH_EJECT_AFTER", "2")),
+            eject_seconds=float(os.getenv("AZURE_SPEECH_EJECT_SECONDS", "60")),
+            health_interval=float(os.getenv("AZURE_SPEECH_HEALTH_INTERVAL", "60")),
+        )
+
+    def best(self, exclude=()):
+        """Healthiest region not in exclude (the soonest to recover if all are ejected)"""
+        now = time.time()
+        with self._lock:
+            pool = [r for r in self.regions if r not in exclude]
+            if not pool:
+                return None
+            healthy = [r for r in pool if r.ejected_until <= now]
+            if healthy:
+                return min(healthy, key=lambda r: r.score())
+            return min(pool, key=lambda r: r.ejected_until)
+
+    def should_switch(self, current, margin=0.7):
+        """Return a better region than current, or None to stay"""
+        best = self.best()
+        if best is None or best is current:
+            return None
+        with self._lock:
+            if current.ejected_until > time.time() or best.score() < current.score() * margin:
+                return best
+        return None
+
+    def record_success(self, region, latency=None, duration=None):
+        """Count a success; latency is a probe round trip, duration a whole request
+
+        Requests include playback and the user speaking, so their duration is
+        kept apart from the latency that decides which region is primary.
+        """
+        with self._lock:
+            region.requests += 1
+            region.error_rate *= 1 - self.alpha
+            region.consecutive_failures = 0
+            region.ejected_until = 0.0
+            if latency is not None:
+                region.latency = self._average(region.latency, latency)
+            if duration is not None:
+                region.duration = self._average(region.duration, duration)
+
+    def _average(self, current, sample):
+        return sample if current is None else (1 - self.alpha) * current + self.alpha * sample
+
+    def record_failure(self, region, reason=""):
+        with self._lock:
+            region.requests += 1
+            region.errors += 1
+            region.error_rate = (1 - self.alpha) * region.error_rate + self.alpha
+            region.consecutive_failures += 1
+            if region.consecutive_failures >= self.eject_after:
+                region.ejected_until = time.time() + self.eject_seconds
+                print(f"⚠️ Region speech {region.region} dinonaktifkan sementara: {reason}")
+
+    def probe(self, region):
+        """Health check: issue a token against the region and record the round trip"""
+        request = urllib.request.Request(
+            f"https://{region.region}.api.cognitive.microsoft.com/sts/v1.0/issueToken",
+            data=b"",
+            headers={"Ocp-Apim-Subscription-Key": region.key},
+            method="POST",
+        )
+        started = time.time()
+        try:
+            with urllib.request.urlopen(request, timeout=self.probe_timeout) as response:
+                response.read()
+            self.record_success(region, time.time() - started)
+            return True
+        except (urllib.error.URLError, OSError) as e:
+            self.record_failure(region, str(e))
+            return False
+
+    def start_health_checks(self):
+        """Probe every region periodically in the background (only useful with several regions)"""
+        if self._health_thread is not None or len(self.regions) < 2:
+            return
+
+        def loop():
+            while True:
+                for region in list(self.regions):
+                    self.probe(region)
+                time.sleep(self.health_interval)
+
+        self._health_thread = threading.Thread(target=loop)
+        self._health_thread.daemon = True
+        self._health_thread.start()
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            return [r.snapshot(now) for r in self.regions]
@@ -8,22 +8,163 @@ Disclaimer: Provided "as is" without warranty. Use at your own risk.
 """
 
 import os
+import struct
 import threading
 import time
+import wave
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from dotenv import load_dotenv
 import azure.cognitiveservices.speech as speechsdk
+from single_flight import SingleFlight, make_key
+from vad import VoiceActivityDetector, read_wav
+from speech_regions import SpeechRegionPool
+from tts_text import split_for_synthesis
+from voice_catalog import VoiceCatalog
+from playback import PlaybackWorker
+from recognition_events import RecognitionEventHub, FINAL, SESSION_STOPPED, CANCELED
+
+# Named synthesis output formats: (SpeechSynthesisOutputFormat member, MIME type)
+OUTPUT_FORMATS = {
+    "opus": ("Ogg16Khz16BitMonoOpus", "audio/ogg"),
+    "opus-24k": ("Ogg24Khz16BitMonoOpus", "audio/ogg"),
+    "mp3": ("Audio16Khz32KBitRateMonoMp3", "audio/mpeg"),
+    "mp3-24k": ("Audio24Khz48KBitRateMonoMp3", "audio/mpeg"),
+    "pcm-8k": ("Riff8Khz16BitMonoPcm", "audio/wav"),
+    "pcm-16k": ("Riff16Khz16BitMonoPcm", "audio/wav"),
+    "pcm-24k": ("Riff24Khz16BitMonoPcm", "audio/wav"),
+}
+
+DEFAULT_OUTPUT_FORMAT = "opus"
+
+# Headerless PCM used when long texts are synthesized in parallel: (SDK format, sample rate)
+RAW_PCM_FORMATS = {
+    "pcm-8k": ("Raw8Khz16BitMonoPcm", 8000),
+    "pcm-16k": ("Raw16Khz16BitMonoPcm", 16000),
+    "pcm-24k": ("Raw24Khz16BitMonoPcm", 24000),
+}
+
+WAV_HEADER_SIZE = 44
+
+# Container formats whose separately synthesized files cannot be joined into one
+# valid stream; these are synthesized in a single request
+SINGLE_REQUEST_MIME_TYPES = ("audio/ogg", "audio/webm")
+
+# Silence inserted between voiced segments so adjacent words are not merged
+VAD_SEGMENT_GAP_MS = 200
+
+def _wav_header(sample_rate, data_size=0xFFFFFFFF - WAV_HEADER_SIZE):
+    """RIFF header for 16-bit mono PCM; the default size marks an open-ended stream"""
+    byte_rate = sample_rate * 2
+    return (b"RIFF" + struct.pack("<I", min(data_size + 36, 0xFFFFFFFF)) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, sample_rate, byte_rate, 2, 16)
+            + b"data" + struct.pack("<I", data_size))
+
+def parse_voice_formats(value):
+    """Parse 'voice=format,voice=format' into a dict of per-voice output formats"""
+    profiles = {}
+    for item in (value or "").split(","):
+        voice, _, fmt = item.partition("=")
+        if voice.strip() and fmt.strip() in OUTPUT_FORMATS:
+            profiles[voice.strip()] = fmt.strip()
+    return profiles
+
+# Voice used when a language is detected and no voice for it has been chosen yet
+DEFAULT_LANGUAGE_VOICES = {
+    "id-ID": "id-ID-ArdiNeural",
+    "en-US": "en-US-JennyNeural",
+    "en-GB": "en-GB-SoniaNeural",
+}
+
+def parse_language_voices(value):
+    """Parse 'locale=voice,locale=voice' on top of DEFAULT_LANGUAGE_VOICES"""
+    voices = dict(DEFAULT_LANGUAGE_VOICES)
+    for item in (value or "").split(","):
+        locale, _, voice_name = item.partition("=")
+        if locale.strip() and voice_name.strip():
+            voices[locale.strip()] = voice_name.strip()
+    return voices
+
+def voice_locale(voice_name):
+    """'id-ID-ArdiNeural' -> 'id-ID'"""
+    return "-".join(voice_name.split("-")[:2])
+
+# Small shared pool for short SDK calls guarded by a timeout, instead of a thread per call.
+# Playback and recognition can run for as long as the user listens or speaks, so they
+# get their own thread and never hold a pool worker.
+_timeout_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="speech-call")
+
+class SpeechBusyError(RuntimeError):
+    """The call never started: every pool worker stayed busy for the whole timeout"""
+
+def _start_thread(operation):
+    """Run operation on a new daemon thread; returns its Future"""
+    future = Future()
+    
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(operation())
+        except BaseException as e:
+            future.set_exception(e)
+    
+    thread = threading.Thread(target=run, name="speech-call-dedicated")
+    thread.daemon = True
+    thread.start()
+    return future
+
+def _call_with_timeout(operation, timeout, dedicated=False):
+    """Run operation with a timeout counted from when it starts; returns (result, error)
+
+    Time spent queued for a pool worker does not count. A call still queued
+    after timeout is cancelled and reported as SpeechBusyError.
+    """
+    started = []
+    
+    def run():
+        started.append(time.time())
+        return operation()
+    
+    future = _start_thread(run) if dedicated else _timeout_pool.submit(run)
+    try:
+        try:
+            return future.result(timeout), None
+        except FutureTimeoutError:
+            if not started and future.cancel():
+                return None, SpeechBusyError(f"Semua worker speech sibuk selama {timeout:.0f} detik")
+        # Wait out the rest of the timeout measured from the start of the call
+        remaining = started[0] + timeout - time.time() if started else timeout
+        return future.result(max(0.0, remaining)), None
+    except FutureTimeoutError:
+        return None, TimeoutError(f"Tidak ada respons dalam {timeout:.0f} detik")
+    except Exception as e:
+        return None, e
+
+def _is_service_error(result):
+    """True when the SDK cancelled the request because of a service or network error"""
+    return (result is not None
+            and result.reason == speechsdk.ResultReason.Canceled
+            and result.cancellation_details.reason == speechsdk.CancellationReason.Error)
 
 class SpeechService:
+    # Shared by all instances so identical concurrent utterances are synthesized once
+    inflight = SingleFlight()
+
     def __init__(self):
         # Load environment variables
         load_dotenv()
         
-        # Initialize Speech configuration
-        self.speech_key = os.getenv("AZURE_SPEECH_KEY")
-        self.speech_region = os.getenv("AZURE_SPEECH_REGION")
+        # Speech regions with health tracking; the healthiest one is the primary
+        self.regions = SpeechRegionPool.from_env()
+        self.region = self.regions.best()
+        self.speech_key = self.region.key
+        self.speech_region = self.region.region
+        self._region_lock = threading.Lock()
         
-        if not self.speech_key or not self.speech_region:
-            raise ValueError("Azure Speech key dan region harus diset di file .env")
+        # Requests slower than this fail over to the next region
+        self.timeout = float(os.getenv("AZURE_SPEECH_TIMEOUT_SECONDS", "10"))
+        self.recognition_timeout = float(os.getenv("AZURE_SPEECH_RECOGNITION_TIMEOUT_SECONDS", "30"))
         
         # Create speech config
         self.speech_config = speechsdk.SpeechConfig(
@@ -37,78 +178,373 @@ class SpeechService:
         # Set voice untuk synthesis (Indonesian female voice)
         self.speech_config.speech_synthesis_voice_name = "id-ID-ArdiNeural"  # Indonesian male voice
         
+        # Optional automatic language detection over a candidate set (e.g. id-ID,en-US);
+        # the detected language picks the matching synthesis voice
+        self.auto_detect_languages = [
+            code.strip() for code in os.getenv("AZURE_SPEECH_AUTO_DETECT_LANGUAGES", "").split(",")
+            if code.strip()
+        ]
+        self.language_voices = parse_language_voices(os.getenv("AZURE_SPEECH_LANGUAGE_VOICES"))
+        self.detected_language = None
+        
         # Audio configs
         self.audio_config_mic = speechsdk.audio.AudioConfig(use_default_microphone=True)
         self.audio_config_speaker = speechsdk.audio.AudioOutputConfig(use_default_speaker=True)
         
         # Initialize recognizer and synthesizer
-        self.speech_recognizer = speechsdk.SpeechRecognizer(
-            speech_config=self.speech_config, 
-            audio_config=self.audio_config_mic
-        )
+        self.speech_recognizer = self._build_recognizer(self.speech_config, self.audio_config_mic)
         
-        self.speech_synthesizer = speechsdk.SpeechSynthesizer(
-            speech_config=self.speech_config, 
-            audio_config=self.audio_config_speaker
-        )
+        # Speaker synthesizers per voice, so switching voices with the language needs no rebuild
+        self._speaker_synthesizers = {}
+        self.speech_synthesizer = self._speaker_synthesizer(self.speech_config.speech_synthesis_voice_name)
+        # The synthesizer that last started playing (see _play)
+        self._active_synthesizer = self.speech_synthesizer
+        
+        # Output formats for audio returned to clients (speaker playback stays on the SDK default)
+        self.output_format = os.getenv("AZURE_SPEECH_OUTPUT_FORMAT", DEFAULT_OUTPUT_FORMAT)
+        if self.output_format not in OUTPUT_FORMATS:
+            self.output_format = DEFAULT_OUTPUT_FORMAT
+        self.voice_formats = parse_voice_formats(os.getenv("AZURE_SPEECH_VOICE_FORMATS"))
+        
+        # Idle memory-output synthesizers keyed by (region, voice, SDK format)
+        self._synthesizer_pool = {}
+        self._pool_lock = threading.Lock()
+        
+        # Long texts are split and synthesized on several synthesizers at once
+        self.chunk_chars = int(os.getenv("AZURE_SPEECH_CHUNK_CHARS", "400"))
+        self.synthesis_parallelism = int(os.getenv("AZURE_SPEECH_SYNTHESIS_PARALLELISM", "3"))
+        
+        # Synthesized audio cache: key -> {"format", "mime_type", "audio"}
+        self.audio_cache = OrderedDict()
+        self.audio_cache_size = int(os.getenv("AZURE_SPEECH_AUDIO_CACHE_SIZE", "64"))
+        self._cache_lock = threading.Lock()
         
         # State management
         self.is_listening = False
         self.recognition_done = False
         self.recognized_text = ""
         
+        # Continuous recognition events, fanned out to bounded subscriber queues
+        self.recognition_events = RecognitionEventHub(
+            max_queue=int(os.getenv("AZURE_SPEECH_EVENT_QUEUE_SIZE", "100")),
+            overflow=os.getenv("AZURE_SPEECH_EVENT_OVERFLOW", "drop_interim"),
+            listener=self._on_recognition_event,
+        )
+        self._callback_subscription = None
+        
+        # Full voice list from the service, cached on disk and refreshed in the background
+        self.voices = VoiceCatalog.from_env(self._fetch_voices)
+        
+        # One long-lived thread plays queued utterances in order
+        self.playback = PlaybackWorker(
+            self.speak_text, self.stop_speaking,
+            max_queue=int(os.getenv("PLAYBACK_QUEUE_SIZE", "4"))
+        )
+        
+        self.regions.start_health_checks()
+        self.voices.start_background_refresh()
+        
+    def _activate_region(self, region):
+        """Rebuild config, recognizer and synthesizer against another region"""
+        with self._region_lock:
+            language = self.speech_config.speech_recognition_language
+            voice_name = self.speech_config.speech_synthesis_voice_name
+            
+            config = speechsdk.SpeechConfig(subscription=region.key, region=region.region)
+            config.speech_recognition_language = language
+            config.speech_synthesis_voice_name = voice_name
+            
+            self.speech_recognizer = self._build_recognizer(config, self.audio_config_mic)
+            self.speech_config = config
+            self._speaker_synthesizers = {}
+            self.speech_synthesizer = self._speaker_synthesizer(voice_name)
+            self.region = region
+            self.speech_key = region.key
+            self.speech_region = region.region
+        
+        print(f"🌍 Region speech diubah ke: {region.region}")
+    
+    def fail_over(self, reason, region=None):
+        """Record a failure on region (default: the primary) and switch to the healthiest other one
+
+        Returns False when there is no region left to switch to. Safe to call
+        from several workers: only the first one to report the primary switches.
+        """
+        region = region or self.region
+        self.regions.record_failure(region, reason)
+        if self.region is not region:
+            return True
+        fallback = self.regions.best(exclude=[region])
+        if fallback is None:
+            return False
+        self._activate_region(fallback)
+        return True
+    
+    def _reset_recognizer(self):
+        """Replace a microphone recognizer stuck in recognize_once
+
+        recognize_once cannot be stopped; the stalled call finishes on its own
+        against the old recognizer while new calls use a fresh one.
+        """
+        with self._region_lock:
+            self.speech_recognizer = self._build_recognizer(self.speech_config, self.audio_config_mic)
+    
+    def _build_recognizer(self, speech_config, audio_config):
+        """Recognizer for the fixed language, or detecting one of auto_detect_languages"""
+        if not self.auto_detect_languages:
+            return speechsdk.SpeechRecognizer(speech_config=speech_config, audio_config=audio_config)
+        
+        # Re-detect the language on every utterance, not only at the start of the session
+        speech_config.set_property(speechsdk.PropertyId.SpeechServiceConnection_LanguageIdMode, "Continuous")
+        return speechsdk.SpeechRecognizer(
+            speech_config=speech_config,
+            auto_detect_source_language_config=speechsdk.languageconfig.AutoDetectSourceLanguageConfig(
+                languages=self.auto_detect_languages
+            ),
+            audio_config=audio_config
+        )
+    
+    def _speaker_synthesizer(self, voice_name):
+        """Speaker synthesizer for a voice on the current region (created once per voice)"""
+        synthesizer = self._speaker_synthesizers.get(voice_name)
+        if synthesizer is None:
+            config = speechsdk.SpeechConfig(subscription=self.speech_key, region=self.speech_region)
+            config.speech_synthesis_voice_name = voice_name
+            synthesizer = speechsdk.SpeechSynthesizer(
+                speech_config=config,
+                audio_config=self.audio_config_speaker
+            )
+            self._speaker_synthesizers[voice_name] = synthesizer
+        return synthesizer
+    
+    def _use_voice(self, voice_name):
+        """Make voice_name the synthesis voice for speaker and returned audio"""
+        with self._region_lock:
+            self.speech_config.speech_synthesis_voice_name = voice_name
+            self.speech_synthesizer = self._speaker_synthesizer(voice_name)
+    
+    def detected_voice(self, result):
+        """(language, voice name) detected in a recognition result; changes nothing
+
+        Either is None when detection is off or there is no voice for the language.
+        """
+        if not self.auto_detect_languages:
+            return None, None
+        
+        language = speechsdk.AutoDetectSourceLanguageResult(result).language
+        if not language:
+            return None, None
+        return language, self.language_voices.get(language)
+    
+    def apply_detected_language(self, result):
+        """Record the detected language and switch the shared voice to it if it changed"""
+        language, voice_name = self.detected_voice(result)
+        if not language:
+            return
+        self.detected_language = language
+        
+        current = self.speech_config.speech_synthesis_voice_name
+        if voice_name and voice_locale(current) != language:
+            self._use_voice(voice_name)
+            print(f"🌐 Bahasa terdeteksi: {language}, suara: {voice_name}")
+    
+    def _run_with_failover(self, operation, timeout, abandon=None, dedicated=False):
+        """Run operation() -> SDK result on the primary region, failing over on errors or timeouts
+
+        abandon() is called after a timeout so the stalled request stops before the retry.
+        dedicated runs the call on its own thread instead of the shared pool (for
+        playback and recognition). A call that never started is not held against
+        the region.
+        """
+        # Continuous recognition is bound to the current recognizer; never switch under it
+        if not self.is_listening:
+            better = self.regions.should_switch(self.region)
+            if better is not None:
+                self._activate_region(better)
+        
+        tried = []
+        while True:
+            region = self.region
+            tried.append(region)
+            started = time.time()
+            result, error = _call_with_timeout(operation, timeout, dedicated)
+            
+            if error is None and not _is_service_error(result):
+                self.regions.record_success(region, duration=time.time() - started)
+                return result
+            if isinstance(error, SpeechBusyError):
+                raise error
+            
+            reason = str(error) if error is not None else result.cancellation_details.error_details
+            self.regions.record_failure(region, reason)
+            if isinstance(error, TimeoutError) and abandon is not None:
+                try:
+                    abandon()
+                except Exception:
+                    pass
+            
+            fallback = None if self.is_listening else self.regions.best(exclude=tried)
+            if fallback is None:
+                if error is not None:
+                    raise error
+                return result
+            self._activate_region(fallback)
+        
     def recognize_speech_once(self):
         """Recognize speech once from microphone"""
         try:
             print("🎤 Mendengarkan... Silakan berbicara!")
             
+            # A single recognition belongs to its caller, not to event subscribers
+            if not self.is_listening:
+                self.recognition_events.detach()
+            
             # Start recognition
-            speech_recognition_result = self.speech_recognizer.recognize_once_async().get()
-            
-            # Process result
-            if speech_recognition_result.reason == speechsdk.ResultReason.RecognizedSpeech:
-                recognized_text = speech_recognition_result.text
-                print(f"👤 Anda berkata: {recognized_text}")
-                return recognized_text
-            elif speech_recognition_result.reason == speechsdk.ResultReason.NoMatch:
-                error_msg = "❌ Tidak ada suara yang terdeteksi. Silakan coba lagi."
-                print(error_msg)
-                return None
-            elif speech_recognition_result.reason == speechsdk.ResultReason.Canceled:
-                cancellation_details = speech_recognition_result.cancellation_details
-                error_msg = f"❌ Speech recognition dibatalkan: {cancellation_details.reason}"
-                if cancellation_details.reason == speechsdk.CancellationReason.Error:
-                    error_msg += f"\nError details: {cancellation_details.error_details}"
-                print(error_msg)
+            speech_recognition_result = self._run_with_failover(
+                lambda: self.speech_recognizer.recognize_once_async().get(),
+                self.recognition_timeout,
+                abandon=self._reset_recognizer,
+                dedicated=True
+            )
+            return self._process_recognition_result(speech_recognition_result)
+                
+        except Exception as e:
+            print(f"❌ Error saat mengenali suara: {str(e)}")
+            return None
+    
+    def recognize_pcm(self, pcm, sample_rate=16000):
+        """Recognize speech from 16-bit mono PCM, forwarding only voiced segments"""
+        try:
+            vad = VoiceActivityDetector.from_env(sample_rate)
+            voiced = list(vad.voiced_chunks([pcm], gap_ms=VAD_SEGMENT_GAP_MS))
+            print(f"✂️ VAD: {vad.voiced_ratio():.0%} audio dikirim ke Azure")
+            
+            # Nothing voiced locally: skip the round trip entirely
+            if not voiced:
+                print("❌ Tidak ada suara yang terdeteksi. Silakan coba lagi.")
                 return None
+            
+            def recognize():
+                stream_format = speechsdk.audio.AudioStreamFormat(
+                    samples_per_second=sample_rate, bits_per_sample=16, channels=1
+                )
+                push_stream = speechsdk.audio.PushAudioInputStream(stream_format=stream_format)
+                recognizer = self._build_recognizer(
+                    self.speech_config, speechsdk.audio.AudioConfig(stream=push_stream)
+                )
                 
+                for chunk in voiced:
+                    push_stream.write(chunk)
+                push_stream.close()
+                return recognizer.recognize_once_async().get()
+            
+            speech_recognition_result = self._run_with_failover(
+                recognize, self.recognition_timeout, dedicated=True
+            )
+            return self._process_recognition_result(speech_recognition_result)
+            
         except Exception as e:
             print(f"❌ Error saat mengenali suara: {str(e)}")
             return None
     
-    def start_continuous_recognition(self, callback=None):
-        """Start continuous speech recognition"""
-        def recognition_callback(evt):
-            if evt.result.reason == speechsdk.ResultReason.RecognizedSpeech:
-                self.recognized_text = evt.result.text
-                print(f"👤 Terdeteksi: {self.recognized_text}")
-                if callback:
-                    callback(self.recognized_text)
-        
-        def session_stopped_callback(evt):
-            print("🔇 Sesi pengenalan suara dihentikan")
-            self.is_listening = False
-            self.recognition_done = True
+    def open_stream_recognizer(self, sample_rate=16000):
+        """Push stream and recognizer for 16-bit mono PCM supplied by a client
+
+        The caller connects the recognizer events and starts recognition.
+        """
+        stream_format = speechsdk.audio.AudioStreamFormat(
+            samples_per_second=sample_rate, bits_per_sample=16, channels=1
+        )
+        push_stream = speechsdk.audio.PushAudioInputStream(stream_format=stream_format)
+        recognizer = self._build_recognizer(
+            self.speech_config, speechsdk.audio.AudioConfig(stream=push_stream)
+        )
+        return push_stream, recognizer
+    
+    def recognize_segment(self, pcm, sample_rate=16000, timeout=120):
+        """Recognize every utterance in a PCM segment
+
+        Returns a list of (offset_ms, duration_ms, text) relative to the segment start.
+        Uses its own recognizer, so several segments can be recognized in parallel.
+        """
+        push_stream, recognizer = self.open_stream_recognizer(sample_rate)
+        
+        utterances = []
+        errors = []
+        done = threading.Event()
+        
+        def recognized_callback(evt):
+            if evt.result.reason == speechsdk.ResultReason.RecognizedSpeech and evt.result.text:
+                # Offsets and durations are reported in 100ns ticks
+                utterances.append((evt.result.offset // 10000, evt.result.duration // 10000, evt.result.text))
         
         def canceled_callback(evt):
-            print(f"❌ Pengenalan suara dibatalkan: {evt.reason}")
-            self.is_listening = False
-            self.recognition_done = True
+            if evt.reason == speechsdk.CancellationReason.Error:
+                errors.append(evt.error_details)
+            done.set()
+        
+        recognizer.recognized.connect(recognized_callback)
+        recognizer.canceled.connect(canceled_callback)
+        recognizer.session_stopped.connect(lambda evt: done.set())
         
-        # Connect callbacks
-        self.speech_recognizer.recognized.connect(recognition_callback)
-        self.speech_recognizer.session_stopped.connect(session_stopped_callback)
-        self.speech_recognizer.canceled.connect(canceled_callback)
+        recognizer.start_continuous_recognition()
+        push_stream.write(pcm)
+        push_stream.close()
+        finished = done.wait(timeout)
+        recognizer.stop_continuous_recognition()
+        
+        if errors:
+            raise RuntimeError(f"Speech recognition dibatalkan: {errors[0]}")
+        if not finished:
+            raise TimeoutError("Speech recognition timeout")
+        return utterances
+    
+    def recognize_wav_file(self, path):
+        """Recognize speech from a 16-bit mono WAV file"""
+        try:
+            pcm, sample_rate = read_wav(path)
+        except (OSError, ValueError, EOFError, wave.Error) as e:
+            print(f"❌ Error membaca file audio: {str(e)}")
+            return None
+        return self.recognize_pcm(pcm, sample_rate)
+    
+    def _process_recognition_result(self, speech_recognition_result):
+        """Return recognized text or None, printing the reason on failure"""
+        if speech_recognition_result.reason == speechsdk.ResultReason.RecognizedSpeech:
+            self.apply_detected_language(speech_recognition_result)
+            recognized_text = speech_recognition_result.text
+            print(f"👤 Anda berkata: {recognized_text}")
+            return recognized_text
+        elif speech_recognition_result.reason == speechsdk.ResultReason.NoMatch:
+            error_msg = "❌ Tidak ada suara yang terdeteksi. Silakan coba lagi."
+            print(error_msg)
+            return None
+        elif speech_recognition_result.reason == speechsdk.ResultReason.Canceled:
+            cancellation_details = speech_recognition_result.cancellation_details
+            error_msg = f"❌ Speech recognition dibatalkan: {cancellation_details.reason}"
+            if cancellation_details.reason == speechsdk.CancellationReason.Error:
+                error_msg += f"\nError details: {cancellation_details.error_details}"
+            print(error_msg)
+            return None
+    
+    def start_continuous_recognition(self, callback=None):
+        """Start continuous speech recognition
+
+        Results are published as events (see subscribe_recognition_events).
+        callback(text), if given, is called for every final result from a
+        consumer thread, never from the SDK thread.
+        """
+        if self.is_listening:
+            return True
+        
+        self.recognition_events.attach(self.speech_recognizer)
+        if callback is not None:
+            self._callback_subscription = self.subscribe_recognition_events()
+            consumer = threading.Thread(
+                target=self._deliver_final_results, args=(self._callback_subscription, callback)
+            )
+            consumer.daemon = True
+            consumer.start()
         
         try:
             print("🎤 Mulai mendengarkan secara berkelanjutan...")
@@ -119,6 +555,9 @@ class SpeechService:
             return True
         except Exception as e:
             print(f"❌ Error memulai pengenalan berkelanjutan: {str(e)}")
+            self.is_listening = False
+            self.recognition_events.detach()
+            self._close_callback_subscription()
             return False
     
     def stop_continuous_recognition(self):
@@ -130,14 +569,73 @@ class SpeechService:
                 print("🔇 Pengenalan suara dihentikan")
         except Exception as e:
             print(f"❌ Error menghentikan pengenalan: {str(e)}")
+        finally:
+            self.recognition_events.detach()
+            self._close_callback_subscription()
+    
+    def subscribe_recognition_events(self, max_queue=None, overflow=None):
+        """Bounded event queue for continuous recognition; close() it to unsubscribe
+
+        Only events of continuous-recognition sessions are delivered, not
+        those of recognize_speech_once. overflow is drop_interim (default),
+        drop_oldest or drop_newest.
+        """
+        return self.recognition_events.subscribe(max_queue, overflow)
+    
+    def get_recognition_event_stats(self):
+        return self.recognition_events.stats()
+    
+    def _on_recognition_event(self, event, result):
+        """Keeps listening state in sync; runs on the SDK thread"""
+        if event.kind == FINAL:
+            self.apply_detected_language(result)
+            self.recognized_text = event.text
+            print(f"👤 Terdeteksi: {self.recognized_text}")
+        elif event.kind == SESSION_STOPPED:
+            print("🔇 Sesi pengenalan suara dihentikan")
+            self.is_listening = False
+            self.recognition_done = True
+        elif event.kind == CANCELED:
+            print(f"❌ Pengenalan suara dibatalkan: {event.error}")
+            self.is_listening = False
+            self.recognition_done = True
+    
+    def _deliver_final_results(self, subscription, callback):
+        for event in subscription:
+            if event.kind == FINAL:
+                try:
+                    callback(event.text)
+                except Exception as e:
+                    print(f"❌ Error pada callback pengenalan: {str(e)}")
+    
+    def _close_callback_subscription(self):
+        subscription, self._callback_subscription = self._callback_subscription, None
+        if subscription is not None:
+            subscription.close()
+    
+    def _play(self, text):
+        """Speak text on the current speaker synthesizer, remembering it for stop_speaking
+
+        A voice change or failover may replace self.speech_synthesizer while
+        this plays; stopping must still reach the synthesizer that is playing.
+        """
+        synthesizer = self._active_synthesizer = self.speech_synthesizer
+        return synthesizer.speak_text_async(text).get()
     
     def speak_text(self, text):
         """Convert text to speech and play it"""
         try:
             print(f"🔊 Mengucapkan: {text}")
             
-            # Synthesize speech
-            speech_synthesis_result = self.speech_synthesizer.speak_text_async(text).get()
+            # Synthesize speech; identical in-flight utterances share one synthesis
+            key = make_key("tts", self.speech_config.speech_synthesis_voice_name, text)
+            # Playback time grows with the text, so the timeout does too
+            timeout = self.timeout + len(text) / 10
+            speech_synthesis_result = self.inflight.do(key, lambda: self._run_with_failover(
+                lambda: self._play(text), timeout,
+                abandon=lambda: self._active_synthesizer.stop_speaking_async(),
+                dedicated=True
+            ))
             
             # Check result
             if speech_synthesis_result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
@@ -155,26 +653,173 @@ class SpeechService:
             print(f"❌ Error saat mengucapkan teks: {str(e)}")
             return False
     
-    def speak_text_async(self, text):
-        """Convert text to speech asynchronously"""
-        def speak_in_thread():
-            self.speak_text(text)
+    def resolve_output_format(self, output_format=None, voice_name=None):
+        """Pick the request format, else the voice profile format, else the default"""
+        if output_format in OUTPUT_FORMATS:
+            return output_format
+        voice_name = voice_name or self.speech_config.speech_synthesis_voice_name
+        return self.voice_formats.get(voice_name, self.output_format)
+    
+    def _acquire_synthesizer(self, voice_name, sdk_format):
+        """Idle memory-output synthesizer for the current region, voice and format"""
+        key = (self.speech_region, voice_name, sdk_format)
+        with self._pool_lock:
+            idle = self._synthesizer_pool.setdefault(key, [])
+            if idle:
+                return key, idle.pop()
+        
+        config = speechsdk.SpeechConfig(subscription=self.speech_key, region=self.speech_region)
+        config.speech_synthesis_voice_name = voice_name
+        config.set_speech_synthesis_output_format(getattr(speechsdk.SpeechSynthesisOutputFormat, sdk_format))
+        return key, speechsdk.SpeechSynthesizer(speech_config=config, audio_config=None)
+    
+    def _release_synthesizer(self, key, synthesizer):
+        with self._pool_lock:
+            self._synthesizer_pool.setdefault(key, []).append(synthesizer)
+    
+    def _synthesize_to_memory(self, text, voice_name, sdk_format):
+        """Synthesize one piece of text to memory with region failover; returns audio bytes"""
+        def synthesize():
+            key, synthesizer = self._acquire_synthesizer(voice_name, sdk_format)
+            try:
+                return synthesizer.speak_text_async(text).get()
+            finally:
+                self._release_synthesizer(key, synthesizer)
+        
+        result = self._run_with_failover(synthesize, self.timeout + len(text) / 50)
+        if result.reason != speechsdk.ResultReason.SynthesizingAudioCompleted:
+            raise RuntimeError(f"Speech synthesis dibatalkan: {result.cancellation_details.reason}")
+        return result.audio_data
+    
+    def _iter_chunked_audio(self, text, voice_name, output_format):
+        """Synthesize text split at paragraph/sentence boundaries in parallel; yield audio in order"""
+        sdk_format, mime_type = OUTPUT_FORMATS[output_format]
+        if mime_type in SINGLE_REQUEST_MIME_TYPES:
+            pieces = [text]
+        else:
+            pieces = split_for_synthesis(text, self.chunk_chars) or [text]
+        raw = RAW_PCM_FORMATS.get(output_format)
+        
+        if raw is None:
+            # A single piece needs no pool; MP3 frames concatenate in order
+            if len(pieces) == 1:
+                yield self._synthesize_to_memory(pieces[0], voice_name, sdk_format)
+                return
+        else:
+            # Headerless PCM joins without gaps under a single streaming WAV header
+            sdk_format = raw[0]
+            yield _wav_header(raw[1])
+        
+        workers = min(self.synthesis_parallelism, len(pieces))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self._synthesize_to_memory, piece, voice_name, sdk_format)
+                       for piece in pieces]
+            try:
+                for future in futures:
+                    yield future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+    
+    def stream_audio(self, text, output_format=None, voice_name=None):
+        """Start synthesis and return a cache-style entry whose "chunks" yields audio in order
+
+        Audio for the first chunk is available as soon as it is synthesized; the
+        complete clip is cached once every chunk has been produced. voice_name
+        (default: the current voice) applies to this call only.
+        """
+        voice_name = voice_name or self.speech_config.speech_synthesis_voice_name
+        output_format = self.resolve_output_format(output_format, voice_name)
+        key = make_key("tts-audio", voice_name, output_format, text)
+        entry = {
+            "format": output_format,
+            "mime_type": OUTPUT_FORMATS[output_format][1],
+            "voice": voice_name,
+        }
+        
+        with self._cache_lock:
+            cached = self.audio_cache.get(key)
+            if cached is not None:
+                self.audio_cache.move_to_end(key)
+                return dict(cached, chunks=iter([cached["audio"]]))
+        
+        subscription = self.inflight.stream(
+            key, lambda: self._iter_chunked_audio(text, voice_name, output_format)
+        )
+        
+        def chunks():
+            parts = []
+            try:
+                for part in subscription:
+                    parts.append(part)
+                    yield part
+            finally:
+                subscription.close()
+            
+            audio = b"".join(parts)
+            raw = RAW_PCM_FORMATS.get(output_format)
+            if raw is not None:
+                # The complete clip gets a header with the real data size
+                audio = _wav_header(raw[1], len(audio) - WAV_HEADER_SIZE) + audio[WAV_HEADER_SIZE:]
+            self._cache_audio(key, dict(entry, audio=audio))
+        
+        return dict(entry, chunks=chunks())
+    
+    def synthesize_audio(self, text, output_format=None):
+        """Synthesize text to encoded audio bytes; returns a cache entry dict or None"""
+        try:
+            streamed = self.stream_audio(text, output_format)
+            for _ in streamed["chunks"]:
+                pass
+        except Exception as e:
+            print(f"❌ Error saat mensintesis audio: {str(e)}")
+            return None
         
-        thread = threading.Thread(target=speak_in_thread)
-        thread.daemon = True
-        thread.start()
-        return thread
+        key = make_key("tts-audio", streamed["voice"], streamed["format"], text)
+        with self._cache_lock:
+            return self.audio_cache.get(key)
+    
+    def _cache_audio(self, key, entry):
+        with self._cache_lock:
+            self.audio_cache[key] = entry
+            self.audio_cache.move_to_end(key)
+            while len(self.audio_cache) > self.audio_cache_size:
+                self.audio_cache.popitem(last=False)
+    
+    def stop_speaking(self):
+        """Stop the utterance currently being synthesized and played"""
+        try:
+            self._active_synthesizer.stop_speaking_async().get()
+            print("⏹️ Pengucapan dihentikan")
+            return True
+        except Exception as e:
+            print(f"❌ Error menghentikan pengucapan: {str(e)}")
+            return False
+    
+    def speak_text_async(self, text, on_start=None, on_done=None):
+        """Queue text on the playback worker; returns a PlaybackItem to wait on"""
+        return self.playback.enqueue(text, on_start=on_start, on_done=on_done)
+    
+    def interrupt_playback(self):
+        """Drop queued utterances and stop the one playing"""
+        return self.playback.interrupt()
+    
+    def get_playback_stats(self):
+        return self.playback.stats()
     
     def set_language(self, language_code):
-        """Change recognition language"""
+        """Change recognition language; 'auto' or a comma separated list enables detection"""
         try:
-            self.speech_config.speech_recognition_language = language_code
+            if language_code == "auto":
+                self.auto_detect_languages = self.auto_detect_languages or list(self.language_voices)[:4]
+            elif "," in language_code:
+                self.auto_detect_languages = [c.strip() for c in language_code.split(",") if c.strip()]
+            else:
+                self.auto_detect_languages = []
+                self.speech_config.speech_recognition_language = language_code
             
             # Update recognizer with new config
-            self.speech_recognizer = speechsdk.SpeechRecognizer(
-                speech_config=self.speech_config, 
-                audio_config=self.audio_config_mic
-            )
+            self.speech_recognizer = self._build_recognizer(self.speech_config, self.audio_config_mic)
             
             print(f"🌐 Bahasa diubah ke: {language_code}")
             return True
@@ -182,16 +827,20 @@ class SpeechService:
             print(f"❌ Error mengubah bahasa: {str(e)}")
             return False
     
-    def set_voice(self, voice_name):
-        """Change synthesis voice"""
+    def set_voice(self, voice_name, output_format=None):
+        """Change synthesis voice, optionally storing its output format profile"""
+        # Checked against the cached catalog; no network round trip
+        if not self.voices.is_valid(voice_name):
+            print(f"❌ Suara tidak dikenal: {voice_name}")
+            return False
+        
         try:
-            self.speech_config.speech_synthesis_voice_name = voice_name
+            if output_format in OUTPUT_FORMATS:
+                self.voice_formats[voice_name] = output_format
             
-            # Update synthesizer with new config
-            self.speech_synthesizer = speechsdk.SpeechSynthesizer(
-                speech_config=self.speech_config, 
-                audio_config=self.audio_config_speaker
-            )
+            # Detected language switches back to this voice from now on
+            self.language_voices[voice_locale(voice_name)] = voice_name
+            self._use_voice(voice_name)
             
             print(f"🗣️ Suara diubah ke: {voice_name}")
             return True
@@ -199,21 +848,70 @@ class SpeechService:
             print(f"❌ Error mengubah suara: {str(e)}")
             return False
     
-    def get_available_voices(self):
-        """Get list of available voices (simplified list)"""
+    def get_language_status(self):
+        """Recognition language mode, candidates and the last detected language"""
         return {
-            "Indonesian": {
-                "id-ID-ArdiNeural": "Ardi (Male, Indonesian)",
-                "id-ID-GadisNeural": "Gadis (Female, Indonesian)"
-            },
-            "English": {
-                "en-US-JennyNeural": "Jenny (Female, US English)",
-                "en-US-GuyNeural": "Guy (Male, US English)",
-                "en-US-AriaNeural": "Aria (Female, US English)",
-                "en-US-DavisNeural": "Davis (Male, US English)"
-            }
+            "mode": "auto" if self.auto_detect_languages else "fixed",
+            "language": self.speech_config.speech_recognition_language,
+            "candidates": list(self.auto_detect_languages),
+            "detected": self.detected_language,
+            "voice": self.speech_config.speech_synthesis_voice_name,
         }
     
+    def get_region_stats(self):
+        """Latency and error statistics per speech region"""
+        stats = self.regions.stats()
+        for entry in stats:
+            entry["primary"] = entry["region"] == self.speech_region
+        return stats
+    
+    def _fetch_voices(self):
+        """Download the voice list for the current region"""
+        config = speechsdk.SpeechConfig(subscription=self.speech_key, region=self.speech_region)
+        synthesizer = speechsdk.SpeechSynthesizer(speech_config=config, audio_config=None)
+        result = synthesizer.get_voices_async().get()
+        if result.reason != speechsdk.ResultReason.VoicesListRetrieved:
+            raise RuntimeError(result.error_details)
+        
+        return [
+            {
+                "name": voice.short_name,
+                "display_name": voice.local_name,
+                "locale": voice.locale,
+                "gender": voice.gender.name,
+                "voice_type": voice.voice_type.name,
+                "styles": [style for style in voice.style_list if style],
+            }
+            for voice in result.voices
+        ]
+    
+    def get_available_voices(self, locale=None, gender=None):
+        """Voices grouped by locale: {locale: {voice_name: description}}
+
+        Without a locale only the configured languages are listed; use "all"
+        for the whole catalog.
+        """
+        if locale == "all":
+            locales = self.voices.locales()
+        elif locale:
+            locales = [locale]
+        else:
+            locales = sorted({voice_locale(v) for v in self.language_voices.values()}
+                             | set(self.auto_detect_languages)
+                             | {self.speech_config.speech_recognition_language})
+        
+        grouped = {}
+        for code in locales:
+            voices = self.voices.voices(code, gender)
+            if voices:
+                grouped[code] = {
+                    v["name"]: f"{v['display_name']} ({v['gender']}, {v['locale']})" for v in voices
+                }
+        return grouped
+    
+    def get_voice_catalog_stats(self):
+        return self.voices.stats()
+    
     def test_speech_services(self):
         """Test both speech recognition and synthesis"""
         print("🧪 Testing Speech Services...")
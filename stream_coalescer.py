@@ -0,0 +1,150 @@
+"""
+Streaming Output Coalescing
+Menggabungkan potongan token kecil menjadi frame yang lebih besar berdasarkan jendela waktu atau ukuran
+
+Author: Edhot Purwoko - Microsoft Indonesia
+License: MIT - Free to use
+Disclaimer: Provided "as is" without warranty. Use at your own risk.
+"""
+
+import os
+import queue
+import threading
+import time
+
+_END = object()
+
+class StreamCoalescer:
+    """Batches streamed text deltas into frames
+
+    The first delta of a response is sent at once so time-to-first-token is
+    unchanged. After that, deltas are buffered until flush_ms has passed since
+    the first buffered delta or max_bytes (UTF-8) is reached, whichever comes
+    first. A flush_ms of 0 passes every delta through unchanged. When the
+    consumer stops early, the upstream iterator is closed.
+    """
+
+    def __init__(self, flush_ms=40, max_bytes=512):
+        self.flush_seconds = max(flush_ms, 0) / 1000
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.responses = 0
+        self.deltas = 0
+        self.frames = 0
+        self.bytes = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            flush_ms=float(os.getenv("STREAM_FLUSH_MS", "40")),
+            max_bytes=int(os.getenv("STREAM_MAX_FRAME_BYTES", "512")),
+        )
+
+    def coalesce(self, chunks):
+        """Yield frames of joined text deltas from an iterator of text deltas"""
+        deltas = frames = size = 0
+        try:
+            if not self.flush_seconds:
+                chunks = iter(chunks)
+                try:
+                    for chunk in chunks:
+                        deltas += 1
+                        frames += 1
+                        size += len(chunk.encode("utf-8"))
+                        yield chunk
+                finally:
+                    _close_quietly(chunks)
+                return
+
+            for frame, count in self._frames(chunks):
+                deltas += count
+                frames += 1
+                size += len(frame.encode("utf-8"))
+                yield frame
+        finally:
+            with self._lock:
+                self.responses += 1
+                self.deltas += deltas
+                self.frames += frames
+                self.bytes += size
+
+    def _frames(self, chunks):
+        """(frame, delta count) pairs; a pump thread reads upstream so flushes happen on time"""
+        pending = queue.Queue()
+        stopped = threading.Event()
+        chunks = iter(chunks)
+
+        def pump():
+            try:
+                for chunk in chunks:
+                    if stopped.is_set():
+                        break
+                    pending.put(chunk)
+            except Exception as e:
+                pending.put(e)
+            finally:
+                # The upstream is closed here, on the thread iterating it
+                if stopped.is_set():
+                    _close_quietly(chunks)
+                pending.put(_END)
+
+        thread = threading.Thread(target=pump)
+        thread.daemon = True
+        thread.start()
+
+        buffer = []
+        buffered = 0
+        deadline = None
+        first = True
+        try:
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.time())
+                try:
+                    item = pending.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is _END or isinstance(item, Exception) or item is None:
+                    if buffer:
+                        yield "".join(buffer), len(buffer)
+                        buffer, buffered, deadline = [], 0, None
+                    if item is _END:
+                        return
+                    if item is not None:
+                        raise item
+                    continue
+
+                buffer.append(item)
+                buffered += len(item.encode("utf-8"))
+                if first or buffered >= self.max_bytes:
+                    first = False
+                    yield "".join(buffer), len(buffer)
+                    buffer, buffered, deadline = [], 0, None
+                elif deadline is None:
+                    deadline = time.time() + self.flush_seconds
+        finally:
+            stopped.set()
+
+    def stats(self):
+        """Frames per response and bytes per frame"""
+        with self._lock:
+            return {
+                "responses": self.responses,
+                "deltas": self.deltas,
+                "frames": self.frames,
+                "frames_per_response": round(self.frames / self.responses, 1) if self.responses else 0.0,
+                "bytes_per_frame": round(self.bytes / self.frames, 1) if self.frames else 0.0,
+                "deltas_per_frame": round(self.deltas / self.frames, 2) if self.frames else 0.0,
+                "flush_ms": round(self.flush_seconds * 1000),
+                "max_bytes": self.max_bytes,
+            }
+
+def _close_quietly(chunks):
+    close = getattr(chunks, "close", None)
+    if close is not None:
+        try:
+            close()
+        except Exception:
+            pass
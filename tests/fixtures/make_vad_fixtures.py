@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Generate the WAV fixtures used by tests/test_vad.py
+
+Author: Edhot Purwoko - Microsoft Indonesia
+License: MIT - Free to use
+Disclaimer: Provided "as is" without warranty. Use at your own risk.
+"""
+
+import math
+import os
+import random
+import struct
+import wave
+
+SAMPLE_RATE = 8000
+
+# (start_s, end_s) of the voiced stretches in speech.wav and speech_noise.wav
+SPEECH_SPANS = [(0.6, 1.5), (2.3, 3.0)]
+DURATION_S = 3.6
+
+# One continuous utterance, longer than the noise window, in speech_long.wav
+LONG_SPANS = [(0.5, 7.0)]
+LONG_DURATION_S = 7.6
+
+def voiced(t):
+    """Harmonic signal at a 140 Hz pitch with a syllable-rate envelope"""
+    envelope = 0.7 + 0.3 * math.sin(2 * math.pi * 4 * t)
+    return envelope * sum(math.sin(2 * math.pi * 140 * k * t) / k for k in range(1, 6)) * 0.3
+
+def rumble(rng, level_db, duration_s=DURATION_S):
+    """Steady low-frequency noise (fan/engine hum) with a low zero-crossing rate"""
+    state = 0.0
+    samples = []
+    for _ in range(int(duration_s * SAMPLE_RATE)):
+        state = 0.98 * state + 0.02 * rng.uniform(-1, 1)
+        samples.append(state)
+    rms = math.sqrt(sum(s * s for s in samples) / len(samples))
+    scale = 10 ** (level_db / 20) / rms
+    return [s * scale for s in samples]
+
+def render(spans, noise_db=None, duration_s=DURATION_S):
+    total = int(duration_s * SAMPLE_RATE)
+    samples = [0.0] * total
+    for start, end in spans:
+        for i in range(int(start * SAMPLE_RATE), int(end * SAMPLE_RATE)):
+            samples[i] += voiced(i / SAMPLE_RATE)
+    if noise_db is not None:
+        for i, value in enumerate(rumble(random.Random(7), noise_db, duration_s)):
+            samples[i] += value
+    return samples
+
+def write(path, samples):
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(b"".join(
+            struct.pack("<h", max(-32768, min(32767, int(s * 32767)))) for s in samples
+        ))
+
+def main():
+    directory = os.path.dirname(os.path.abspath(__file__))
+    write(os.path.join(directory, "silence.wav"), render([]))
+    write(os.path.join(directory, "speech.wav"), render(SPEECH_SPANS))
+    # The rumble sits well above the default -45 dBFS threshold
+    write(os.path.join(directory, "speech_noise.wav"), render(SPEECH_SPANS, noise_db=-32))
+    write(os.path.join(directory, "speech_long.wav"), render(LONG_SPANS, duration_s=LONG_DURATION_S))
+
+if __name__ == "__main__":
+    main()
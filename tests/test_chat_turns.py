@@ -0,0 +1,49 @@
+"""
+Chat turn lifecycle tests with the upstream completion call replaced
+(skipped when the Azure OpenAI/Speech packages are not installed)
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import chatbot
+except ImportError:
+    chatbot = None
+
+ENV = {
+    "AZURE_OPENAI_ENDPOINT": "https://example.openai.azure.com",
+    "AZURE_OPENAI_API_KEY": "test-key",
+    "AZURE_OPENAI_API_VERSION": "2024-06-01",
+    "AZURE_OPENAI_DEPLOYMENT_NAME": "chat",
+    "AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME": "",
+    "FLIGHT_RECORDER_DUMP": "",
+}
+
+@unittest.skipUnless(chatbot, "openai dan azure-cognitiveservices-speech belum terpasang")
+class ChatTurnTest(unittest.TestCase):
+
+    def setUp(self):
+        with mock.patch.dict(os.environ, ENV), \
+                mock.patch.object(chatbot, "SpeechService", side_effect=RuntimeError("no speech")):
+            self.bot = chatbot.SimpleChatbot()
+
+    def test_upstream_failure_finishes_the_turn(self):
+        session = "client-1"
+        with mock.patch.object(self.bot.router, "complete", side_effect=RuntimeError("upstream down")):
+            turn = self.bot.start_turn("Halo", session=session)
+            with self.assertRaises(RuntimeError):
+                turn.result()
+
+        # No stale turn to cancel, and no unanswered question left in history
+        self.assertNotIn(session, self.bot.active_turns)
+        self.assertFalse(self.bot.cancel_active_turn(session))
+        self.assertEqual(self.bot.conversation_history, [self.bot._prefix[0]])
+        self.assertEqual(self.bot.get_recent_turns(1)[0]["outcome"], "error")
+
+if __name__ == "__main__":
+    unittest.main()
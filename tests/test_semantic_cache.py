@@ -0,0 +1,44 @@
+"""
+Semantic cache vector index tests (no embedding service needed)
+"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from semantic_cache import VectorIndex
+
+def one_hot(row, dim=8):
+    vector = np.zeros(dim, dtype=np.float32)
+    vector[row] = 1.0
+    return vector
+
+class VectorIndexTest(unittest.TestCase):
+
+    def test_batch_overflowing_a_partly_full_index(self):
+        index = VectorIndex(capacity=4)
+        index.add_batch([one_hot(i) for i in range(3)], [{"question": f"q{i + 1}"} for i in range(3)])
+        # q1 is the least recently used, then q2; q3 was used last
+        index.last_used[:3] = [10.0, 20.0, 30.0]
+
+        evicted = index.add_batch([one_hot(i) for i in range(3, 6)], [{"question": f"q{i + 1}"} for i in range(3, 6)])
+
+        self.assertEqual(evicted, 2)
+        self.assertEqual([entry["question"] for entry in index.entries], ["q5", "q6", "q3", "q4"])
+        # Every stored vector still belongs to its own entry
+        for question, position in (("q3", 2), ("q4", 3), ("q5", 4), ("q6", 5)):
+            row, similarity = index.search(one_hot(position))
+            self.assertEqual(index.entries[row]["question"], question)
+            self.assertAlmostEqual(similarity, 1.0, places=5)
+
+    def test_batch_fits_in_free_rows(self):
+        index = VectorIndex(capacity=4)
+        self.assertEqual(index.add_batch([one_hot(0), one_hot(1)], [{"question": "a"}, {"question": "b"}]), 0)
+        self.assertEqual(len(index), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Voice activity detector tests against the WAV fixtures in tests/fixtures
+(regenerate them with python tests/fixtures/make_vad_fixtures.py)
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vad import VoiceActivityDetector, read_wav
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Voiced stretches in speech.wav and speech_noise.wav (ms)
+SPEECH_SPANS = [(600, 1500), (2300, 3000)]
+# One continuous utterance in speech_long.wav (ms)
+LONG_SPAN = (500, 7000)
+PRE_ROLL_MS = 150
+HANGOVER_MS = 300
+TOLERANCE_MS = 60
+
+def detect(name, **overrides):
+    pcm, sample_rate = read_wav(os.path.join(FIXTURES, name))
+    vad = VoiceActivityDetector(sample_rate, pre_roll_ms=PRE_ROLL_MS, hangover_ms=HANGOVER_MS, **overrides)
+    return vad, list(vad.segments([pcm])), pcm
+
+class VoiceActivityDetectorTest(unittest.TestCase):
+
+    def assert_speech_boundaries(self, segments):
+        self.assertEqual(len(segments), len(SPEECH_SPANS), segments)
+        for segment, (start, end) in zip(segments, SPEECH_SPANS):
+            # Segments open pre_roll before the onset and close after the hangover
+            self.assertAlmostEqual(segment.start_ms, start - PRE_ROLL_MS, delta=TOLERANCE_MS)
+            self.assertAlmostEqual(segment.end_ms, end + HANGOVER_MS, delta=TOLERANCE_MS)
+
+    def test_silence_has_no_segments(self):
+        vad, segments, _ = detect("silence.wav")
+        self.assertEqual(segments, [])
+        self.assertEqual(vad.voiced_ratio(), 0.0)
+
+    def test_speech_boundaries(self):
+        _, segments, _ = detect("speech.wav")
+        self.assert_speech_boundaries(segments)
+
+    def test_speech_over_steady_noise(self):
+        # The noise is louder than the fixed threshold; only the tracked floor rejects it
+        vad, segments, _ = detect("speech_noise.wav")
+        self.assert_speech_boundaries(segments)
+        self.assertGreater(vad.noise_floor_db, vad.energy_threshold_db)
+
+    def test_long_utterance_is_one_segment(self):
+        # The utterance outlasts the 2 s noise window; its own frames must not become the floor
+        _, segments, _ = detect("speech_long.wav")
+        self.assertEqual(len(segments), 1, segments)
+        start, end = LONG_SPAN
+        self.assertAlmostEqual(segments[0].start_ms, start - PRE_ROLL_MS, delta=TOLERANCE_MS)
+        self.assertAlmostEqual(segments[0].end_ms, end + HANGOVER_MS, delta=TOLERANCE_MS)
+
+    def test_max_segment_split(self):
+        _, segments, _ = detect("speech.wav", max_segment_ms=600)
+        self.assertGreater(len(segments), len(SPEECH_SPANS))
+        self.assertTrue(all(s.end_ms - s.start_ms <= 600 for s in segments))
+
+    def test_forced_split_falls_in_a_pause(self):
+        # 1200 ms forces a split of the first 1350 ms segment; a hard cut would land
+        # at 1650 ms, inside the hangover, instead of at the start of the pause (1500 ms)
+        _, segments, _ = detect("speech.wav", max_segment_ms=1200)
+        first_end = segments[0].end_ms
+        self.assertGreaterEqual(first_end, SPEECH_SPANS[0][1])
+        self.assertLessEqual(first_end, SPEECH_SPANS[0][1] + 2 * 30)
+        self.assertEqual(segments[1].start_ms, first_end)
+
+    def test_voiced_chunks_are_separated_by_silence(self):
+        pcm, sample_rate = read_wav(os.path.join(FIXTURES, "speech.wav"))
+        vad = VoiceActivityDetector(sample_rate)
+        chunks = list(vad.voiced_chunks([pcm], gap_ms=200))
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(chunks[1], b"\x00" * (sample_rate * 200 // 1000 * 2))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,6 +7,8 @@ Chatbot yang menerima input text dan merespons dengan suara
 import os
 from dotenv import load_dotenv
 from chatbot import SimpleChatbot
+from playback import INTERRUPT, MODES, parse_mode
+from fair_scheduler import BudgetExceeded
 
 def main():
     """Main function untuk Text-to-Speech chatbot CLI"""
@@ -26,8 +28,16 @@ def main():
     print("💡 Ketik pesan Anda, dan bot akan merespons dengan suara")
     print("💡 Ketik 'quit', 'exit', atau 'bye' untuk keluar")
     print("💡 Ketik 'clear' untuk menghapus history percakapan")
+    print("💡 Tekan Ctrl-C untuk menghentikan respons yang sedang berjalan")
+    print("💡 Ketik pesan berikutnya kapan saja, bahkan saat bot masih berbicara")
+    print("💡 Ketik 'mode interrupt' (potong jawaban sebelumnya) atau 'mode queue' (antrekan)")
+    print("💡 Ketik 'stop' untuk menghentikan suara yang sedang diputar")
     print("-" * 50)
     
+    # interrupt: new input stops the previous answer; queue: it is spoken afterwards
+    mode = parse_mode(os.getenv("PLAYBACK_MODE"))
+    print(f"🔁 Mode pemutaran: {mode}")
+    
     try:
         while True:
             # Input text dari user
@@ -35,6 +45,7 @@ def main():
             
             # Check for exit commands
             if user_input.lower() in ['quit', 'exit', 'bye', 'keluar']:
+                bot.interrupt_playback()
                 print("👋 Terima kasih! Sampai jumpa!")
                 break
             
@@ -44,31 +55,51 @@ def main():
                 print("✅ History percakapan telah dihapus!")
                 continue
             
+            # Switch playback mode
+            if user_input.lower().startswith('mode'):
+                requested = user_input.lower()[4:].strip()
+                if requested in MODES:
+                    mode = requested
+                    print(f"🔁 Mode pemutaran: {mode}")
+                else:
+                    print("⚠️ Contoh: mode interrupt, mode queue")
+                continue
+            
+            # Stop playback without starting a new turn
+            if user_input.lower() == 'stop':
+                if bot.interrupt_playback():
+                    print("⏹️ Suara dihentikan")
+                continue
+            
             # Skip empty input
             if not user_input:
                 continue
             
+            # The new turn is generated while the previous answer is still playing
+            try:
+                turn = bot.start_turn(user_input, interrupt=(mode == INTERRUPT), source="cli-tts", speak=True)
+            except BudgetExceeded as e:
+                print(f"⏳ {e}")
+                continue
             try:
                 print("🤖 Menggenerate respons...")
                 
                 # Get text response
-                response = bot.get_response(user_input, stream=False)
+                response = turn.result()
                 
                 if response:
                     print(f"🤖 Bot: {response}")
                     
-                    # Speak the response
-                    print("🔊 Berbicara...")
-                    success = bot.speak_response(response)
-                    
-                    if success:
-                        print("✅ Respons telah diucapkan!")
-                    else:
+                    # Queue the response for playback and go back to the prompt
+                    if turn.speak_async() is None:
                         print("❌ Gagal mengucapkan respons")
                 else:
+                    turn.finish()
                     print("❌ Tidak mendapat respons dari bot")
                     
             except KeyboardInterrupt:
+                # Abort generation and speech for this turn
+                turn.cancel()
                 print("\n⏸️  Proses dihentikan oleh user")
                 continue
             except Exception as e:
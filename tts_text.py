@@ -0,0 +1,201 @@
+"""
+Text Preparation for Speech Synthesis
+Normalisasi markdown menjadi teks lisan, dan pemecahan teks panjang per paragraf/kalimat untuk sintesis paralel
+
+Author: Edhot Purwoko - Microsoft Indonesia
+License: MIT - Free to use
+Disclaimer: Provided "as is" without warranty. Use at your own risk.
+"""
+
+import logging
+import os
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+
+def _hard_split(sentence, max_chars):
+    """Split an over-long sentence at the last space before the limit"""
+    while len(sentence) > max_chars:
+        cut = sentence.rfind(" ", 0, max_chars)
+        cut = cut if cut > 0 else max_chars
+        yield sentence[:cut].strip()
+        sentence = sentence[cut:].strip()
+    if sentence:
+        yield sentence
+
+def split_for_synthesis(text, max_chars=400):
+    """Split text into chunks of at most max_chars
+
+    Whole paragraphs are kept together when they fit; longer paragraphs are
+    split at sentence boundaries, and over-long sentences at spaces.
+    """
+    chunks = []
+    current = ""
+
+    for paragraph in re.split(r"\n\s*\n", text or ""):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+
+        if len(paragraph) <= max_chars:
+            units = [paragraph]
+        else:
+            units = [piece for sentence in SENTENCE_END.split(paragraph)
+                     for piece in _hard_split(sentence, max_chars)]
+
+        for unit in units:
+            if current and len(current) + 1 + len(unit) > max_chars:
+                chunks.append(current)
+                current = unit
+            else:
+                current = f"{current} {unit}" if current else unit
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+CODE_FENCE = re.compile(r"```.*?(?:```|$)", re.DOTALL)
+TABLE_ROW = re.compile(r"^\s*\|.*\|\s*$", re.MULTILINE)
+MARKDOWN_LINK = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+BARE_URL = re.compile(r"(?:https?://|www\.)\S+")
+HEADING = re.compile(r"^\s{0,3}#{1,6}(?:[ \t]+|$)", re.MULTILINE)
+BLOCKQUOTE = re.compile(r"^\s*>\s?", re.MULTILINE)
+LIST_ITEM = re.compile(r"^\s*(?:[-*+•·▪◦]|\d+[.)])\s+")
+HORIZONTAL_RULE = re.compile(r"^\s*(?:[-*_]\s*){3,}$", re.MULTILINE)
+# Paired markers outside words only, so "3 * 4", "2*3*4" and snake_case survive
+EMPHASIS = re.compile(r"(?<!\w)(\*{1,3}|_{1,3}|~~)(?=\S)(.+?)(?<=\S)\1(?!\w)")
+INLINE_CODE = re.compile(r"`([^`]*)`")
+HTML_TAG = re.compile(
+    r"</?(?:a|b|i|u|s|em|strong|code|pre|span|div|p|br|hr|sub|sup|small|mark|del|ins|"
+    r"ul|ol|li|table|thead|tbody|tr|td|th|h[1-6]|blockquote|img)\b[^<>]*/?>",
+    re.IGNORECASE,
+)
+
+# Spoken words by language (the first part of a locale such as "en-US")
+LINK_WORDS = {"id": "tautan", "ms": "pautan", "en": "link"}
+SCREEN_FALLBACKS = {
+    "id": "Selengkapnya bisa dilihat di layar.",
+    "ms": "Selengkapnya boleh dilihat di skrin.",
+    "en": "The full answer is on the screen.",
+}
+
+def _language_key(language):
+    return (language or "").split("-")[0].lower()
+
+class SpeechTextNormalizer:
+    """Turns chat markdown into plain text worth reading aloud
+
+    Code blocks and tables are dropped, links and emphasis keep only their
+    text, list items become sentences, and overly long answers are cut at a
+    sentence boundary followed by a pointer to the screen. URLs and the
+    pointer are spoken in the answer's language (or language when none is
+    given); a configured fallback sentence is used for every language.
+    """
+
+    def __init__(self, max_chars=600, fallback=None, language="id"):
+        self.max_chars = max_chars
+        self.fallback = fallback
+        self.language = language
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.texts = 0
+        self.chars_in = 0
+        self.chars_out = 0
+        self.capped = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_chars=int(os.getenv("TTS_MAX_SPOKEN_CHARS", "600")),
+            fallback=os.getenv("TTS_SCREEN_FALLBACK") or None,
+            language=os.getenv("TTS_LANGUAGE", "id"),
+        )
+
+    def normalize(self, text, language=None):
+        """Return the spoken form of text; language is the locale it will be spoken in"""
+        key = _language_key(language)
+        if key not in LINK_WORDS:
+            key = _language_key(self.language)
+        link_word = LINK_WORDS.get(key, LINK_WORDS["en"])
+        fallback = self.fallback or SCREEN_FALLBACKS.get(key, SCREEN_FALLBACKS["en"])
+
+        spoken = strip_markup(text or "", link_word)
+        capped = False
+        if self.max_chars and len(spoken) > self.max_chars:
+            spoken = _cut_at_sentence(spoken, self.max_chars - len(fallback) - 1)
+            spoken = f"{spoken} {fallback}".strip()
+            capped = True
+        elif not spoken and text and text.strip():
+            # Nothing speakable left (e.g. an answer that is only code)
+            spoken = fallback
+
+        saved = len(text or "") - len(spoken)
+        with self._lock:
+            self.texts += 1
+            self.chars_in += len(text or "")
+            self.chars_out += len(spoken)
+            self.capped += capped
+        if saved > 0:
+            logger.info("tts normalize chars_in=%d chars_out=%d saved=%d capped=%s",
+                        len(text or ""), len(spoken), saved, capped)
+        return spoken
+
+    def stats(self):
+        """Characters removed before synthesis"""
+        with self._lock:
+            saved = self.chars_in - self.chars_out
+            return {
+                "texts": self.texts,
+                "chars_in": self.chars_in,
+                "chars_out": self.chars_out,
+                "chars_saved": saved,
+                "saved_ratio": round(saved / self.chars_in, 3) if self.chars_in else 0.0,
+                "capped": self.capped,
+            }
+
+def strip_markup(text, link_word="tautan"):
+    """Remove markdown, code, HTML tags and URLs, collapsing lists into sentences
+
+    Only markup is removed; characters such as "*", "<" or "_" in ordinary
+    text ("3 * 4 = 12", "a < b", snake_case) are kept.
+    """
+    text = CODE_FENCE.sub("\n", text)
+    text = TABLE_ROW.sub("", text)
+    text = HORIZONTAL_RULE.sub("", text)
+    text = MARKDOWN_LINK.sub(r"\1", text)
+    text = BARE_URL.sub(link_word, text)
+    text = HTML_TAG.sub(" ", text)
+    text = HEADING.sub("", text)
+    text = BLOCKQUOTE.sub("", text)
+    text = INLINE_CODE.sub(r"\1", text)
+    text = EMPHASIS.sub(r"\2", text)
+
+    sentences = []
+    for line in text.splitlines():
+        line = " ".join(LIST_ITEM.sub("", line).split())
+        if not line:
+            continue
+        # Headings and list items read as separate sentences
+        if line[-1] not in ".!?:;,…":
+            line += "."
+        sentences.append(line)
+
+    spoken = " ".join(sentences)
+    spoken = re.sub(r"\s+([,.!?;:])", r"\1", spoken)
+    return " ".join(spoken.split())
+
+def _cut_at_sentence(text, limit):
+    """Longest prefix ending at a sentence boundary within limit (or a word boundary)"""
+    limit = max(limit, 1)
+    if len(text) <= limit:
+        return text
+    head = text[:limit]
+    ends = [m.end() for m in re.finditer(r"[.!?…](?=\s|$)", head)]
+    if ends and ends[-1] >= limit // 3:
+        return head[:ends[-1]].strip()
+    cut = head.rfind(" ")
+    return (head[:cut] if cut > 0 else head).rstrip(",;: ") + "."
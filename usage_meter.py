@@ -0,0 +1,72 @@
+"""
+Token Usage Accounting
+Mencatat prompt, cached dan completion token per sesi dan global untuk memantau prompt caching
+
+Author: Edhot Purwoko - Microsoft Indonesia
+License: MIT - Free to use
+Disclaimer: Provided "as is" without warranty. Use at your own risk.
+"""
+
+import threading
+from collections import OrderedDict
+
+def usage_counts(usage):
+    """(prompt, cached, completion) tokens from an OpenAI usage object"""
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) or 0
+    return usage.prompt_tokens or 0, cached, usage.completion_tokens or 0
+
+class _Totals:
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+
+    def add(self, prompt, cached, completion):
+        self.requests += 1
+        self.prompt_tokens += prompt
+        self.cached_tokens += cached
+        self.completion_tokens += completion
+
+    def snapshot(self):
+        return {
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_ratio": round(self.cached_tokens / self.prompt_tokens, 3) if self.prompt_tokens else 0.0,
+        }
+
+class UsageMeter:
+    """Global and per-session token totals (the most recent max_sessions sessions are kept)"""
+
+    def __init__(self, max_sessions=100):
+        self.max_sessions = max_sessions
+        self.total = _Totals()
+        self.sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, session_id, usage):
+        """Add one response's usage; returns (prompt, cached, completion)"""
+        counts = usage_counts(usage)
+        with self._lock:
+            self.total.add(*counts)
+            totals = self.sessions.get(session_id)
+            if totals is None:
+                totals = self.sessions[session_id] = _Totals()
+                while len(self.sessions) > self.max_sessions:
+                    self.sessions.popitem(last=False)
+            self.sessions.move_to_end(session_id)
+            totals.add(*counts)
+        return counts
+
+    def stats(self, session_id=None):
+        with self._lock:
+            if session_id is not None:
+                totals = self.sessions.get(session_id)
+                return totals.snapshot() if totals else _Totals().snapshot()
+            return {
+                "global": self.total.snapshot(),
+                "sessions": {sid: t.snapshot() for sid, t in reversed(self.sessions.items())},
+            }
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Local Voice Activity Detection
+Deteksi suara lokal (CPU-only) untuk memotong hening sebelum audio dikirim ke Azure Speech
+
+Author: Edhot Purwoko - Microsoft Indonesia
+License: MIT - Free to use
+Disclaimer: Provided "as is" without warranty. Use at your own risk.
+"""
+
+import bisect
+import math
+import os
+import sys
+import wave
+from array import array
+from collections import deque
+
+SAMPLE_WIDTH = 2  # 16-bit PCM
+
+def read_wav(path):
+    """Read a 16-bit mono WAV file; returns (pcm_bytes, sample_rate)"""
+    with wave.open(path, "rb") as wav:
+        check_wav_format(wav)
+        return wav.readframes(wav.getnframes()), wav.getframerate()
+
+def check_wav_format(wav):
+    """Raise ValueError unless the open wave file is 16-bit mono PCM"""
+    if wav.getsampwidth() != SAMPLE_WIDTH or wav.getnchannels() != 1:
+        raise ValueError("File WAV harus PCM 16-bit mono")
+
+class SpeechSegment:
+    """A voiced stretch of audio"""
+
+    def __init__(self, start_ms, end_ms, pcm):
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.pcm = pcm
+
+    def __repr__(self):
+        return f"SpeechSegment({self.start_ms}ms-{self.end_ms}ms)"
+
+class VoiceActivityDetector:
+    """Energy and zero-crossing VAD over fixed-size 16-bit mono PCM frames"""
+
+    def __init__(self, sample_rate=16000, frame_ms=30, energy_threshold_db=-45.0,
+                 noise_margin_db=10.0, hangover_ms=300, min_speech_ms=90,
+                 pre_roll_ms=150, max_segment_ms=30000, noise_window_ms=2000,
+                 noise_percentile=10):
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_bytes = int(sample_rate * frame_ms / 1000) * SAMPLE_WIDTH
+        self.energy_threshold_db = energy_threshold_db
+        self.noise_margin_db = noise_margin_db
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.pre_roll_frames = max(0, pre_roll_ms // frame_ms)
+        self.max_segment_frames = max(1, max_segment_ms // frame_ms)
+        self.noise_floor_db = energy_threshold_db - noise_margin_db
+        # The floor is a low percentile of recent non-speech frames; voiced frames are
+        # kept out so a long utterance cannot raise the floor into its own level
+        self.noise_percentile = noise_percentile
+        self._recent_energy = deque(maxlen=max(1, noise_window_ms // frame_ms))
+
+        # Statistics for the last processed input
+        self.frames_total = 0
+        self.frames_voiced = 0
+
+    @classmethod
+    def from_env(cls, sample_rate=16000, **overrides):
+        """Build a detector using VAD_* environment settings; keyword arguments win"""
+        settings = {
+            "energy_threshold_db": float(os.getenv("VAD_ENERGY_THRESHOLD_DB", "-45")),
+            "noise_margin_db": float(os.getenv("VAD_NOISE_MARGIN_DB", "10")),
+            "hangover_ms": int(os.getenv("VAD_HANGOVER_MS", "300")),
+            "min_speech_ms": int(os.getenv("VAD_MIN_SPEECH_MS", "90")),
+            "pre_roll_ms": int(os.getenv("VAD_PRE_ROLL_MS", "150")),
+            "max_segment_ms": int(os.getenv("VAD_MAX_SEGMENT_MS", "30000")),
+            "noise_window_ms": int(os.getenv("VAD_NOISE_WINDOW_MS", "2000")),
+        }
+        settings.update(overrides)
+        return cls(sample_rate=sample_rate, **settings)
+
+    def frame_energy_db(self, frame):
+        """RMS level of a frame in dBFS"""
+        samples = array("h", frame)
+        if sys.byteorder != "little":
+            samples.byteswap()
+        if not samples:
+            return -120.0
+        mean_square = sum(s * s for s in samples) / len(samples)
+        if mean_square <= 0:
+            return -120.0
+        return 10 * math.log10(mean_square / (32768.0 * 32768.0))
+
+    def zero_crossing_rate(self, frame):
+        """Fraction of adjacent samples that change sign"""
+        samples = array("h", frame)
+        if sys.byteorder != "little":
+            samples.byteswap()
+        if len(samples) < 2:
+            return 0.0
+        crossings = sum(1 for a, b in zip(samples, samples[1:]) if (a < 0) != (b < 0))
+        return crossings / (len(samples) - 1)
+
+    def is_speech(self, frame):
+        """Classify one frame against the fixed threshold and the tracked noise floor"""
+        return self._classify(frame)[0]
+    
+    def _classify(self, frame):
+        """(speech?, energy in dBFS) for one frame"""
+        energy = self.frame_energy_db(frame)
+        # A frame is judged against the floor as if it were noise, so steady noise
+        # above the fixed threshold is learned from its first frame on
+        floor = self._floor_with(energy)
+        threshold = max(self.energy_threshold_db, floor + self.noise_margin_db)
+        # Broadband hiss has very high zero-crossing rates even when loud
+        speech = energy >= threshold and self.zero_crossing_rate(frame) < 0.5
+        if not speech:
+            self._recent_energy.append(energy)
+            self.noise_floor_db = floor
+        return speech, energy
+
+    def _floor_with(self, energy):
+        """Low percentile of the recent non-speech energies plus this frame"""
+        ordered = sorted(self._recent_energy)
+        ordered.insert(bisect.bisect(ordered, energy), energy)
+        if len(ordered) > self._recent_energy.maxlen:
+            # The oldest frame leaves the window when this one is added
+            ordered.remove(self._recent_energy[0])
+        return ordered[len(ordered) * self.noise_percentile // 100]
+
+    def iter_frames(self, chunks):
+        """Regroup arbitrary PCM chunks into whole frames (a trailing partial frame is dropped)"""
+        pending = b""
+        for chunk in chunks:
+            data = pending + chunk if pending else chunk
+            offset = 0
+            while offset + self.frame_bytes <= len(data):
+                yield data[offset:offset + self.frame_bytes]
+                offset += self.frame_bytes
+            pending = data[offset:]
+
+    def segments(self, chunks):
+        """Yield SpeechSegment objects from an iterable of PCM chunks
+
+        Only the segment being built is held in memory, so this works on streams
+        and arbitrarily long files. Segments longer than max_segment_ms are split
+        at the quietest frame of their last quarter (at most one second), so a
+        forced split falls between words rather than inside one.
+        """
+        self.frames_total = 0
+        self.frames_voiced = 0
+        pre_roll = deque(maxlen=self.pre_roll_frames + self.min_speech_frames)
+        segment = []
+        energies = []
+        start_frame = 0
+        onset = 0
+        silence_run = 0
+        in_speech = False
+
+        for index, frame in enumerate(self.iter_frames(chunks)):
+            self.frames_total += 1
+            speech, energy = self._classify(frame)
+
+            if not in_speech:
+                pre_roll.append((frame, energy))
+                onset = onset + 1 if speech else 0
+                if onset >= self.min_speech_frames:
+                    in_speech = True
+                    segment = [f for f, _ in pre_roll]
+                    energies = [e for _, e in pre_roll]
+                    start_frame = index + 1 - len(segment)
+                    self.frames_voiced += len(segment)
+                    pre_roll.clear()
+                    silence_run = 0
+                continue
+
+            segment.append(frame)
+            energies.append(energy)
+            self.frames_voiced += 1
+            silence_run = 0 if speech else silence_run + 1
+
+            if silence_run >= self.hangover_frames:
+                yield self._make_segment(start_frame, segment)
+                segment = []
+                energies = []
+                in_speech = False
+                onset = 0
+            elif len(segment) >= self.max_segment_frames:
+                # The frames after the cut start the next segment
+                cut = self._split_point(energies)
+                yield self._make_segment(start_frame, segment[:cut])
+                segment, energies = segment[cut:], energies[cut:]
+                start_frame += cut
+
+        if in_speech and segment:
+            yield self._make_segment(start_frame, segment)
+
+    def voiced_chunks(self, chunks, gap_ms=0):
+        """Yield only the PCM of voiced segments, with gap_ms of silence between them
+
+        The gap keeps the last word of one segment from running into the first
+        word of the next when the segments are recognized as one stream.
+        """
+        gap = b"\x00" * self._ms_to_bytes(gap_ms)
+        for index, segment in enumerate(self.segments(chunks)):
+            if index and gap:
+                yield gap
+            yield segment.pcm
+
+    def trim(self, pcm):
+        """Return pcm with leading and trailing silence removed (b'' if no speech)"""
+        first = last = None
+        for segment in self.segments([pcm]):
+            if first is None:
+                first = segment.start_ms
+            last = segment.end_ms
+        if first is None:
+            return b""
+        start = self._ms_to_bytes(first)
+        end = self._ms_to_bytes(last)
+        return pcm[start:end]
+
+    def voiced_ratio(self):
+        """Share of frames forwarded as speech in the last processed input"""
+        if not self.frames_total:
+            return 0.0
+        return self.frames_voiced / self.frames_total
+
+    def _split_point(self, energies):
+        """Frame count to keep: up to and including the quietest frame near the end"""
+        search = max(1, min(len(energies) // 4, 1000 // self.frame_ms))
+        first = len(energies) - search
+        quietest = min(range(first, len(energies)), key=lambda i: energies[i])
+        return quietest + 1
+
+    def _make_segment(self, start_frame, frames):
+        start_ms = start_frame * self.frame_ms
+        return SpeechSegment(start_ms, start_ms + len(frames) * self.frame_ms, b"".join(frames))
+
+    def _ms_to_bytes(self, ms):
+        return int(self.sample_rate * ms / 1000) * SAMPLE_WIDTH
+
+def main():
+    """Print the voiced segments found in a WAV file"""
+    if len(sys.argv) < 2:
+        print("Penggunaan: python vad.py <file.wav>")
+        return
+
+    pcm, sample_rate = read_wav(sys.argv[1])
+    vad = VoiceActivityDetector.from_env(sample_rate)
+    for segment in vad.segments([pcm]):
+        print(f"🗣️ {segment.start_ms / 1000:.2f}s - {segment.end_ms / 1000:.2f}s")
+    print(f"📊 Frame bersuara: {vad.frames_voiced}/{vad.frames_total} ({vad.voiced_ratio():.0%})")
+
+if __name__ == "__main__":
+    main()
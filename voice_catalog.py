@@ -0,0 +1,170 @@
+"""
+Azure Speech Voice Catalog
+Daftar suara lengkap dari Azure Speech, di-cache di memori dan disk, diperbarui di background
+
+Author: Edhot Purwoko - Microsoft Indonesia
+License: MIT - Free to use
+Disclaimer: Provided "as is" without warranty. Use at your own risk.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+
+# Used until the first successful fetch when there is no cache file yet
+BUILTIN_VOICES = [
+    {"name": "id-ID-ArdiNeural", "display_name": "Ardi", "locale": "id-ID", "gender": "Male"},
+    {"name": "id-ID-GadisNeural", "display_name": "Gadis", "locale": "id-ID", "gender": "Female"},
+    {"name": "en-US-JennyNeural", "display_name": "Jenny", "locale": "en-US", "gender": "Female"},
+    {"name": "en-US-GuyNeural", "display_name": "Guy", "locale": "en-US", "gender": "Male"},
+    {"name": "en-US-AriaNeural", "display_name": "Aria", "locale": "en-US", "gender": "Female"},
+    {"name": "en-US-DavisNeural", "display_name": "Davis", "locale": "en-US", "gender": "Male"},
+]
+
+# Short voice names: locale (optionally with script/region variants), then the voice
+VOICE_NAME = re.compile(r"^[a-z]{2,3}-[A-Za-z]{2,4}(?:-[A-Za-z]+)?-[A-Za-z0-9:]+$")
+
+class VoiceCatalog:
+    """Voice list indexed by name, locale and gender
+
+    fetch() returns a list of voice dicts (name, display_name, locale, gender,
+    ...). Lookups never touch the network; refreshes happen in the background
+    once the cached list is older than ttl seconds.
+    """
+
+    def __init__(self, fetch, cache_path=None, ttl=24 * 3600, retry_seconds=300):
+        self.fetch = fetch
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.retry_seconds = retry_seconds
+        self.fetched_at = 0.0
+        self.source = "builtin"
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+        self._index(BUILTIN_VOICES)
+        self._load()
+
+    @classmethod
+    def from_env(cls, fetch):
+        return cls(
+            fetch,
+            cache_path=os.getenv("AZURE_SPEECH_VOICE_CACHE", ".voice_cache.json") or None,
+            ttl=float(os.getenv("AZURE_SPEECH_VOICE_CACHE_TTL_HOURS", "24")) * 3600,
+        )
+
+    @property
+    def stale(self):
+        return time.time() - self.fetched_at >= self.ttl
+
+    def get(self, name):
+        """Voice dict for a short name, or None"""
+        return self._by_name.get(name)
+
+    @property
+    def loaded(self):
+        """True once the list came from the service or the disk cache"""
+        return self.source != "builtin"
+
+    def is_valid(self, name):
+        """Known voice; before the catalog is loaded, any well-formed voice name"""
+        if not self.loaded:
+            return bool(VOICE_NAME.match(name or ""))
+        return name in self._by_name
+
+    def locales(self):
+        return sorted(self._by_locale)
+
+    def voices(self, locale=None, gender=None):
+        """Voices filtered by locale and/or gender (case-insensitive gender)"""
+        if locale is None:
+            voices = self._voices
+        else:
+            voices = self._by_locale.get(locale, [])
+        if gender:
+            gender = gender.lower()
+            voices = [v for v in voices if v["gender"].lower() == gender]
+        return list(voices)
+
+    def refresh(self):
+        """Fetch the voice list now; keeps the current list if the fetch fails"""
+        try:
+            voices = self.fetch()
+        except Exception as e:
+            print(f"⚠️ Gagal mengambil daftar suara: {e}")
+            return False
+        if not voices:
+            return False
+
+        self._index(voices)
+        with self._lock:
+            self.fetched_at = time.time()
+            self.source = "service"
+        self._save(voices)
+        return True
+
+    def start_background_refresh(self):
+        """Refresh now if stale, then every ttl seconds (retrying sooner after failures)"""
+        if self._refresh_thread is not None:
+            return
+
+        def loop():
+            while True:
+                ok = True
+                if self.stale:
+                    ok = self.refresh()
+                wait = self.ttl - (time.time() - self.fetched_at) if ok else self.retry_seconds
+                time.sleep(max(wait, 1.0))
+
+        self._refresh_thread = threading.Thread(target=loop)
+        self._refresh_thread.daemon = True
+        self._refresh_thread.start()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "voices": len(self._voices),
+                "locales": len(self._by_locale),
+                "source": self.source,
+                "age_seconds": round(time.time() - self.fetched_at) if self.fetched_at else None,
+            }
+
+    def _index(self, voices):
+        by_name = {}
+        by_locale = {}
+        for voice in voices:
+            by_name[voice["name"]] = voice
+            by_locale.setdefault(voice["locale"], []).append(voice)
+        ordered = sorted(voices, key=lambda v: (v["locale"], v["name"]))
+        for entries in by_locale.values():
+            entries.sort(key=lambda v: v["name"])
+
+        # Swap whole indexes so readers never see a half-built catalog
+        with self._lock:
+            self._voices = ordered
+            self._by_name = by_name
+            self._by_locale = by_locale
+
+    def _load(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            self._index(cached["voices"])
+            self.fetched_at = float(cached["fetched_at"])
+            self.source = "disk"
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"⚠️ Cache daftar suara tidak bisa dibaca: {e}")
+
+    def _save(self, voices):
+        if not self.cache_path:
+            return
+        temp_path = f"{self.cache_path}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"fetched_at": self.fetched_at, "voices": voices}, f, ensure_ascii=False)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            print(f"⚠️ Cache daftar suara tidak bisa disimpan: {e}")
@@ -0,0 +1,203 @@
+"""
+Realtime Voice Channel
+Satu koneksi WebSocket per browser: PCM mikrofon masuk, transkrip, token LLM dan audio keluar
+
+Author: Edhot Purwoko - Microsoft Indonesia
+License: MIT - Free to use
+Disclaimer: Provided "as is" without warranty. Use at your own risk.
+"""
+
+import json
+import queue
+import threading
+import azure.cognitiveservices.speech as speechsdk
+
+# Raw PCM lets the browser play each chunk as soon as it arrives
+DEFAULT_AUDIO_FORMAT = "pcm-24k"
+
+class VoiceChannel:
+    """Runs one client's conversation over a persistent connection
+
+    Incoming binary frames are 16-bit mono PCM pushed into a continuous
+    recognizer. Incoming text frames are JSON control messages:
+    {"type": "start", "sample_rate": 16000, "format": "pcm-24k"},
+    {"type": "text", "text": "..."}, {"type": "cancel"} and {"type": "stop"}.
+
+    Outgoing text frames are JSON events (ready, partial, final, token,
+    response, audio_start, audio_end, cancelled, error); synthesized audio is
+    sent as binary frames between audio_start and audio_end.
+
+    Each channel keeps its own conversation history, detected language and
+    voice, and only ever cancels its own turn, so connections do not
+    interrupt each other or change each other's voice.
+    """
+
+    def __init__(self, bot, send, session=None):
+        self.bot = bot
+        self.session = session
+        self.history = bot.new_history()
+        # Language detected on this client's audio and the voice answering in it
+        self.language = None
+        self.voice_name = None
+        self._turn = None
+        self._send = send
+        self._send_lock = threading.Lock()
+        self.audio_format = DEFAULT_AUDIO_FORMAT
+        self.push_stream = None
+        self.recognizer = None
+        self.closed = False
+
+        # Final transcripts are answered one at a time; a new one interrupts the current turn
+        self._utterances = queue.Queue()
+        self._worker = threading.Thread(target=self._answer_loop)
+        self._worker.daemon = True
+        self._worker.start()
+
+    def handle(self, message):
+        """Process one incoming frame; returns False when the client asked to stop"""
+        if isinstance(message, (bytes, bytearray)):
+            if self.push_stream is not None:
+                self.push_stream.write(bytes(message))
+            return True
+
+        try:
+            command = json.loads(message)
+        except ValueError:
+            self.emit("error", error="Pesan tidak valid")
+            return True
+
+        kind = command.get("type")
+        if kind == "start":
+            self.start(int(command.get("sample_rate", 16000)), command.get("format"))
+        elif kind == "text" and command.get("text", "").strip():
+            self._utterances.put(command["text"].strip())
+        elif kind == "cancel":
+            self.cancel_turn()
+        elif kind == "stop":
+            return False
+        return True
+
+    def start(self, sample_rate=16000, audio_format=None):
+        """Open the push-stream recognizer for the client's microphone"""
+        if audio_format:
+            self.audio_format = self.bot.speech_service.resolve_output_format(audio_format)
+        if self.recognizer is not None:
+            return
+
+        self.push_stream, self.recognizer = self.bot.speech_service.open_stream_recognizer(sample_rate)
+        self.recognizer.recognizing.connect(self._on_recognizing)
+        self.recognizer.recognized.connect(self._on_recognized)
+        self.recognizer.canceled.connect(self._on_canceled)
+        self.recognizer.start_continuous_recognition_async().get()
+        self.emit("ready", sample_rate=sample_rate, format=self.audio_format)
+
+    def close(self):
+        """Stop recognition and abandon the current turn"""
+        if self.closed:
+            return
+        self.closed = True
+        self._utterances.put(None)
+        self.cancel_turn()
+        if self.recognizer is not None:
+            self.push_stream.close()
+            try:
+                self.recognizer.stop_continuous_recognition_async().get()
+            except Exception:
+                pass
+            self.recognizer = None
+
+    def cancel_turn(self):
+        """Stop this channel's answer still being generated or played"""
+        turn = self._turn
+        if turn is not None:
+            turn.cancel()
+
+    def emit(self, kind, **fields):
+        self.send(json.dumps(dict(fields, type=kind)))
+
+    def send(self, frame):
+        if self.closed:
+            return
+        with self._send_lock:
+            try:
+                self._send(frame)
+            except Exception:
+                # Connection gone; the receive loop will notice and close the channel
+                self.closed = True
+
+    def _on_recognizing(self, evt):
+        if evt.result.text:
+            self.emit("partial", text=evt.result.text)
+
+    def _on_recognized(self, evt):
+        if evt.result.reason == speechsdk.ResultReason.RecognizedSpeech and evt.result.text:
+            language, voice_name = self.bot.speech_service.detected_voice(evt.result)
+            if language:
+                self.language = language
+                self.voice_name = voice_name or self.voice_name
+            self.emit("final", text=evt.result.text, language=self.language)
+            # Barge-in: stop the answer still being generated or played
+            self.cancel_turn()
+            self._utterances.put(evt.result.text)
+
+    def _on_canceled(self, evt):
+        if evt.reason == speechsdk.CancellationReason.Error:
+            self.emit("error", error=evt.error_details)
+
+    def _answer_loop(self):
+        while True:
+            text = self._utterances.get()
+            if text is None or self.closed:
+                return
+            try:
+                self._answer(text)
+            except Exception as e:
+                self.emit("error", error=str(e))
+
+    def _answer(self, text):
+        turn = self.bot.start_turn(text, interrupt=False, source="realtime", speak=True,
+                                   session=self.session, history=self.history)
+        self._turn = turn
+        try:
+            self._run_turn(turn)
+        finally:
+            self._turn = None
+            turn.finish()
+
+    def _run_turn(self, turn):
+        parts = []
+        for chunk in self.bot.coalescer.coalesce(turn.stream()):
+            parts.append(chunk)
+            self.emit("token", text=chunk)
+        if turn.cancelled:
+            self.emit("cancelled")
+            return
+
+        response = "".join(parts)
+        self.emit("response", text=response)
+
+        spoken = self.bot.normalize_for_speech(response, self.voice_name)
+        entry = self.bot.stream_audio(spoken, self.audio_format, self.voice_name) if spoken else None
+        if entry is None:
+            return
+        turn.record.set(spoken_chars=len(spoken), audio_format=entry["format"])
+
+        self.emit("audio_start", format=entry["format"], mime_type=entry["mime_type"])
+        chunks = entry["chunks"]
+        audio_bytes = 0
+        try:
+            for chunk in chunks:
+                if turn.cancelled or self.closed:
+                    break
+                if not audio_bytes:
+                    turn.record.mark("first_audio")
+                audio_bytes += len(chunk)
+                self.send(chunk)
+        finally:
+            # Cached clips come as a plain iterator; generators release the synthesis stream
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+        turn.record.mark("audio_end")
+        turn.record.set(audio_bytes=audio_bytes)
+        self.emit("audio_end", cancelled=turn.cancelled)
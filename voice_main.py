@@ -9,6 +9,11 @@ Disclaimer: Provided "as is" without warranty. Use at your own risk.
 """
 
 from chatbot import SimpleChatbot
+from flight_recorder import format_turn
+from profiling import Profiler
+from playback import INTERRUPT, MODES, parse_mode
+from recognition_events import INTERIM, FINAL, CANCELED
+import os
 import sys
 
 def main():
@@ -19,12 +24,19 @@ def main():
     print("Perintah yang tersedia:")
     print("• 'voice' - Mode voice chat (bicara dan dengar)")
     print("• 'listen' - Hanya dengarkan input suara")
+    print("• 'dictate' - Dikte berkelanjutan dengan transkrip sementara (Ctrl-C untuk berhenti)")
     print("• 'speak <text>' - Ucapkan teks")
+    print("• 'mode interrupt|queue' - Input baru memotong atau mengantre suara yang diputar")
+    print("• 'stop' - Hentikan suara yang sedang diputar")
     print("• 'test' - Test speech services")
-    print("• 'language <code>' - Ubah bahasa (id-ID, en-US)")
-    print("• 'voice-list' - Lihat daftar suara tersedia")
+    print("• 'language <code>' - Ubah bahasa (id-ID, en-US, atau auto untuk deteksi otomatis)")
+    print("• 'voice-list [locale|all]' - Lihat daftar suara tersedia")
     print("• 'voice-set <name>' - Ubah suara")
+    print("• 'transcribe <file.wav>' - Transkripsi file rekaman panjang")
+    print("• 'turns [slow]' - Lihat timing turn terakhir")
+    print("• 'profile on [memory]' / 'profile off' - Profil CPU/memori perintah berikutnya")
     print("• 'clear' - Hapus riwayat percakapan")
+    print("• Ctrl-C saat bot menjawab - Batalkan respons")
     print("• 'quit', 'exit', 'keluar' - Keluar dari aplikasi")
     print("-" * 60)
     
@@ -41,6 +53,12 @@ def main():
     except Exception as e:
         print(f"❌ Error saat menginisialisasi chatbot: {e}")
         return
+    
+    profiler = Profiler.from_env()
+    profile_session = None
+    
+    # Answers play in the background; new input interrupts or queues behind them
+    mode = parse_mode(os.getenv("PLAYBACK_MODE"))
 
     while True:
         try:
@@ -58,18 +76,71 @@ def main():
                 print("🗑️ Riwayat percakapan telah dihapus!")
                 continue
             
+            # Profile the following commands ('profile on [memory]' ... 'profile off')
+            if user_input.lower().startswith('profile'):
+                args = user_input.lower().split()[1:]
+                if args[:1] == ['on']:
+                    if profile_session is None:
+                        profile_session = profiler.start("cli", memory='memory' in args)
+                    print("📈 Profiling aktif" if profile_session else "⚠️ Profiling lain sedang berjalan")
+                elif args[:1] == ['off'] and profile_session is not None:
+                    profile_session.stop()
+                    profile_session = None
+                else:
+                    print("⚠️ Contoh: profile on, profile on memory, profile off")
+                continue
+            
+            # Switch playback mode
+            if user_input.lower().startswith('mode'):
+                requested = user_input.lower()[4:].strip()
+                if requested in MODES:
+                    mode = requested
+                    print(f"🔁 Mode pemutaran: {mode}")
+                else:
+                    print("⚠️ Contoh: mode interrupt, mode queue")
+                continue
+            
+            # Stop playback
+            if user_input.lower() == 'stop':
+                if bot.interrupt_playback():
+                    print("⏹️ Suara dihentikan")
+                continue
+            
+            # Show the flight recorder ('turns slow' for slow turns only)
+            if user_input.lower() in ('turns', 'turns slow'):
+                turns = bot.get_recent_turns(10, slow_only=user_input.lower().endswith('slow'))
+                if not turns:
+                    print("📭 Belum ada turn yang tercatat")
+                for entry in turns:
+                    print(format_turn(entry))
+                continue
+            
             # Voice chat mode
             if user_input.lower() == 'voice':
                 if not bot.speech_enabled:
                     print("❌ Speech services tidak tersedia")
                     continue
                 
+                # Keep the microphone from hearing the previous answer
+                if mode == INTERRUPT:
+                    bot.interrupt_playback()
+                else:
+                    bot.wait_for_playback()
+                
                 print("\n🎤 Mode Voice Chat - Silakan berbicara!")
-                result = bot.voice_chat(speak_response=True)
+                try:
+                    result = bot.voice_chat(speak_response=True, wait=False, interrupt=(mode == INTERRUPT))
+                except KeyboardInterrupt:
+                    bot.cancel_active_turn()
+                    print("\n⏹️ Voice chat dibatalkan")
+                    continue
                 
                 if result and isinstance(result, dict):
                     print(f"👤 Anda: {result['user_input']}")
-                    print(f"🤖 Bot: {result['bot_response']}")
+                    if result.get('cancelled'):
+                        print("⏹️ Respons dibatalkan")
+                    else:
+                        print(f"🤖 Bot: {result['bot_response']}")
                 elif result:
                     print(f"❌ {result}")
                 continue
@@ -85,8 +156,41 @@ def main():
                 if speech_text:
                     print(f"👤 Terdeteksi: {speech_text}")
                     # Get response normally
-                    response = bot.get_response(speech_text, stream=False)
-                    print(f"🤖 Bot: {response}")
+                    turn = bot.start_turn(speech_text, interrupt=(mode == INTERRUPT), source="cli-listen")
+                    try:
+                        response = turn.result()
+                        print(f"🤖 Bot: {response}")
+                    except KeyboardInterrupt:
+                        turn.cancel()
+                        print("\n⏹️ Respons dibatalkan")
+                continue
+            
+            # Continuous dictation with interim results
+            if user_input.lower() == 'dictate':
+                if not bot.speech_enabled:
+                    print("❌ Speech services tidak tersedia")
+                    continue
+                
+                if mode == INTERRUPT:
+                    bot.interrupt_playback()
+                else:
+                    bot.wait_for_playback()
+                
+                with bot.recognition_events() as events:
+                    if not bot.start_continuous_listening():
+                        continue
+                    try:
+                        for event in events:
+                            if event.kind == INTERIM:
+                                print(f"\r💭 {event.text}", end="", flush=True)
+                            elif event.kind == FINAL:
+                                print(f"\r📝 {event.text} ({event.queue_ms}ms)")
+                            elif event.kind == CANCELED:
+                                break
+                    except KeyboardInterrupt:
+                        print()
+                    finally:
+                        bot.stop_continuous_listening()
                 continue
             
             # Speak text command
@@ -97,11 +201,9 @@ def main():
                 
                 text_to_speak = user_input[6:]  # Remove 'speak ' prefix
                 if text_to_speak:
-                    success = bot.speak_response(text_to_speak)
-                    if success:
-                        print(f"🔊 Mengucapkan: {text_to_speak}")
-                    else:
-                        print("❌ Gagal mengucapkan teks")
+                    if mode == INTERRUPT:
+                        bot.interrupt_playback()
+                    bot.speak_response(text_to_speak, wait=False)
                 else:
                     print("⚠️ Silakan masukkan teks yang ingin diucapkan")
                 continue
@@ -134,16 +236,18 @@ def main():
                     else:
                         print(f"❌ Gagal mengubah bahasa ke: {lang_code}")
                 else:
-                    print("⚠️ Contoh: language id-ID atau language en-US")
+                    print("⚠️ Contoh: language id-ID, language en-US atau language auto")
                 continue
             
             # List available voices
-            if user_input.lower() == 'voice-list':
+            if user_input.lower() == 'voice-list' or user_input.lower().startswith('voice-list '):
                 if not bot.speech_enabled:
                     print("❌ Speech services tidak tersedia")
                     continue
                 
-                voices = bot.get_available_voices()
+                # Optional locale filter, e.g. 'voice-list ja-JP' or 'voice-list all'
+                locale = user_input[11:].strip() or None
+                voices = bot.get_available_voices(locale)
                 print("🗣️ Daftar suara tersedia:")
                 for language, voice_list in voices.items():
                     print(f"\n{language}:")
@@ -168,6 +272,22 @@ def main():
                     print("⚠️ Contoh: voice-set id-ID-ArdiNeural")
                 continue
             
+            # Transcribe a recorded file
+            if user_input.lower().startswith('transcribe '):
+                if not bot.speech_enabled:
+                    print("❌ Speech services tidak tersedia")
+                    continue
+                
+                path = user_input[11:].strip()  # Remove 'transcribe ' prefix
+                if not os.path.isfile(path):
+                    print(f"❌ File tidak ditemukan: {path}")
+                    continue
+                
+                print(f"📝 Mentranskripsi {path}...")
+                for entry in bot.transcribe_file(path):
+                    print(entry)
+                continue
+            
             # Skip empty input
             if not user_input:
                 print("⚠️ Silakan masukkan pesan Anda.")
@@ -175,8 +295,14 @@ def main():
             
             # Regular text chat
             print("\n🤖 Bot: ", end="")
-            response = bot.get_response(user_input, stream=False)
-            print(response)
+            turn = bot.start_turn(user_input, interrupt=(mode == INTERRUPT), source="cli")
+            try:
+                response = turn.result()
+                print(response)
+            except KeyboardInterrupt:
+                # Ctrl-C during generation cancels the turn, not the program
+                turn.cancel()
+                print("\n⏹️ Respons dibatalkan")
                 
         except KeyboardInterrupt:
             print("\n\n👋 Program dihentikan. Sampai jumpa!")
@@ -184,6 +310,13 @@ def main():
         except Exception as e:
             print(f"\n❌ Terjadi error: {e}")
             print("Silakan coba lagi.")
+    
+    # Stop whatever is still being spoken
+    bot.interrupt_playback()
+    
+    # Write out a capture that is still running
+    if profile_session is not None:
+        profile_session.stop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
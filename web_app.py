@@ -8,12 +8,52 @@ License: MIT - Free to use
 Disclaimer: Provided "as is" without warranty. Use at your own risk.
 """
 
-from flask import Flask, render_template, request, jsonify, Response
+from flask import Flask, render_template, request, jsonify, Response, g
 from chatbot import SimpleChatbot
+from profiling import Profiler
+from fair_scheduler import BudgetExceeded, QueueTimeout
+from speech_service import OUTPUT_FORMATS
+from vad import check_wav_format
+import io
 import json
+import wave
+
+try:
+    from flask_sock import Sock
+except ImportError:
+    Sock = None
 
 app = Flask(__name__)
 bot = SimpleChatbot()
+sock = Sock(app) if Sock else None
+profiler = Profiler.from_env()
+
+def client_session():
+    """Budget/fair-queuing key of the caller: X-Session-Id, else the client address"""
+    return request.headers.get('X-Session-Id') or request.remote_addr
+
+def budget_exceeded(e):
+    response = jsonify({'error': str(e), 'budget': e.kind, 'retry_after': e.retry_after})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 429
+
+def scheduler_busy(e):
+    response = jsonify({'error': str(e), 'retry_after': e.retry_after})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 503
+
+@app.before_request
+def start_profile():
+    """Profile this request if X-Profile (with X-Profile-Token) is sent or a window is armed"""
+    wanted, memory = profiler.wanted(request.headers)
+    if wanted:
+        g.profile = profiler.start(f"{request.method}-{request.path}", memory)
+
+@app.teardown_request
+def stop_profile(exc):
+    session = g.pop('profile', None)
+    if session is not None:
+        session.stop()
 
 @app.route('/')
 def index():
@@ -30,11 +70,17 @@ def chat():
             return jsonify({'error': 'No message provided'}), 400
         
         # Get response from chatbot
-        response = bot.get_response(user_message, stream=False)
+        # Concurrent clients share the bot, so a turn never interrupts another client's turn
+        turn = bot.start_turn(user_message, interrupt=False, source='web',
+                              speak=speak_response and bot.speech_enabled, session=client_session())
+        response = turn.result()
+        
+        if turn.cancelled:
+            return jsonify({'status': 'cancelled', 'response': None, 'spoken': False})
         
         # Speak the response if requested
         if speak_response and bot.speech_enabled:
-            success = bot.speak_response(response)
+            success = turn.speak()
             return jsonify({
                 'response': response,
                 'status': 'success',
@@ -47,6 +93,10 @@ def chat():
             'spoken': False
         })
         
+    except BudgetExceeded as e:
+        return budget_exceeded(e)
+    except QueueTimeout as e:
+        return scheduler_busy(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -59,19 +109,84 @@ def chat_stream():
         if not user_message:
             return jsonify({'error': 'No message provided'}), 400
         
+        turn = bot.start_turn(user_message, interrupt=False, source='web-stream', session=client_session())
+        
         def generate():
-            for chunk in bot.get_response(user_message, stream=True):
-                yield f"data: {json.dumps({'chunk': chunk})}\n\n"
-            yield f"data: {json.dumps({'done': True})}\n\n"
+            try:
+                # Deltas are batched by time window/size so fast streams send fewer, larger frames
+                for chunk in bot.coalescer.coalesce(turn.stream()):
+                    yield f"data: {json.dumps({'chunk': chunk})}\n\n"
+                yield f"data: {json.dumps({'done': True, 'cancelled': turn.cancelled})}\n\n"
+            except QueueTimeout as e:
+                # Headers are already sent; report the busy scheduler in the stream
+                yield f"data: {json.dumps({'error': str(e), 'retry_after': e.retry_after})}\n\n"
+            except GeneratorExit:
+                # Client went away; stop consuming tokens for this turn
+                turn.cancel()
+                raise
         
         return Response(generate(), mimetype='text/plain')
         
+    except BudgetExceeded as e:
+        return budget_exceeded(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/chat/cancel', methods=['POST'])
+def chat_cancel():
+    """Cancel the caller's running generation and speech"""
+    try:
+        cancelled = bot.cancel_active_turn(client_session())
+        return jsonify({'status': 'success', 'cancelled': cancelled})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/turns', methods=['GET'])
+def recent_turns():
+    """Flight recorder: stage timings of recent turns (?limit=20, ?slow=1 for slow turns only)"""
+    limit = request.args.get('limit', 20, type=int)
+    slow_only = request.args.get('slow', '').lower() in ('1', 'true', 'yes')
+    return jsonify({
+        'turns': bot.get_recent_turns(limit, slow_only),
+        'recorder': bot.recorder.stats()
+    })
+
+@app.route('/admin/profile', methods=['GET', 'POST'])
+def admin_profile():
+    """Arm profiling for a time window ({"seconds": 30, "memory": false}) or list captures"""
+    if not profiler.authorized(request.headers):
+        return jsonify({'error': 'X-Profile-Token tidak valid atau PROFILE_TOKEN belum diset'}), 403
+    
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        try:
+            seconds = float(data.get('seconds', 30))
+        except (TypeError, ValueError):
+            seconds = -1.0
+        # NaN and infinity fail the range check too
+        if not 0 <= seconds <= 24 * 3600:
+            return jsonify({'error': 'seconds harus angka antara 0 dan 86400'}), 400
+        profiler.arm(seconds, bool(data.get('memory', False)))
+    return jsonify(profiler.status())
+
+@app.route('/llm/status', methods=['GET'])
+def llm_status():
+    """Get latency and health statistics per Azure OpenAI deployment"""
+    return jsonify({
+        'targets': bot.get_routing_stats(),
+        'usage': bot.get_usage_stats(),
+        'streaming': bot.get_streaming_stats(),
+        'semantic_cache': bot.get_semantic_cache_stats(),
+        'hedging': bot.get_hedging_stats(),
+        'scheduler': bot.get_scheduler_stats(),
+        'query_classes': bot.get_query_routing_stats()
+    })
+
 @app.route('/clear-history', methods=['POST'])
 def clear_history():
     try:
+        # The caller's stream runs under its own session, not the bot's
+        bot.cancel_active_turn(client_session())
         bot.clear_history()
         return jsonify({'status': 'success', 'message': 'History cleared'})
     except Exception as e:
@@ -91,10 +206,15 @@ def text_to_speech():
             return jsonify({'error': 'Speech services tidak tersedia'}), 400
         
         # Get text response from chatbot
-        response = bot.get_response(user_message, stream=False)
+        turn = bot.start_turn(user_message, interrupt=False, source='web-tts', speak=True,
+                              session=client_session())
+        response = turn.result()
+        
+        if turn.cancelled:
+            return jsonify({'status': 'cancelled', 'user_input': user_message, 'spoken': False})
         
         # Speak the response
-        success = bot.speak_response(response)
+        success = turn.speak()
         
         return jsonify({
             'user_input': user_message,
@@ -103,6 +223,10 @@ def text_to_speech():
             'spoken': success
         })
         
+    except BudgetExceeded as e:
+        return budget_exceeded(e)
+    except QueueTimeout as e:
+        return scheduler_busy(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -113,17 +237,21 @@ def voice_chat():
         if not bot.speech_enabled:
             return jsonify({'error': 'Speech services tidak tersedia'}), 400
         
-        result = bot.voice_chat(speak_response=True)
+        result = bot.voice_chat(speak_response=True, interrupt=False, session=client_session())
         
         if result and isinstance(result, dict):
             return jsonify({
-                'status': 'success',
+                'status': 'cancelled' if result.get('cancelled') else 'success',
                 'user_input': result['user_input'],
                 'bot_response': result['bot_response']
             })
         else:
             return jsonify({'error': result or 'Gagal memproses voice chat'}), 500
             
+    except BudgetExceeded as e:
+        return budget_exceeded(e)
+    except QueueTimeout as e:
+        return scheduler_busy(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -147,6 +275,34 @@ def voice_listen():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/voice/recognize', methods=['POST'])
+def voice_recognize():
+    """Recognize speech from an uploaded 16-bit mono WAV file"""
+    try:
+        if not bot.speech_enabled:
+            return jsonify({'error': 'Speech services tidak tersedia'}), 400
+        
+        try:
+            with wave.open(io.BytesIO(request.get_data()), 'rb') as wav:
+                check_wav_format(wav)
+                pcm = wav.readframes(wav.getnframes())
+                sample_rate = wav.getframerate()
+        except (ValueError, EOFError, wave.Error) as e:
+            return jsonify({'error': f'Audio tidak valid: {e}'}), 400
+        
+        speech_text = bot.listen_from_audio(pcm, sample_rate)
+        
+        if speech_text:
+            return jsonify({
+                'status': 'success',
+                'text': speech_text
+            })
+        else:
+            return jsonify({'error': 'Tidak ada suara yang terdeteksi'}), 400
+            
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/voice/speak', methods=['POST'])
 def voice_speak():
     """Speak the given text"""
@@ -170,6 +326,35 @@ def voice_speak():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/voice/synthesize', methods=['POST'])
+def voice_synthesize():
+    """Synthesize text and return the encoded audio (opus, mp3 or pcm)"""
+    try:
+        if not bot.speech_enabled:
+            return jsonify({'error': 'Speech services tidak tersedia'}), 400
+        
+        data = request.get_json()
+        text = data.get('text', '')
+        output_format = data.get('format')
+        
+        if not text:
+            return jsonify({'error': 'No text provided'}), 400
+        if output_format and output_format not in OUTPUT_FORMATS:
+            return jsonify({'error': f'Format tidak dikenal: {output_format}',
+                            'formats': list(OUTPUT_FORMATS)}), 400
+        
+        # Markdown and URLs are not read aloud; long texts are synthesized in
+        # parallel chunks and streamed in order
+        entry = bot.stream_audio(bot.normalize_for_speech(text), output_format)
+        if not entry:
+            return jsonify({'error': 'Gagal mensintesis audio'}), 500
+        
+        return Response(entry['chunks'], mimetype=entry['mime_type'],
+                        headers={'X-Audio-Format': entry['format']})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/voice/test', methods=['POST'])
 def voice_test():
     """Test speech services"""
@@ -194,7 +379,8 @@ def get_voices():
         if not bot.speech_enabled:
             return jsonify({'error': 'Speech services tidak tersedia'}), 400
         
-        voices = bot.get_available_voices()
+        # ?locale=id-ID (or all) and ?gender=Female filter the catalog
+        voices = bot.get_available_voices(request.args.get('locale'), request.args.get('gender'))
         return jsonify({'voices': voices})
         
     except Exception as e:
@@ -209,14 +395,17 @@ def set_voice():
         
         data = request.get_json()
         voice_name = data.get('voice_name', '')
+        output_format = data.get('format')
         
         if not voice_name:
             return jsonify({'error': 'No voice name provided'}), 400
         
-        success = bot.set_speech_voice(voice_name)
+        success = bot.set_speech_voice(voice_name, output_format)
         
         if success:
             return jsonify({'status': 'success', 'message': f'Suara diubah ke: {voice_name}'})
+        elif not bot.speech_service.voices.is_valid(voice_name):
+            return jsonify({'error': f'Suara tidak dikenal: {voice_name}. Lihat GET /voice/voices'}), 400
         else:
             return jsonify({'error': f'Gagal mengubah suara ke: {voice_name}'}), 500
             
@@ -246,12 +435,42 @@ def set_language():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def voice_socket(ws):
+    """Realtime voice channel: browser PCM in; transcripts, tokens and audio out"""
+    if not bot.speech_enabled:
+        ws.send(json.dumps({'type': 'error', 'error': 'Speech service tidak tersedia'}))
+        return
+    
+    from voice_channel import VoiceChannel
+    channel = VoiceChannel(bot, ws.send, session=client_session())
+    try:
+        while not channel.closed:
+            message = ws.receive()
+            if message is None or not channel.handle(message):
+                break
+    except Exception as e:
+        print(f"⚠️ Voice channel ditutup: {e}")
+    finally:
+        channel.close()
+
+if sock:
+    sock.route('/voice/ws')(voice_socket)
+else:
+    print("⚠️ flask-sock tidak terpasang; endpoint realtime /voice/ws dinonaktifkan")
+
 @app.route('/voice/status', methods=['GET'])
 def voice_status():
     """Get voice service status"""
     return jsonify({
         'speech_enabled': bot.speech_enabled,
-        'status': 'available' if bot.speech_enabled else 'unavailable'
+        'status': 'available' if bot.speech_enabled else 'unavailable',
+        'regions': bot.get_speech_region_stats(),
+        'tts_normalization': bot.get_tts_normalization_stats(),
+        'language': bot.get_speech_language_status(),
+        'realtime': sock is not None,
+        'voice_catalog': bot.get_voice_catalog_stats(),
+        'playback': bot.get_playback_stats(),
+        'recognition_events': bot.get_recognition_event_stats()
     })
 
 if __name__ == '__main__':